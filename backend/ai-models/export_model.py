@@ -0,0 +1,229 @@
+"""Export the trained Keras HLRNN to a pure-NumPy weight bundle (numpy_runtime).
+
+Usage:
+    python export_model.py [--model models/hlrnn.h5] [--out models/hlrnn.npz]
+                           [--quantize float32|float16|int8] [--samples 1024]
+
+Writes the ``.npz`` bundle and an ``.npz.json`` metadata file next to it, after a
+parity check: the bundle and the original model score the same inputs and the
+export fails (nothing is written) if the largest probability difference
+exceeds the tolerance for the chosen precision. int8 stores kernels with a
+symmetric per-output-unit scale; biases and normalisation statistics stay float32.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from features import FEATURE_NAMES
+from model_loader import DEFAULT_MODEL_PATH, KerasRuntime, load_keras_model, metadata_path, read_version
+from numpy_runtime import LAYERS, NumpyRuntime
+
+PARITY_TOLERANCE = {'float32': 1e-4, 'float16': 5e-3, 'int8': 2e-2}
+PASSTHROUGH_LAYERS = {'InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise', 'GaussianDropout', 'ActivityRegularization'}
+RECURRENT_LAYERS = {'SimpleRNN', 'LSTM', 'GRU'}
+QUANTIZED_WEIGHTS = {'kernel', 'recurrent_kernel'}
+
+
+def _activation(value):
+    if isinstance(value, dict):
+        value = value.get('config', {}).get('name') or value.get('class_name')
+    return str(value or 'linear')
+
+
+def _weight_names(layer_type, config):
+    """Names for ``layer.get_weights()`` entries, in Keras order."""
+    if layer_type == 'Dense':
+        return ['kernel', 'bias'] if config.get('use_bias', True) else ['kernel']
+    if layer_type in RECURRENT_LAYERS:
+        return ['kernel', 'recurrent_kernel', 'bias'] if config.get('use_bias', True) else ['kernel', 'recurrent_kernel']
+    if layer_type == 'BatchNormalization':
+        names = []
+        if config.get('scale', True):
+            names.append('gamma')
+        if config.get('center', True):
+            names.append('beta')
+        return names + ['moving_mean', 'moving_variance']
+    return []
+
+
+def _layer_spec(layer_type, config):
+    spec = {'type': layer_type}
+    if layer_type in ('Dense', 'Activation'):
+        spec['activation'] = _activation(config.get('activation'))
+    elif layer_type in RECURRENT_LAYERS:
+        if config.get('stateful'):
+            raise ValueError('Stateful recurrent layers are not supported')
+        spec.update({
+            'units': config['units'],
+            'activation': _activation(config.get('activation', 'tanh')),
+            'recurrent_activation': _activation(config.get('recurrent_activation', 'sigmoid')),
+            'return_sequences': bool(config.get('return_sequences', False)),
+            'go_backwards': bool(config.get('go_backwards', False)),
+        })
+        if layer_type == 'GRU':
+            spec['reset_after'] = bool(config.get('reset_after', True))
+    elif layer_type == 'BatchNormalization':
+        spec['epsilon'] = float(config.get('epsilon', 1e-3))
+    elif layer_type == 'Masking':
+        spec['mask_value'] = float(config.get('mask_value', 0.0))
+    return spec
+
+
+def describe(model):
+    """(spec, {array name: float32 array}) for a linear stack of supported layers."""
+    layers = []
+    arrays = {}
+
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        if layer_type in PASSTHROUGH_LAYERS:
+            continue
+        config = layer.get_config()
+        prefix = 'l%d.' % len(layers)
+
+        if layer_type == 'Bidirectional':
+            inner_type = type(layer.forward_layer).__name__
+            inner_config = layer.forward_layer.get_config()
+            names = _weight_names(inner_type, inner_config)
+            weights = layer.get_weights()
+            for direction, values in (('forward', weights[:len(names)]), ('backward', weights[len(names):])):
+                for name, value in zip(names, values):
+                    arrays['%s%s.%s' % (prefix, direction, name)] = np.asarray(value, dtype=np.float32)
+            layers.append({
+                'type': 'Bidirectional',
+                'merge_mode': config.get('merge_mode', 'concat'),
+                'layer': {**_layer_spec(inner_type, inner_config), 'go_backwards': False},
+            })
+            continue
+
+        if layer_type not in LAYERS:
+            raise ValueError('Layer %s (%s) is not supported by the NumPy runtime' % (layer.name, layer_type))
+
+        for name, value in zip(_weight_names(layer_type, config), layer.get_weights()):
+            arrays[prefix + name] = np.asarray(value, dtype=np.float32)
+        layers.append(_layer_spec(layer_type, config))
+
+    return layers, arrays
+
+
+def quantize(arrays, precision):
+    """Arrays to store for ``precision``; int8 adds a ``.scale`` per quantized kernel."""
+    if precision == 'float32':
+        return dict(arrays)
+
+    stored = {}
+    for name, value in arrays.items():
+        weight = name.rsplit('.', 1)[-1]
+        if weight not in QUANTIZED_WEIGHTS:
+            stored[name] = value
+        elif precision == 'float16':
+            stored[name] = value.astype(np.float16)
+        else:
+            scale = np.abs(value).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            stored[name] = np.clip(np.round(value / scale), -127, 127).astype(np.int8)
+            stored[name + '.scale'] = scale.astype(np.float32)
+    return stored
+
+
+def parity_inputs(samples, seed=0):
+    """Encoded-feature-like inputs in [0, 1] plus the all-zero and all-one rows."""
+    rng = np.random.default_rng(seed)
+    matrix = rng.random((samples, len(FEATURE_NAMES)), dtype=np.float32)
+    return np.vstack([matrix, np.zeros((1, len(FEATURE_NAMES)), np.float32), np.ones((1, len(FEATURE_NAMES)), np.float32)])
+
+
+def parity_sequences(samples, weeks=16, seed=0):
+    """Weekly sequences like the sequence cache's, zero-padded before a random first week."""
+    rng = np.random.default_rng(seed)
+    tensor = rng.random((samples, weeks, len(FEATURE_NAMES)), dtype=np.float32)
+    first = rng.integers(0, weeks, size=samples)
+    tensor[np.arange(weeks)[None, :] < first[:, None]] = 0.0
+    return tensor
+
+
+def export(model_path, out_path, precision='float32', samples=1024):
+    model = load_keras_model(model_path)
+    reference = KerasRuntime(model, read_version(model_path))
+
+    layers, arrays = describe(model)
+    spec = {
+        'format': 1,
+        'modelType': 'HLRNN',
+        'sourceVersion': reference.version,
+        'sourceModel': os.path.basename(model_path),
+        'precision': precision,
+        'inputRank': len(model.input_shape),
+        'features': FEATURE_NAMES,
+        'layers': layers,
+    }
+    stored = quantize(arrays, precision)
+
+    # Write to a temporary file first so a failed parity check leaves nothing behind
+    directory = os.path.dirname(os.path.abspath(out_path))
+    handle, temporary = tempfile.mkstemp(suffix='.npz', dir=directory)
+    os.close(handle)
+    try:
+        np.savez_compressed(temporary, __spec__=np.array(json.dumps(spec)), **stored)
+        candidate = NumpyRuntime.load(temporary)
+
+        inputs = parity_inputs(samples)
+        difference = np.abs(candidate.predict(inputs) - reference.predict(inputs))
+        if candidate.sequence_input:
+            tensor = parity_sequences(max(samples // 8, 1))
+            difference = np.concatenate([
+                difference, np.abs(candidate.predict_sequences(tensor) - reference.predict_sequences(tensor))
+            ])
+        parity = {
+            'samples': len(difference),
+            'maxAbsDiff': float(difference.max()),
+            'meanAbsDiff': float(difference.mean()),
+            'tolerance': PARITY_TOLERANCE[precision],
+        }
+        if parity['maxAbsDiff'] > parity['tolerance']:
+            raise ValueError('Parity check failed: max |Δp| %.6f > %.6f' % (parity['maxAbsDiff'], parity['tolerance']))
+
+        os.replace(temporary, out_path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    metadata = {
+        'version': candidate.version,
+        'modelType': candidate.model_type,
+        'sourceVersion': reference.version,
+        'precision': precision,
+        'parity': parity,
+        'sizeBytes': os.path.getsize(out_path),
+    }
+    with open(metadata_path(out_path), 'w') as handle:
+        json.dump(metadata, handle, indent=2)
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.environ.get('HLRNN_MODEL_PATH', DEFAULT_MODEL_PATH))
+    parser.add_argument('--out')
+    parser.add_argument('--quantize', choices=sorted(PARITY_TOLERANCE), default='float32')
+    parser.add_argument('--samples', type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    out_path = args.out or os.path.splitext(args.model)[0] + '.npz'
+    try:
+        metadata = export(args.model, out_path, args.quantize, args.samples)
+    except Exception as error:
+        print('Export failed: %s' % error, file=sys.stderr)
+        return 1
+
+    print(json.dumps(metadata, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
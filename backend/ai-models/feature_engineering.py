@@ -0,0 +1,219 @@
+"""Bulk, vectorized computation of ``Prediction.inputFeatures``.
+
+A batch of students is read with one query per collection (students,
+attendancesummaries, grades) and every feature is derived column-wise with
+pandas, so single predictions, micro-batches and nightly re-scoring all
+compute features the same way and at the same per-student cost.
+
+Trends are least-squares slopes over a recent window: monthly attendance
+rates over the last ``ATTENDANCE_WINDOW_MONTHS`` months and assessment
+percentages over the last ``GRADE_WINDOW_DAYS`` days, both in percentage
+points per month. training_data builds the weekly trends of its sequences with
+the same estimator (``slope_from_moments``), windows and threshold.
+"""
+
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+DEFAULT_MONGODB_URI = 'mongodb://localhost:27017/ai_dropout_prediction'
+
+RECENT_GRADES = 50
+ATTENDANCE_WINDOW_MONTHS = 6
+GRADE_WINDOW_DAYS = 180
+TREND_THRESHOLD = 2.5  # percentage points per month
+DAYS_PER_MONTH = 30.4375
+DAYS_PER_YEAR = 365.25
+
+STUDENT_PROJECTION = {
+    'dateOfBirth': 1, 'gender': 1, 'nationality': 1, 'currentCGPA': 1, 'semester': 1,
+    'feeStatus': 1, 'scholarship.hasScholarship': 1, 'fatherEducation': 1, 'motherEducation': 1,
+    'fatherOccupation': 1, 'motherOccupation': 1, 'disciplinaryIssues': 1, 'specialNeeds.hasSpecialNeeds': 1,
+    'displaced': 1,
+}
+
+# Prediction.inputFeatures, in schema order
+INPUT_FEATURES = [
+    'age', 'gender', 'nationality',
+    'currentCGPA', 'attendanceRate', 'semester',
+    'feeStatus', 'hasScholarship',
+    'fatherEducation', 'motherEducation', 'fatherOccupation', 'motherOccupation',
+    'disciplinaryIssues', 'specialNeeds', 'displaced',
+    'previousGPA', 'attendanceTrend', 'gradeTrend', 'attendanceSlope', 'gradeSlope',
+]
+
+
+def connect(uri=None):
+    """Database handle for the API's MongoDB (``MONGODB_URI``)."""
+    from pymongo import MongoClient
+
+    uri = uri or os.environ.get('MONGODB_URI', DEFAULT_MONGODB_URI)
+    client = MongoClient(uri, maxPoolSize=4)
+    return client.get_default_database('ai_dropout_prediction')
+
+
+def object_ids(student_ids):
+    """Valid ObjectIds among ``student_ids``; anything else is skipped."""
+    return [ObjectId(str(value)) for value in student_ids if ObjectId.is_valid(str(value))]
+
+
+def fetch_batch(db, student_ids):
+    """Raw frames for a batch: (students, monthly attendance, recent grades)."""
+    ids = object_ids(student_ids)
+    if not ids:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    students = pd.json_normalize(list(db.students.find({'_id': {'$in': ids}}, STUDENT_PROJECTION)))
+
+    summaries = db.attendancesummaries.find({'studentId': {'$in': ids}}, {'studentId': 1, 'byMonth': 1})
+    attendance = pd.DataFrame(
+        [
+            (summary['studentId'], month, counters.get('total', 0), counters.get('present', 0))
+            for summary in summaries
+            for month, counters in (summary.get('byMonth') or {}).items()
+        ],
+        columns=['studentId', 'month', 'total', 'present'],
+    )
+
+    grades = pd.DataFrame(list(db.grades.aggregate([
+        {'$match': {'studentId': {'$in': ids}}},
+        {'$sort': {'assessmentDate': -1}},
+        {'$group': {
+            '_id': '$studentId',
+            'grades': {'$push': {
+                'semester': '$semester',
+                'percentage': '$percentage',
+                'gradePoints': '$gradePoints',
+                'assessmentDate': '$assessmentDate',
+            }},
+        }},
+        {'$project': {'grades': {'$slice': ['$grades', RECENT_GRADES]}}},
+        {'$unwind': '$grades'},
+        {'$replaceWith': {'$mergeObjects': [{'studentId': '$_id'}, '$grades']}},
+    ])), columns=['studentId', 'semester', 'percentage', 'gradePoints', 'assessmentDate'])
+
+    return students, attendance, grades
+
+
+def slope_from_moments(w, wx, wy, wxx, wxy):
+    """Weighted least-squares slope of y on x from the sums of w, wx, wy, wx², wxy.
+
+    Works element-wise on arrays; 0 where x has no spread (fewer than two distinct x).
+    """
+    spread = w * wxx - wx * wx
+    has_spread = spread > 1e-9
+    return np.where(has_spread, (w * wxy - wx * wy) / np.where(has_spread, spread, 1.0), 0.0)
+
+
+def group_slopes(keys, x, y):
+    """Least-squares slope of y on x per key; keys with fewer than two distinct x get 0."""
+    frame = pd.DataFrame({'key': keys, 'x': x, 'y': y})
+    grouped = frame.groupby('key')
+    # Centred per key, which keeps the moment sums small
+    dx = frame['x'] - grouped['x'].transform('mean')
+    dy = frame['y'] - grouped['y'].transform('mean')
+    moments = pd.DataFrame({'w': 1.0, 'wx': dx, 'wy': dy, 'wxx': dx * dx, 'wxy': dx * dy}).groupby(frame['key']).sum()
+    slopes = slope_from_moments(*(moments[name].to_numpy(dtype=float) for name in ('w', 'wx', 'wy', 'wxx', 'wxy')))
+    return pd.Series(slopes, index=moments.index)
+
+
+def trend_codes(slopes):
+    """features.TRENDS codes (-1 declining, 0 stable, 1 improving) for slopes in points per month."""
+    return np.select([slopes <= -TREND_THRESHOLD, slopes >= TREND_THRESHOLD], [-1.0, 1.0], 0.0)
+
+
+def trend_labels(slopes):
+    return np.select(
+        [slopes <= -TREND_THRESHOLD, slopes >= TREND_THRESHOLD],
+        ['declining', 'improving'],
+        default='stable',
+    )
+
+
+def compute_features(students, attendance, grades, now=None):
+    """inputFeatures for every row of ``students``, indexed by student id (str)."""
+    if students.empty:
+        return pd.DataFrame(columns=INPUT_FEATURES)
+
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    students = students.reindex(columns=['_id', *STUDENT_PROJECTION])
+    index = pd.Index(students['_id'].astype(str), name='studentId')
+    students = students.set_axis(index, axis=0)
+    frame = pd.DataFrame(index=index)
+
+    def column(name, default):
+        return students[name].where(students[name].notna(), default)
+
+    dob = pd.to_datetime(students['dateOfBirth'])
+    current_cgpa = pd.to_numeric(students['currentCGPA'], errors='coerce').fillna(0.0)
+
+    frame['age'] = np.floor((pd.Timestamp(now) - dob).dt.days / DAYS_PER_YEAR)
+    frame['gender'] = students['gender']
+    frame['nationality'] = column('nationality', 'Indian')
+    frame['currentCGPA'] = current_cgpa
+    frame['semester'] = students['semester']
+    frame['feeStatus'] = column('feeStatus', 'Pending')
+    frame['hasScholarship'] = column('scholarship.hasScholarship', False).astype(bool)
+    frame['fatherEducation'] = students['fatherEducation']
+    frame['motherEducation'] = students['motherEducation']
+    frame['fatherOccupation'] = students['fatherOccupation']
+    frame['motherOccupation'] = students['motherOccupation']
+    frame['disciplinaryIssues'] = pd.to_numeric(column('disciplinaryIssues', 0), errors='coerce').fillna(0)
+    frame['specialNeeds'] = column('specialNeeds.hasSpecialNeeds', False).astype(bool)
+    frame['displaced'] = column('displaced', False).astype(bool)
+
+    # Attendance: overall rate and the slope of monthly rates inside the window
+    attendance = attendance.assign(studentId=attendance['studentId'].astype(str))
+    totals = attendance.groupby('studentId')[['total', 'present']].sum().reindex(index)
+    frame['attendanceRate'] = (
+        (totals['present'] / totals['total'].where(totals['total'] > 0) * 100).round(2).fillna(100.0)
+    )
+
+    month_number = (
+        attendance['month'].str.slice(0, 4).astype(int) * 12 + attendance['month'].str.slice(5, 7).astype(int)
+    )
+    in_window = month_number > now.year * 12 + now.month - ATTENDANCE_WINDOW_MONTHS
+    window = attendance[in_window & (attendance['total'] > 0)]
+    frame['attendanceSlope'] = group_slopes(
+        window['studentId'],
+        month_number[window.index],
+        window['present'] / window['total'] * 100,
+    ).reindex(index, fill_value=0.0).round(3)
+
+    # Grades: average grade points of earlier semesters and the slope of recent percentages
+    grades = grades.assign(studentId=grades['studentId'].astype(str))
+    semester_of = pd.to_numeric(students['semester'], errors='coerce').reindex(grades['studentId'])
+    previous = grades[grades['semester'].to_numpy(dtype=float) < semester_of.to_numpy(dtype=float)]
+    frame['previousGPA'] = (
+        previous.groupby('studentId')['gradePoints'].mean().reindex(index).round(2).fillna(current_cgpa)
+    )
+
+    age_days = (pd.Timestamp(now) - pd.to_datetime(grades['assessmentDate'])).dt.days
+    window = grades[age_days <= GRADE_WINDOW_DAYS]
+    frame['gradeSlope'] = group_slopes(
+        window['studentId'],
+        -age_days[window.index] / DAYS_PER_MONTH,
+        window['percentage'],
+    ).reindex(index, fill_value=0.0).round(3)
+
+    frame['attendanceTrend'] = trend_labels(frame['attendanceSlope'])
+    frame['gradeTrend'] = trend_labels(frame['gradeSlope'])
+
+    return frame[INPUT_FEATURES]
+
+
+def build_features(db, student_ids, now=None):
+    """inputFeatures for a batch of student ids with one query per collection."""
+    return compute_features(*fetch_batch(db, student_ids), now=now)
+
+
+def to_records(frame):
+    """JSON-ready inputFeatures dicts (numpy scalars unwrapped, missing values as None)."""
+    cleaned = frame.astype(object).where(frame.notna(), None)
+    return [
+        {name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()}
+        for row in cleaned.to_dict(orient='records')
+    ]
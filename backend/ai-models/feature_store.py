@@ -0,0 +1,175 @@
+"""Versioned store of precomputed feature vectors (``featurevectors`` collection).
+
+Each document holds one student's encoded float32 vector for a feature-set
+version together with the source watermarks it was computed from. Reading a
+batch costs one query per source for the watermarks plus one for the stored
+vectors; only students whose watermarks moved are recomputed through
+feature_engineering and written back, so scoring an unchanged population does
+not touch attendance or grade history at all.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+
+import feature_engineering
+from features import FEATURE_NAMES, encode_frame
+
+COLLECTION = 'featurevectors'
+COLUMNS = [*feature_engineering.INPUT_FEATURES, 'computedAt', 'scoredAt', 'scoredModelVersion']
+
+
+def _feature_set_version():
+    # Anything that changes what a vector means gives a new version (and new documents)
+    definition = {
+        'features': FEATURE_NAMES,
+        'inputs': feature_engineering.INPUT_FEATURES,
+        'studentFields': sorted(feature_engineering.STUDENT_PROJECTION),
+        'attendanceWindowMonths': feature_engineering.ATTENDANCE_WINDOW_MONTHS,
+        'gradeWindowDays': feature_engineering.GRADE_WINDOW_DAYS,
+        'recentGrades': feature_engineering.RECENT_GRADES,
+        'trendThreshold': feature_engineering.TREND_THRESHOLD,
+    }
+    digest = hashlib.sha1(json.dumps(definition, sort_keys=True).encode()).hexdigest()[:10]
+    return 'fs-%s' % digest
+
+
+FEATURE_SET_VERSION = _feature_set_version()
+
+
+def current_watermarks(db, ids, now):
+    """Source versions per student id (str) for students that exist."""
+    period = now.strftime('%Y-%m')
+    students = db.students.find({'_id': {'$in': ids}}, {'updatedAt': 1})
+    attendance = {
+        str(summary['studentId']): summary.get('updatedAt')
+        for summary in db.attendancesummaries.find({'studentId': {'$in': ids}}, {'studentId': 1, 'updatedAt': 1})
+    }
+    grades = {
+        str(group['_id']): group
+        for group in db.grades.aggregate([
+            {'$match': {'studentId': {'$in': ids}}},
+            {'$group': {'_id': '$studentId', 'updatedAt': {'$max': '$updatedAt'}, 'count': {'$sum': 1}}},
+        ])
+    }
+
+    watermarks = {}
+    for student in students:
+        key = str(student['_id'])
+        group = grades.get(key, {})
+        watermarks[key] = {
+            'student': student.get('updatedAt'),
+            'attendance': attendance.get(key),
+            'grades': group.get('updatedAt'),
+            'gradeCount': group.get('count', 0),
+            'period': period,
+        }
+    return watermarks
+
+
+def _empty_matrix():
+    return np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+
+
+def _vector(document):
+    return np.frombuffer(bytes(document['vector']), dtype='<f4')
+
+
+class FeatureStore:
+
+    def __init__(self, db, version=FEATURE_SET_VERSION):
+        self.db = db
+        self.version = version
+        self.collection = db[COLLECTION]
+
+    def load(self, student_ids, now=None):
+        """Current vectors for a batch, refreshing only those whose sources changed.
+
+        Returns a DataFrame indexed by student id (str) with the inputFeatures
+        columns plus ``computedAt``, ``scoredAt`` and ``scoredModelVersion``,
+        and the aligned float32 matrix. Unknown students are omitted.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        ids = feature_engineering.object_ids(student_ids)
+        if not ids:
+            return pd.DataFrame(columns=COLUMNS), _empty_matrix()
+
+        watermarks = current_watermarks(self.db, ids, now)
+        stored = {
+            str(document['studentId']): document
+            for document in self.collection.find({'studentId': {'$in': ids}, 'featureSetVersion': self.version})
+        }
+
+        stale = [key for key, marks in watermarks.items()
+                 if key not in stored or stored[key].get('watermarks') != marks]
+        if stale:
+            self.refresh(stale, watermarks, stored, now)
+
+        order = [str(value) for value in ids if str(value) in stored and str(value) in watermarks]
+        frame = pd.DataFrame.from_records(
+            [{
+                **stored[key].get('features', {}),
+                'computedAt': stored[key]['computedAt'],
+                'scoredAt': stored[key].get('scoredAt'),
+                'scoredModelVersion': stored[key].get('scoredModelVersion'),
+            } for key in order],
+            index=pd.Index(order, name='studentId'),
+        ).reindex(columns=COLUMNS)
+        matrix = np.stack([_vector(stored[key]) for key in order]) if order else _empty_matrix()
+        return frame, matrix
+
+    def refresh(self, keys, watermarks, stored, now):
+        """Recompute vectors for ``keys`` in bulk and upsert them; updates ``stored`` in place."""
+        frame = feature_engineering.build_features(self.db, keys, now=now)
+        matrix = encode_frame(frame)
+        records = feature_engineering.to_records(frame)
+
+        operations = []
+        for key, features, row in zip(frame.index, records, matrix):
+            previous = stored.get(key)
+            vector = row.astype('<f4').tobytes()
+            changed = previous is None or bytes(previous['vector']) != vector or previous.get('features') != features
+            document = {
+                'studentId': ObjectId(key),
+                'featureSetVersion': self.version,
+                'vector': Binary(vector),
+                'dimensions': len(row),
+                'features': features,
+                'watermarks': watermarks[key],
+                'computedAt': now if changed else previous['computedAt'],
+                'refreshedAt': now,
+            }
+            operations.append(UpdateOne(
+                {'studentId': document['studentId'], 'featureSetVersion': self.version},
+                {'$set': document},
+                upsert=True,
+            ))
+            stored[key] = {**(previous or {}), **document}
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def sample(self, size):
+        """Random matrix of up to ``size`` stored vectors of this version (explanation background)."""
+        documents = list(self.collection.aggregate([
+            {'$match': {'featureSetVersion': self.version}},
+            {'$sample': {'size': size}},
+            {'$project': {'vector': 1}},
+        ]))
+        return np.stack([_vector(document) for document in documents]) if documents else _empty_matrix()
+
+    def needs_scoring(self, frame, model_version):
+        """Boolean mask over ``frame``: vectors changed since last scored, never scored or scored by another model."""
+        if frame.empty:
+            return np.zeros(0, dtype=bool)
+        scored_at = pd.to_datetime(frame['scoredAt'])
+        return (
+            scored_at.isna()
+            | (pd.to_datetime(frame['computedAt']) > scored_at)
+            | (frame['scoredModelVersion'] != model_version)
+        ).to_numpy()
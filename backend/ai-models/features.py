@@ -0,0 +1,87 @@
+"""Feature encoding for the HLRNN dropout model.
+
+Turns ``Prediction.inputFeatures`` (a DataFrame from feature_engineering, or
+a list of feature dicts) into the float32 matrix the model consumes, one
+column at a time. Column order is part of the model contract: append new
+features, never reorder.
+"""
+
+import numpy as np
+import pandas as pd
+
+EDUCATION_LEVELS = ['Below 10th', '10th Pass', '12th Pass', 'Graduate', 'Post Graduate', 'Professional']
+FEE_STATUSES = ['Paid', 'Partial', 'Pending', 'Defaulted']
+TRENDS = {'declining': -1.0, 'stable': 0.0, 'improving': 1.0}
+
+FEATURE_NAMES = [
+    'age',
+    'gender_male',
+    'gender_female',
+    'nationality_foreign',
+    'current_cgpa',
+    'attendance_rate',
+    'semester',
+    'fee_status',
+    'has_scholarship',
+    'father_education',
+    'mother_education',
+    'disciplinary_issues',
+    'special_needs',
+    'displaced',
+    'previous_gpa',
+    'attendance_trend',
+    'grade_trend',
+]
+
+INPUT_COLUMNS = [
+    'age', 'gender', 'nationality', 'currentCGPA', 'attendanceRate', 'semester', 'feeStatus',
+    'hasScholarship', 'fatherEducation', 'motherEducation', 'disciplinaryIssues', 'specialNeeds',
+    'displaced', 'previousGPA', 'attendanceTrend', 'gradeTrend',
+]
+
+
+def _ordinal(series, levels):
+    """Position of each value in ``levels`` scaled to [0, 1]; unknown maps to 0.5."""
+    scale = {level: i / (len(levels) - 1) for i, level in enumerate(levels)}
+    return series.map(scale).fillna(0.5).astype(float)
+
+
+def _number(series, default=0.0):
+    return pd.to_numeric(series, errors='coerce').fillna(default).astype(float)
+
+
+def _flag(series):
+    return series.fillna(False).astype(bool).astype(float)
+
+
+def encode_frame(frame):
+    """Encode an inputFeatures DataFrame into an (n, len(FEATURE_NAMES)) float32 matrix."""
+    if len(frame) == 0:
+        return np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+
+    frame = frame.reindex(columns=INPUT_COLUMNS)
+    columns = [
+        _number(frame['age'], 20.0),
+        (frame['gender'] == 'Male').astype(float),
+        (frame['gender'] == 'Female').astype(float),
+        (frame['nationality'].fillna('Indian') != 'Indian').astype(float),
+        _number(frame['currentCGPA']) / 4.0,
+        _number(frame['attendanceRate'], 100.0) / 100.0,
+        _number(frame['semester'], 1.0) / 8.0,
+        _ordinal(frame['feeStatus'], FEE_STATUSES),
+        _flag(frame['hasScholarship']),
+        _ordinal(frame['fatherEducation'], EDUCATION_LEVELS),
+        _ordinal(frame['motherEducation'], EDUCATION_LEVELS),
+        _number(frame['disciplinaryIssues']),
+        _flag(frame['specialNeeds']),
+        _flag(frame['displaced']),
+        _number(frame['previousGPA']) / 4.0,
+        frame['attendanceTrend'].map(TRENDS).fillna(0.0).astype(float),
+        frame['gradeTrend'].map(TRENDS).fillna(0.0).astype(float),
+    ]
+    return np.column_stack([column.to_numpy() for column in columns]).astype(np.float32)
+
+
+def encode(instances):
+    """Encode a list of inputFeatures dicts into an (n, len(FEATURE_NAMES)) float32 matrix."""
+    return encode_frame(pd.DataFrame.from_records(instances or []))
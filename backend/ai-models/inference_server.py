@@ -0,0 +1,287 @@
+"""Long-lived HLRNN inference process.
+
+Started by the Node InferencePool and kept running, so the interpreter and
+the model (the NumPy bundle, or TensorFlow and the Keras model) are loaded
+once instead of per prediction.
+
+Protocol: newline-delimited JSON. Requests arrive on stdin as
+``{"id": 1, "method": "predict", "params": {"instances": [...]}}`` and each gets
+exactly one response line on stdout, ``{"id": 1, "result": {...}}`` or
+``{"id": 1, "error": "..."}``. ``predict_students`` takes ``{"studentIds": [...]}``
+instead and reads the features itself from the feature store (feature_store),
+returning them alongside the probabilities; with ``"changedOnly": true`` it
+skips students already scored from their current vectors by this model, and
+``"explain": "approximate"`` adds featureImportance for each student. ``explain``
+returns attributions alone (``"mode": "exact"`` for on-demand views). With
+``SEQUENCE_CACHE=on`` and a recurrent model, ``predict_students`` scores each
+student's weekly history from the sequence cache (sequence_cache), synced at
+most every ``SEQUENCE_CACHE_SYNC_SECONDS``; explanations stay on the current
+feature vectors. After
+loading and warming up the model, the server announces itself with
+``{"type": "ready", ...}`` (or ``{"type": "ready", "error": ...}`` and exits).
+
+The model comes from the registry (model_registry). A watcher thread follows
+the registry's active version: a new version is loaded and warmed up in the
+background while requests keep being served, then swapped in atomically and
+announced with ``{"type": "model", ...}``. Each request runs entirely on the
+model that was active when it started. Versions are activated with
+``python model_registry.py activate <version>``.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import feature_engineering
+from explanations import BACKGROUND_SIZE, ExplanationEngine
+from feature_store import FeatureStore
+from features import FEATURE_NAMES, encode
+from model_registry import ModelRegistry
+from sequence_cache import SequenceCache
+
+WARMUP_BATCH = 64
+REGISTRY_POLL_SECONDS = float(os.environ.get('HLRNN_REGISTRY_POLL_SECONDS', 30))
+SEQUENCE_CACHE = os.environ.get('SEQUENCE_CACHE', 'off').lower() == 'on'
+SEQUENCE_SYNC_SECONDS = float(os.environ.get('SEQUENCE_CACHE_SYNC_SECONDS', 10))
+
+
+def open_protocol_stream():
+    """Keep the real stdout for protocol messages and send stray prints to stderr."""
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1)
+    sys.stdout = sys.stderr
+    return stream
+
+
+def warm_up(runtime):
+    """Run synthetic batches so the first real request does not pay lazy initialisation."""
+    rng = np.random.default_rng(0)
+    for rows in (1, WARMUP_BATCH):
+        runtime.predict(rng.random((rows, len(FEATURE_NAMES)), dtype=np.float32))
+
+
+class LoadedModel:
+    """A warmed-up runtime and the explanation engine fitted to it."""
+
+    def __init__(self, runtime, registry_version=None):
+        self.runtime = runtime
+        self.registry_version = registry_version
+        self.explainer = None
+
+    def info(self):
+        return {
+            'modelVersion': self.runtime.version,
+            'modelType': self.runtime.model_type,
+            'runtime': self.runtime.runtime,
+        }
+
+
+class InferenceServer:
+
+    def __init__(self, model, out, registry=None):
+        self.model = model
+        self.out = out
+        self.registry = registry or ModelRegistry()
+        self._store = None
+        self._sequences = None
+        self._synced_at = None
+        self._send_lock = threading.Lock()
+        self._failed_version = None
+
+    @property
+    def store(self):
+        # Connected on first use so servers only scoring instances never need MongoDB
+        if self._store is None:
+            self._store = FeatureStore(feature_engineering.connect())
+        return self._store
+
+    def sequence_tensor(self, model, student_ids, matrix):
+        """Weekly input sequences for ``student_ids``, or None to score the static vectors."""
+        if not (SEQUENCE_CACHE and model.runtime.sequence_input and len(matrix)):
+            return None
+        if self._sequences is None:
+            self._sequences = SequenceCache(self.store.db)
+        if not self._sequences.exists():
+            return None
+        try:
+            if self._synced_at is None or time.monotonic() - self._synced_at >= SEQUENCE_SYNC_SECONDS:
+                self._sequences.sync()
+                self._synced_at = time.monotonic()
+            tensor, _ = self._sequences.tensor(student_ids, matrix)
+        except RuntimeError as error:
+            print('Sequence cache unavailable, scoring static features: %s' % error, file=sys.stderr)
+            return None
+        return tensor
+
+    def explainer(self, model, fallback_background):
+        # Fitted once per model on stored vectors; until enough exist, the batch itself is the background
+        if model.explainer is None:
+            background = self.store.sample(BACKGROUND_SIZE)
+            if len(background) < 2:
+                return ExplanationEngine(model.runtime, fallback_background)
+            model.explainer = ExplanationEngine(model.runtime, background)
+        return model.explainer
+
+    def send(self, message):
+        with self._send_lock:
+            self.out.write(json.dumps(message, separators=(',', ':')) + '\n')
+            self.out.flush()
+
+    def score(self, model, matrix, tensor=None):
+        started = time.perf_counter()
+        if tensor is not None:
+            probabilities = model.runtime.predict_sequences(tensor)
+        else:
+            probabilities = model.runtime.predict(matrix) if len(matrix) else np.zeros(0)
+        return {
+            'probabilities': [round(float(p), 6) for p in probabilities],
+            'modelVersion': model.runtime.version,
+            'modelType': model.runtime.model_type,
+            'inferenceMs': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def predict(self, model, params):
+        return self.score(model, encode(params.get('instances', [])))
+
+    def features(self, model, params):
+        frame, _ = self.store.load(params.get('studentIds', []))
+        return {
+            'studentIds': list(frame.index),
+            'features': feature_engineering.to_records(frame[feature_engineering.INPUT_FEATURES]),
+            'featureSetVersion': self.store.version,
+        }
+
+    def predict_students(self, model, params):
+        started = time.perf_counter()
+        frame, matrix = self.store.load(params.get('studentIds', []))
+        unchanged = []
+        if params.get('changedOnly'):
+            mask = self.store.needs_scoring(frame, model.runtime.version)
+            unchanged = list(frame.index[~mask])
+            frame, matrix = frame[mask], matrix[mask]
+        tensor = self.sequence_tensor(model, list(frame.index), matrix)
+        feature_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        result = self.score(model, matrix, tensor)
+        result.update({
+            'studentIds': list(frame.index),
+            'unchangedIds': unchanged,
+            'features': feature_engineering.to_records(frame[feature_engineering.INPUT_FEATURES]),
+            'featureSetVersion': self.store.version,
+            'featureMs': feature_ms,
+            'sequenceWeeks': tensor.shape[1] if tensor is not None else None,
+        })
+        mode = params.get('explain')
+        # The approximate surrogate only describes static-vector scores; sequence
+        # scores are left to the rules here and explained exactly on demand
+        if mode and (tensor is None or mode == 'exact'):
+            started = time.perf_counter()
+            result['featureImportance'] = self.attributions(model, matrix, tensor, mode)
+            result['explanationMethod'] = mode
+            result['explanationMs'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def explain(self, model, params):
+        frame, matrix = self.store.load(params.get('studentIds', []))
+        mode = params.get('mode', 'approximate')
+        tensor = self.sequence_tensor(model, list(frame.index), matrix)
+        if tensor is not None:
+            mode = 'exact'
+        return {
+            'studentIds': list(frame.index),
+            'featureImportance': self.attributions(model, matrix, tensor, mode),
+            'explanationMethod': mode,
+            'modelVersion': model.runtime.version,
+        }
+
+    def attributions(self, model, matrix, tensor, mode):
+        """featureImportance for the input that was scored: the sequences when a tensor was used."""
+        explainer = self.explainer(model, matrix)
+        if tensor is not None:
+            return explainer.explain_sequences(tensor)
+        return explainer.explain(matrix, mode)
+
+    def handle(self, request):
+        # Everything below runs on the model active when the request arrived
+        model = self.model
+        method = request.get('method')
+        params = request.get('params') or {}
+        if method == 'predict':
+            return self.predict(model, params)
+        if method == 'predict_students':
+            return self.predict_students(model, params)
+        if method == 'features':
+            return self.features(model, params)
+        if method == 'explain':
+            return self.explain(model, params)
+        if method == 'ping':
+            return {'pid': os.getpid(), **model.info()}
+        raise ValueError('Unknown method: %s' % method)
+
+    def swap_to(self, version):
+        """Load and warm ``version`` off the request path, then make it the active model."""
+        try:
+            runtime = self.registry.load(version)
+            warm_up(runtime)
+        except Exception as error:
+            # Keep serving the current model; retry only once the active version changes again
+            self._failed_version = version
+            print('Model %s failed to load: %s' % (version, error), file=sys.stderr)
+            self.send({'type': 'model', 'error': '%s: %s' % (type(error).__name__, error), 'version': version})
+            return
+
+        self.model = LoadedModel(runtime, version)
+        self._failed_version = None
+        self.send({'type': 'model', 'pid': os.getpid(), **self.model.info()})
+
+    def watch_registry(self, interval=REGISTRY_POLL_SECONDS):
+        while True:
+            time.sleep(interval)
+            try:
+                version = self.registry.active_version()
+            except ValueError as error:
+                print('Ignoring registry ACTIVE file: %s' % error, file=sys.stderr)
+                continue
+            if version and version not in (self.model.registry_version, self._failed_version):
+                self.swap_to(version)
+
+    def serve(self, lines):
+        for line in lines:
+            if not line.strip():
+                continue
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get('id')
+                self.send({'id': request_id, 'result': self.handle(request)})
+            except Exception as error:  # report and keep serving
+                self.send({'id': request_id, 'error': '%s: %s' % (type(error).__name__, error)})
+
+
+def main():
+    out = open_protocol_stream()
+    registry = ModelRegistry()
+    try:
+        version, runtime = registry.load_active()
+        warm_up(runtime)
+    except Exception as error:
+        out.write(json.dumps({'type': 'ready', 'error': '%s: %s' % (type(error).__name__, error)}) + '\n')
+        out.flush()
+        sys.exit(1)
+
+    server = InferenceServer(LoadedModel(runtime, version), out, registry)
+    threading.Thread(target=server.watch_registry, name='registry-watcher', daemon=True).start()
+    server.send({
+        'type': 'ready',
+        'pid': os.getpid(),
+        **server.model.info(),
+        'features': FEATURE_NAMES,
+    })
+    server.serve(sys.stdin)
+
+
+if __name__ == '__main__':
+    main()
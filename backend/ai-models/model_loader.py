@@ -0,0 +1,84 @@
+"""Loading the trained HLRNN model for inference.
+
+Two runtimes: the exported NumPy bundle (``.npz``, see export_model.py), which
+needs no TensorFlow, and the original Keras ``.h5``. ``HLRNN_RUNTIME`` picks
+one (``auto``, ``numpy`` or ``keras``); ``auto`` uses the bundle when one sits
+next to the model.
+"""
+
+import json
+import os
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'hlrnn.h5')
+
+
+class KerasRuntime:
+    """Keras model wrapper returning dropout probabilities for a feature matrix."""
+
+    model_type = 'HLRNN/keras'
+    runtime = 'keras'
+
+    def __init__(self, model, version):
+        self.model = model
+        self.version = version
+        # Recurrent models expect (batch, timesteps, features); static features form one step
+        self.sequence_input = len(model.input_shape) == 3
+
+    def predict(self, matrix):
+        inputs = matrix[:, None, :] if self.sequence_input else matrix
+        output = np.asarray(self.model(inputs, training=False))
+        # Sigmoid head gives (n, 1); softmax head gives (n, 2) with dropout last
+        return output[:, -1].astype(np.float64)
+
+    def predict_sequences(self, tensor):
+        """Probabilities for (n, weeks, features) sequences; static models see the last week."""
+        if not self.sequence_input:
+            return self.predict(tensor[:, -1, :])
+        return np.asarray(self.model(tensor, training=False))[:, -1].astype(np.float64)
+
+
+def metadata_path(model_path):
+    """Metadata sidecar of a model artifact: ``<artifact>.json`` (e.g. ``hlrnn.npz.json``)."""
+    return model_path + '.json'
+
+
+def read_version(model_path):
+    """Model version from the metadata sidecar, else the file name and mtime."""
+    path = metadata_path(model_path)
+    if os.path.exists(path):
+        with open(path) as handle:
+            version = json.load(handle).get('version')
+        if version:
+            return str(version)
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return '%s-%d' % (name, int(os.path.getmtime(model_path)))
+
+
+def load_keras_model(model_path):
+    # TensorFlow is only imported by processes that actually load a Keras model
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    from tensorflow import keras
+
+    return keras.models.load_model(model_path, compile=False)
+
+
+def resolve_runtime(model_path, runtime='auto'):
+    """(runtime, path) to load for ``model_path`` under the ``HLRNN_RUNTIME`` setting."""
+    bundle_path = model_path if model_path.endswith('.npz') else os.path.splitext(model_path)[0] + '.npz'
+    if runtime == 'numpy' or (runtime == 'auto' and os.path.exists(bundle_path)):
+        return 'numpy', bundle_path
+    return 'keras', model_path
+
+
+def load_model(model_path=None):
+    model_path = model_path or os.environ.get('HLRNN_MODEL_PATH', DEFAULT_MODEL_PATH)
+    runtime, path = resolve_runtime(model_path, os.environ.get('HLRNN_RUNTIME', 'auto'))
+    if not os.path.exists(path):
+        raise FileNotFoundError('HLRNN model not found at %s' % path)
+
+    if runtime == 'numpy':
+        from numpy_runtime import NumpyRuntime
+        return NumpyRuntime.load(path)
+    return KerasRuntime(load_keras_model(path), read_version(path))
@@ -0,0 +1,168 @@
+"""Local registry of versioned HLRNN artifacts.
+
+Layout (``HLRNN_REGISTRY_DIR``, default ``models/registry``)::
+
+    registry/
+        ACTIVE                  # name of the active version
+        <version>/
+            metadata.json       # version, artifact, sha256, registeredAt, ...
+            hlrnn.npz | hlrnn.h5
+
+Inference servers load the active version at startup and watch ``ACTIVE``;
+flipping it (``python model_registry.py activate <version>``) makes running
+servers load, warm up and swap to the new version without a restart. With no
+active version the servers fall back to ``HLRNN_MODEL_PATH``.
+
+Usage:
+    python model_registry.py list
+    python model_registry.py register <artifact> [--version V] [--activate]
+    python model_registry.py activate <version>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from model_loader import load_model, metadata_path, read_version
+
+DEFAULT_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'registry')
+ACTIVE_FILE = 'ACTIVE'
+METADATA_FILE = 'metadata.json'
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9._-]+$')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_version(version):
+    """``version`` if it is safe to use as a directory name, else ValueError."""
+    if not isinstance(version, str) or not VERSION_PATTERN.match(version) or '..' in version:
+        raise ValueError('Invalid model version: %r' % (version,))
+    return version
+
+
+class ModelRegistry:
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('HLRNN_REGISTRY_DIR', DEFAULT_REGISTRY_DIR)
+
+    def metadata(self, version):
+        path = os.path.join(self.root, check_version(version), METADATA_FILE)
+        if not os.path.exists(path):
+            raise KeyError('Model version %s is not registered' % version)
+        with open(path) as handle:
+            return json.load(handle)
+
+    def versions(self):
+        """Metadata of every registered version, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            if VERSION_PATTERN.match(name) and '..' not in name and os.path.exists(os.path.join(self.root, name, METADATA_FILE)):
+                found.append(self.metadata(name))
+        return sorted(found, key=lambda metadata: metadata.get('registeredAt', 0))
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as handle:
+                version = handle.read().strip()
+        except FileNotFoundError:
+            return None
+        return check_version(version) if version else None
+
+    def register(self, artifact_path, version=None, activate=False):
+        """Copy an artifact (and its metadata sidecar) into the registry under ``version``."""
+        version = check_version(version or read_version(artifact_path))
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError('Model version %s is already registered' % version)
+
+        os.makedirs(target)
+        artifact = os.path.basename(artifact_path)
+        shutil.copy2(artifact_path, os.path.join(target, artifact))
+        sidecar = metadata_path(artifact_path)
+        if os.path.exists(sidecar):
+            shutil.copy2(sidecar, metadata_path(os.path.join(target, artifact)))
+
+        metadata = {
+            'version': version,
+            'artifact': artifact,
+            'runtime': 'numpy' if artifact.endswith('.npz') else 'keras',
+            'sha256': _sha256(artifact_path),
+            'sizeBytes': os.path.getsize(artifact_path),
+            'registeredAt': time.time(),
+        }
+        with open(os.path.join(target, METADATA_FILE), 'w') as handle:
+            json.dump(metadata, handle, indent=2)
+
+        if activate:
+            self.activate(version)
+        return metadata
+
+    def activate(self, version):
+        """Point ACTIVE at ``version`` with an atomic rename; watchers pick it up."""
+        self.metadata(version)
+        handle, temporary = tempfile.mkstemp(dir=self.root)
+        with os.fdopen(handle, 'w') as stream:
+            stream.write(version + '\n')
+        os.replace(temporary, os.path.join(self.root, ACTIVE_FILE))
+
+    def load(self, version):
+        """Runtime for a registered version, versioned by the registry."""
+        metadata = self.metadata(version)
+        runtime = load_model(os.path.join(self.root, version, metadata['artifact']))
+        runtime.version = version
+        return runtime
+
+    def load_active(self):
+        """(version, runtime) of the active version, or (None, runtime) from HLRNN_MODEL_PATH."""
+        version = self.active_version()
+        if version is None:
+            return None, load_model()
+        return version, self.load(version)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the local HLRNN model registry.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list')
+    register = commands.add_parser('register')
+    register.add_argument('artifact')
+    register.add_argument('--version')
+    register.add_argument('--activate', action='store_true')
+    activate = commands.add_parser('activate')
+    activate.add_argument('version')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry()
+    try:
+        if args.command == 'list':
+            active = registry.active_version()
+            for metadata in registry.versions():
+                marker = '*' if metadata['version'] == active else ' '
+                print('%s %s  %s  %s' % (marker, metadata['version'], metadata['runtime'], metadata['artifact']))
+        elif args.command == 'register':
+            print(json.dumps(registry.register(args.artifact, args.version, args.activate), indent=2))
+        else:
+            registry.activate(args.version)
+            print('Active model version: %s' % args.version)
+    except (KeyError, ValueError, OSError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""Pure-NumPy HLRNN runtime.
+
+Runs a model exported by export_model.py (an ``.npz`` weight bundle plus a
+layer spec) with a hand-written forward pass, so inference workers need
+neither TensorFlow nor the Keras ``.h5`` file: startup is a file read and the
+resident set is the weights. Supported layers are the ones the HLRNN stack
+uses: Dense, SimpleRNN, LSTM, GRU, Bidirectional, BatchNormalization,
+Activation, Flatten, Masking and inference-time no-ops such as Dropout. As in
+Keras, a Masking layer's mask is carried to the recurrent layers, which hold
+their state over masked (zero-padded) steps.
+
+Bundles may store kernels as float16 or as int8 with a float32 scale per
+output unit; they are dequantized to float32 once at load.
+"""
+
+import json
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    shifted = np.exp(x - x.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    'tanh': np.tanh,
+    'softmax': _softmax,
+    'elu': lambda x: np.where(x > 0, x, np.expm1(x)),
+    'selu': lambda x: 1.0507009873554805 * np.where(x > 0, x, 1.6732632423543772 * np.expm1(x)),
+    'swish': lambda x: x * _sigmoid(x),
+    'silu': lambda x: x * _sigmoid(x),
+}
+
+
+def dense(spec, weights, x):
+    y = x @ weights['kernel']
+    if 'bias' in weights:
+        y = y + weights['bias']
+    return ACTIVATIONS[spec['activation']](y)
+
+
+def _keep(mask, new, old):
+    if isinstance(new, tuple):
+        return tuple(np.where(mask, n, o) for n, o in zip(new, old))
+    return np.where(mask, new, old)
+
+
+def _run_steps(spec, x, step, state, mask=None):
+    """Unroll ``step(x_t, state) -> (h_t, state)`` over (batch, time, features).
+
+    Where ``mask`` (batch, time) is False the state is carried over unchanged and
+    the previous output repeated.
+    """
+    steps = range(x.shape[1] - 1, -1, -1) if spec.get('go_backwards') else range(x.shape[1])
+    outputs = []
+    for t in steps:
+        h, new_state = step(x[:, t, :], state)
+        if mask is None:
+            state = new_state
+        else:
+            active = mask[:, t, None]
+            h = _keep(active, h, outputs[-1] if outputs else np.zeros_like(h))
+            state = _keep(active, new_state, state)
+        outputs.append(h)
+    return np.stack(outputs, axis=1) if spec['return_sequences'] else outputs[-1]
+
+
+def simple_rnn(spec, weights, x, mask=None):
+    activation = ACTIVATIONS[spec['activation']]
+    inputs = x @ weights['kernel'] + weights.get('bias', 0.0)
+    h0 = np.zeros((x.shape[0], spec['units']), dtype=np.float32)
+
+    def step(x_t, h):
+        h = activation(x_t + h @ weights['recurrent_kernel'])
+        return h, h
+    return _run_steps(spec, inputs, step, h0, mask)
+
+
+def lstm(spec, weights, x, mask=None):
+    units = spec['units']
+    activation = ACTIVATIONS[spec['activation']]
+    recurrent_activation = ACTIVATIONS[spec['recurrent_activation']]
+    inputs = x @ weights['kernel'] + weights.get('bias', 0.0)
+    zeros = np.zeros((x.shape[0], units), dtype=np.float32)
+
+    def step(x_t, state):
+        h, c = state
+        z = x_t + h @ weights['recurrent_kernel']
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        c = f * c + i * activation(z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        h = o * activation(c)
+        return h, (h, c)
+    return _run_steps(spec, inputs, step, (zeros, zeros), mask)
+
+
+def gru(spec, weights, x, mask=None):
+    units = spec['units']
+    activation = ACTIVATIONS[spec['activation']]
+    recurrent_activation = ACTIVATIONS[spec['recurrent_activation']]
+    bias = weights.get('bias')
+    reset_after = spec.get('reset_after', True)
+    if bias is None:
+        input_bias, recurrent_bias = 0.0, 0.0
+    elif reset_after:
+        input_bias, recurrent_bias = bias[0], bias[1]
+    else:
+        input_bias, recurrent_bias = bias, 0.0
+
+    inputs = x @ weights['kernel'] + input_bias
+    recurrent_kernel = weights['recurrent_kernel']
+    h0 = np.zeros((x.shape[0], units), dtype=np.float32)
+
+    def step(x_t, h):
+        if reset_after:
+            inner = h @ recurrent_kernel + recurrent_bias
+            z = recurrent_activation(x_t[:, :units] + inner[:, :units])
+            r = recurrent_activation(x_t[:, units:2 * units] + inner[:, units:2 * units])
+            candidate = activation(x_t[:, 2 * units:] + r * inner[:, 2 * units:])
+        else:
+            inner = h @ recurrent_kernel[:, :2 * units]
+            z = recurrent_activation(x_t[:, :units] + inner[:, :units])
+            r = recurrent_activation(x_t[:, units:2 * units] + inner[:, units:])
+            candidate = activation(x_t[:, 2 * units:] + (r * h) @ recurrent_kernel[:, 2 * units:])
+        h = z * h + (1.0 - z) * candidate
+        return h, h
+    return _run_steps(spec, inputs, step, h0, mask)
+
+
+def bidirectional(spec, weights, x, mask=None):
+    forward = LAYERS[spec['layer']['type']](spec['layer'], weights['forward'], x, mask)
+    backward = LAYERS[spec['layer']['type']](
+        {**spec['layer'], 'go_backwards': True}, weights['backward'], x, mask
+    )
+    if spec['layer']['return_sequences']:
+        backward = backward[:, ::-1, :]
+    merge = spec.get('merge_mode', 'concat')
+    if merge == 'concat':
+        return np.concatenate([forward, backward], axis=-1)
+    if merge == 'sum':
+        return forward + backward
+    if merge == 'mul':
+        return forward * backward
+    if merge == 'ave':
+        return (forward + backward) / 2.0
+    raise ValueError('Unsupported Bidirectional merge_mode: %s' % merge)
+
+
+def batch_normalization(spec, weights, x):
+    scale = weights.get('gamma', 1.0) / np.sqrt(weights['moving_variance'] + spec['epsilon'])
+    return (x - weights['moving_mean']) * scale + weights.get('beta', 0.0)
+
+
+LAYERS = {
+    'Dense': dense,
+    'SimpleRNN': simple_rnn,
+    'LSTM': lstm,
+    'GRU': gru,
+    'Bidirectional': bidirectional,
+    'BatchNormalization': batch_normalization,
+    'Activation': lambda spec, weights, x: ACTIVATIONS[spec['activation']](x),
+    'Flatten': lambda spec, weights, x: x.reshape(x.shape[0], -1),
+    'Identity': lambda spec, weights, x: x,
+    'Masking': lambda spec, weights, x: x,
+}
+
+# Layers that consume the mask of a preceding Masking layer
+MASKED_LAYERS = {'SimpleRNN', 'LSTM', 'GRU', 'Bidirectional'}
+
+
+def _dequantize(arrays, prefix):
+    """float32 array stored under ``prefix`` (int8 + per-unit scale, float16 or float32)."""
+    value = arrays[prefix]
+    if value.dtype == np.int8:
+        return value.astype(np.float32) * arrays[prefix + '.scale']
+    return value.astype(np.float32)
+
+
+def load_bundle(path):
+    """(spec, per-layer weight dicts) from an exported ``.npz`` bundle."""
+    with np.load(path, allow_pickle=False) as arrays:
+        spec = json.loads(str(arrays['__spec__']))
+        names = [name for name in arrays.files if name != '__spec__' and not name.endswith('.scale')]
+        layers = []
+        for index, layer in enumerate(spec['layers']):
+            prefix = 'l%d.' % index
+
+            def weights_for(sub_prefix):
+                return {
+                    name[len(sub_prefix):]: _dequantize(arrays, name)
+                    for name in names
+                    if name.startswith(sub_prefix) and '.' not in name[len(sub_prefix):]
+                }
+
+            if layer['type'] == 'Bidirectional':
+                layers.append({
+                    'forward': weights_for(prefix + 'forward.'),
+                    'backward': weights_for(prefix + 'backward.'),
+                })
+            else:
+                layers.append(weights_for(prefix))
+    return spec, layers
+
+
+class NumpyRuntime:
+    """Exported HLRNN returning dropout probabilities for a feature matrix."""
+
+    def __init__(self, spec, layers):
+        self.spec = spec
+        self.layers = layers
+        self.precision = spec.get('precision', 'float32')
+        self.runtime = 'numpy-%s' % self.precision
+        self.model_type = '%s/%s' % (spec.get('modelType', 'HLRNN'), self.runtime)
+        # Quantized bundles give slightly different scores, so they are versioned apart
+        source_version = str(spec.get('sourceVersion', 'unknown'))
+        self.version = source_version if self.precision == 'float32' else '%s-%s' % (source_version, self.precision)
+        self.sequence_input = spec.get('inputRank', 2) == 3
+
+    @classmethod
+    def load(cls, path):
+        return cls(*load_bundle(path))
+
+    def forward(self, inputs):
+        x = inputs.astype(np.float32)
+        mask = None
+        for layer, weights in zip(self.spec['layers'], self.layers):
+            if layer['type'] == 'Masking':
+                mask = np.any(x != layer['mask_value'], axis=-1)
+                x = x * mask[..., None]
+            elif layer['type'] in MASKED_LAYERS and mask is not None:
+                x = LAYERS[layer['type']](layer, weights, x, mask)
+                returns_sequences = layer.get('layer', layer)['return_sequences']
+                mask = mask if returns_sequences else None
+            else:
+                x = LAYERS[layer['type']](layer, weights, x)
+        return x
+
+    def predict(self, matrix):
+        inputs = matrix[:, None, :] if self.sequence_input else matrix
+        output = self.forward(inputs)
+        # Sigmoid head gives (n, 1); softmax head gives (n, 2) with dropout last
+        return output[:, -1].astype(np.float64)
+
+    def predict_sequences(self, tensor):
+        """Probabilities for (n, weeks, features) sequences; static models see the last week."""
+        if not self.sequence_input:
+            return self.predict(tensor[:, -1, :])
+        return self.forward(tensor)[:, -1].astype(np.float64)
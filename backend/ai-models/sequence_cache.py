@@ -0,0 +1,343 @@
+"""Persistent weekly sequence cache for HLRNN inputs.
+
+Keeps every student's attendance and grade history as fixed-width weekly bins
+in memory-mapped arrays, so scoring and training read ready-made sequences
+instead of re-aggregating each student's history::
+
+    <SEQUENCE_CACHE_DIR>/
+        counters.npy    (capacity, weeks, CHANNELS) float32 weekly counters (training_data channels)
+        ids.npy         (capacity,)                 student id of each row
+        meta.json       origin, weeks, count, capacity, generation, event cursor
+    <SEQUENCE_CACHE_DIR>.lock
+
+``build`` aggregates the history once. After that, ``sync`` folds in the
+SequenceEvent log the Node models append to (with ``SEQUENCE_CACHE=on``): signed
+attendance and grade deltas go straight into their weekly bin, and grade
+``resync`` events re-aggregate that student's grade bins only. When the current
+week runs past the last bin, the window slides and the weeks dropped off the
+front are folded into the first bin, so cumulative rates keep the full history.
+
+Several inference workers share one cache: writers (sync, growth, build) hold
+an exclusive lock on the ``.lock`` file, readers a shared one, and readers
+reopen the arrays when ``meta.json`` reports a new generation. Rebuild the
+cache after bulk rebuilds of attendance (rebuildAttendanceSummaries) or when
+it falls further behind than the event log's retention.
+
+Usage:
+    python sequence_cache.py build [--years 5]
+    python sequence_cache.py sync
+    python sequence_cache.py status
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import ObjectId
+
+import feature_engineering
+from training_data import (
+    CHANNELS, GRADE_COUNT, GRADE_POINTS, PERCENTAGE, PRESENT, TOTAL,
+    DatasetBuilder, open_array, sequences, trim_leading,
+)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sequences')
+COUNTERS_FILE = 'counters.npy'
+IDS_FILE = 'ids.npy'
+META_FILE = 'meta.json'
+MIN_CAPACITY = 1024
+ROW_CHUNK = 4096
+# Events younger than this may still be overtaken by concurrent writers' ObjectIds
+EVENT_SETTLE_SECONDS = 5
+EVENT_RETENTION_DAYS = 30  # SequenceEvent TTL
+EVENT_CHANNELS = [PRESENT, TOTAL, GRADE_POINTS, PERCENTAGE, GRADE_COUNT]
+EVENT_FIELDS = ['present', 'total', 'gradePoints', 'percentage', 'grades']
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def window(counters, weeks):
+    """The last ``weeks`` bins of (n, T, CHANNELS) counters: earlier bins folded into the first, short ones left-padded."""
+    if counters.shape[1] >= weeks:
+        result = counters[:, -weeks:].copy()
+        result[:, 0] += counters[:, :-weeks].sum(axis=1)
+        return result
+    result = np.zeros((counters.shape[0], weeks, counters.shape[2]), dtype=counters.dtype)
+    result[:, weeks - counters.shape[1]:] = counters
+    return result
+
+
+class SequenceCache:
+
+    def __init__(self, db, directory=None):
+        self.db = db
+        self.directory = (directory or os.environ.get('SEQUENCE_CACHE_DIR', DEFAULT_CACHE_DIR)).rstrip(os.sep)
+        self.meta = None
+        self.counters = None
+        self.ids = None
+        self.index = {}
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, META_FILE))
+
+    @contextmanager
+    def _lock(self, exclusive):
+        os.makedirs(os.path.dirname(self.directory) or '.', exist_ok=True)
+        with open(self.directory + '.lock', 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Re-read meta.json; reopen the arrays on a new generation and index appended rows."""
+        with open(os.path.join(self.directory, META_FILE)) as handle:
+            meta = json.load(handle)
+        if self.meta is None or meta['generation'] != self.meta['generation']:
+            self.counters = np.load(os.path.join(self.directory, COUNTERS_FILE), mmap_mode='r+')
+            self.ids = np.load(os.path.join(self.directory, IDS_FILE), mmap_mode='r+')
+            self.index = {}
+        for row in range(len(self.index), meta['count']):
+            self.index[str(self.ids[row])] = row
+        self.meta = meta
+
+    def _write_meta(self):
+        temporary = os.path.join(self.directory, META_FILE + '.tmp')
+        with open(temporary, 'w') as handle:
+            json.dump(self.meta, handle, indent=2)
+        os.replace(temporary, os.path.join(self.directory, META_FILE))
+
+    @property
+    def origin(self):
+        return datetime.fromisoformat(self.meta['origin'])
+
+    def current_week(self, now=None):
+        return ((now or _utcnow()) - self.origin).days // 7
+
+    def end(self, now=None):
+        """Exclusive end of the current week's bin."""
+        with self._lock(exclusive=False):
+            self._refresh()
+            return self.origin + timedelta(weeks=min(self.current_week(now), self.meta['weeks'] - 1) + 1)
+
+    def build(self, years=5, chunk_size=2000, now=None):
+        """Aggregate the full history into a fresh cache and swap it in."""
+        cutoff = now or _utcnow()
+        staging = self.directory + '.staging'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        keys = [str(student['_id']) for student in self.db.students.find({}, {'_id': 1}).sort('_id', 1)]
+        capacity = max(len(keys) + len(keys) // 4, MIN_CAPACITY)
+        # Records created up to the cutoff are aggregated; the event log covers the rest
+        builder = DatasetBuilder(self.db, staging, years, chunk_size, now=cutoff + timedelta(weeks=1), cutoff=cutoff)
+
+        counters = open_array(staging, COUNTERS_FILE, np.float32, (capacity, builder.weeks, CHANNELS))
+        ids = open_array(staging, IDS_FILE, 'U24', (capacity,))
+        ids[:len(keys)] = keys
+        index = {key: row for row, key in enumerate(keys)}
+        if os.environ.get('ATTENDANCE_STORAGE', 'document').lower() == 'bucketed':
+            builder.add_bucketed_attendance(counters, index)
+        else:
+            builder.add_attendance(counters, index)
+        builder.add_grades(counters, index)
+        counters.flush()
+        ids.flush()
+        del counters, ids
+
+        meta = {
+            'origin': builder.start.isoformat(),
+            'weeks': builder.weeks,
+            'count': len(keys),
+            'capacity': capacity,
+            'generation': uuid.uuid4().hex,
+            'cursor': str(ObjectId.from_datetime(cutoff)),
+            'builtAt': cutoff.isoformat(),
+            'syncedAt': cutoff.isoformat(),
+        }
+        with open(os.path.join(staging, META_FILE), 'w') as handle:
+            json.dump(meta, handle, indent=2)
+
+        with self._lock(exclusive=True):
+            previous = self.directory + '.previous'
+            shutil.rmtree(previous, ignore_errors=True)
+            if os.path.exists(self.directory):
+                os.replace(self.directory, previous)
+            os.replace(staging, self.directory)
+            shutil.rmtree(previous, ignore_errors=True)
+        self.meta = None
+        return meta
+
+    def _grow(self, needed):
+        """Reallocate the arrays with room for ``needed`` rows (doubling)."""
+        capacity = max(needed, 2 * self.meta['capacity'])
+        count = self.meta['count']
+        for name, dtype, shape in (
+            (COUNTERS_FILE, np.float32, (capacity, self.meta['weeks'], CHANNELS)),
+            (IDS_FILE, 'U24', (capacity,)),
+        ):
+            source = np.load(os.path.join(self.directory, name), mmap_mode='r')
+            target = open_array(self.directory, name + '.tmp.npy', dtype, shape)
+            for start in range(0, count, ROW_CHUNK):
+                target[start:start + ROW_CHUNK] = source[start:min(start + ROW_CHUNK, count)]
+            target.flush()
+            del source, target
+            os.replace(os.path.join(self.directory, name + '.tmp.npy'), os.path.join(self.directory, name))
+
+        self.meta.update({'capacity': capacity, 'generation': uuid.uuid4().hex})
+        self._write_meta()
+        self.meta = None
+        self._refresh()
+
+    def _rows(self, keys):
+        """Rows for student ``keys``, appending rows for students not in the cache yet."""
+        missing = list(dict.fromkeys(key for key in keys if key not in self.index))
+        if missing:
+            count = self.meta['count']
+            if count + len(missing) > self.meta['capacity']:
+                self._grow(count + len(missing))
+            self.ids[count:count + len(missing)] = missing
+            self.counters[count:count + len(missing)] = 0.0
+            for offset, key in enumerate(missing):
+                self.index[key] = count + offset
+            self.meta['count'] = count + len(missing)
+        return np.array([self.index[key] for key in keys], dtype=np.int64)
+
+    def _weeks(self, dates):
+        origin = np.datetime64(self.origin, 'ms')
+        weeks = (np.array(dates, dtype='datetime64[ms]') - origin) // np.timedelta64(7, 'D')
+        return np.clip(weeks.astype(np.int64), 0, self.meta['weeks'] - 1)
+
+    def _slide(self, now):
+        """Move the window forward so the current week is the last bin."""
+        weeks = self.meta['weeks']
+        shift = self.current_week(now) - weeks + 1
+        if shift <= 0:
+            return
+        kept = max(weeks - shift, 1)
+        for start in range(0, self.meta['count'], ROW_CHUNK):
+            end = min(start + ROW_CHUNK, self.meta['count'])
+            slid = np.zeros((end - start, weeks, CHANNELS), dtype=np.float32)
+            slid[:, :kept] = window(np.asarray(self.counters[start:end]), kept)
+            self.counters[start:end] = slid
+        self.meta['origin'] = (self.origin + timedelta(weeks=shift)).isoformat()
+
+    def _apply(self, events):
+        if not events:
+            return
+        rows = self._rows([str(event['studentId']) for event in events])
+        weeks = self._weeks([event['date'] for event in events])
+        deltas = np.array([[event.get(field, 0) or 0 for field in EVENT_FIELDS] for event in events], dtype=np.float32)
+        for column, channel in enumerate(EVENT_CHANNELS):
+            np.add.at(self.counters[:, :, channel], (rows, weeks), deltas[:, column])
+
+    def _resync_grades(self, keys, before):
+        """Re-aggregate the grade bins of ``keys`` from the Grade collection."""
+        rows = self._rows(keys)
+        for channel in (GRADE_POINTS, PERCENTAGE, GRADE_COUNT):
+            self.counters[rows, :, channel] = 0.0
+
+        grades = self.db.grades.find(
+            {'studentId': {'$in': [ObjectId(key) for key in keys]}, 'createdAt': {'$lt': before}},
+            {'studentId': 1, 'assessmentDate': 1, 'gradePoints': 1, 'percentage': 1},
+        )
+        self._apply([
+            {**grade, 'date': grade['assessmentDate'], 'grades': 1}
+            for grade in grades if grade.get('assessmentDate') is not None
+        ])
+
+    def sync(self, now=None):
+        """Fold new SequenceEvents into the bins; O(new events), not O(history)."""
+        now = now or _utcnow()
+        upper = now - timedelta(seconds=EVENT_SETTLE_SECONDS)
+        with self._lock(exclusive=True):
+            self._refresh()
+            cursor = ObjectId(self.meta['cursor'])
+            if cursor.generation_time.replace(tzinfo=None) < now - timedelta(days=EVENT_RETENTION_DAYS):
+                raise RuntimeError('Sequence cache is more than %d days behind; rebuild it' % EVENT_RETENTION_DAYS)
+            self._slide(now)
+
+            query = {'_id': {'$gt': cursor, '$lt': ObjectId.from_datetime(upper)}}
+            deltas, resync, consumed = [], set(), 0
+            for event in self.db.sequenceevents.find(query).sort('_id', 1).batch_size(5000):
+                consumed += 1
+                cursor = event['_id']
+                if event.get('resync'):
+                    resync.add(str(event['studentId']))
+                elif event.get('date') is not None:
+                    deltas.append(event)
+                if len(deltas) >= 50000:
+                    self._apply(deltas)
+                    deltas = []
+            self._apply(deltas)
+            # Resynced students' grade bins are rebuilt from the collection, which already includes their new grades
+            if resync:
+                self._resync_grades(sorted(resync), upper)
+
+            self.counters.flush()
+            self.meta.update({'cursor': str(cursor), 'syncedAt': now.isoformat()})
+            self._write_meta()
+        return {'events': consumed, 'resynced': len(resync), 'students': self.meta['count']}
+
+    def read(self, keys, weeks=None):
+        """(n, T, CHANNELS) counters for ``keys`` up to the current week; zeros for unknown students."""
+        keys = [str(key) for key in keys]
+        with self._lock(exclusive=False):
+            self._refresh()
+            current = min(self.current_week(), self.meta['weeks'] - 1)
+            rows = np.array([self.index.get(key, -1) for key in keys], dtype=np.int64)
+            counters = np.zeros((len(keys), current + 1, CHANNELS), dtype=np.float32)
+            known = np.flatnonzero(rows >= 0)
+            order = known[np.argsort(rows[known])]
+            counters[order] = self.counters[rows[order], :current + 1]
+        return counters if weeks is None else window(counters, weeks)
+
+    def tensor(self, keys, static, weeks=None):
+        """(X, mask) weekly HLRNN inputs for ``keys``, with ``static`` their current encoded features."""
+        X, mask = sequences(self.read(keys, weeks), static)
+        return trim_leading(X, mask)
+
+    def status(self):
+        with self._lock(exclusive=False):
+            self._refresh()
+            pending = self.db.sequenceevents.count_documents({'_id': {'$gt': ObjectId(self.meta['cursor'])}})
+            return {**self.meta, 'pendingEvents': pending}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the HLRNN sequence cache.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build')
+    build.add_argument('--years', type=float, default=5)
+    build.add_argument('--chunk-size', type=int, default=2000)
+    commands.add_parser('sync')
+    commands.add_parser('status')
+    args = parser.parse_args(argv)
+
+    cache = SequenceCache(feature_engineering.connect())
+    try:
+        if args.command == 'build':
+            result = cache.build(args.years, args.chunk_size)
+        elif args.command == 'sync':
+            result = cache.sync()
+        else:
+            result = cache.status()
+    except (FileNotFoundError, RuntimeError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
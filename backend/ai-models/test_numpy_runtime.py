@@ -0,0 +1,131 @@
+"""NumPy runtime checks on a tiny random HLRNN-shaped model (no TensorFlow needed).
+
+Run with ``python -m pytest test_numpy_runtime.py`` (or ``python -m unittest``)
+from ``backend/ai-models``.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from export_model import PARITY_TOLERANCE, parity_sequences, quantize
+from features import FEATURE_NAMES
+from model_loader import metadata_path, read_version
+from numpy_runtime import NumpyRuntime
+
+FEATURES = len(FEATURE_NAMES)
+UNITS = 6
+
+
+def tiny_model(seed=0):
+    """(spec, arrays): Masking → LSTM(6) → Dense(4, relu) → Dense(1, sigmoid), random weights."""
+    rng = np.random.default_rng(seed)
+
+    def weights(*shape):
+        return rng.normal(0.0, 0.5, shape).astype(np.float32)
+
+    spec = {
+        'format': 1,
+        'modelType': 'HLRNN',
+        'sourceVersion': 'test',
+        'precision': 'float32',
+        'inputRank': 3,
+        'features': FEATURE_NAMES,
+        'layers': [
+            {'type': 'Masking', 'mask_value': 0.0},
+            {'type': 'LSTM', 'units': UNITS, 'activation': 'tanh', 'recurrent_activation': 'sigmoid',
+             'return_sequences': False, 'go_backwards': False},
+            {'type': 'Dense', 'activation': 'relu'},
+            {'type': 'Dense', 'activation': 'sigmoid'},
+        ],
+    }
+    arrays = {
+        'l1.kernel': weights(FEATURES, 4 * UNITS),
+        'l1.recurrent_kernel': weights(UNITS, 4 * UNITS),
+        'l1.bias': weights(4 * UNITS),
+        'l2.kernel': weights(UNITS, 4),
+        'l2.bias': weights(4),
+        'l3.kernel': weights(4, 1),
+        'l3.bias': weights(1),
+    }
+    return spec, arrays
+
+
+def reference_predict(arrays, tensor):
+    """Keras semantics written out one student and one week at a time: masked
+    (all-zero) weeks are skipped, the last LSTM state feeds the dense head."""
+    def sigmoid(x):
+        return 1.0 / (1.0 + np.exp(-x))
+
+    kernel, recurrent, bias = (arrays['l1.' + name].astype(np.float64) for name in ('kernel', 'recurrent_kernel', 'bias'))
+    probabilities = []
+    for sequence in tensor.astype(np.float64):
+        h = np.zeros(UNITS)
+        c = np.zeros(UNITS)
+        for x in sequence:
+            if not np.any(x != 0.0):
+                continue
+            z = x @ kernel + h @ recurrent + bias
+            i, f, g, o = (z[k * UNITS:(k + 1) * UNITS] for k in range(4))
+            c = sigmoid(f) * c + sigmoid(i) * np.tanh(g)
+            h = sigmoid(o) * np.tanh(c)
+        hidden = np.maximum(h @ arrays['l2.kernel'] + arrays['l2.bias'], 0.0)
+        probabilities.append(sigmoid(hidden @ arrays['l3.kernel'] + arrays['l3.bias'])[-1])
+    return np.array(probabilities)
+
+
+def bundle(directory, spec, arrays, precision):
+    path = os.path.join(directory, 'hlrnn-%s.npz' % precision)
+    np.savez_compressed(path, __spec__=np.array(json.dumps({**spec, 'precision': precision})),
+                        **quantize(arrays, precision))
+    return NumpyRuntime.load(path)
+
+
+class NumpyRuntimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spec, self.arrays = tiny_model()
+        self.tensor = parity_sequences(64, weeks=12, seed=1)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_forward_pass_matches_reference(self):
+        runtime = bundle(self.directory, self.spec, self.arrays, 'float32')
+        expected = reference_predict(self.arrays, self.tensor)
+
+        np.testing.assert_allclose(runtime.predict_sequences(self.tensor), expected, atol=1e-5)
+        # A static feature row is scored as a one-week sequence
+        np.testing.assert_allclose(
+            runtime.predict(self.tensor[:, -1, :]), reference_predict(self.arrays, self.tensor[:, -1:, :]), atol=1e-5
+        )
+
+    def test_quantized_bundles_stay_within_tolerance(self):
+        exact = bundle(self.directory, self.spec, self.arrays, 'float32').predict_sequences(self.tensor)
+        for precision in ('float16', 'int8'):
+            runtime = bundle(self.directory, self.spec, self.arrays, precision)
+            self.assertEqual(runtime.version, 'test-%s' % precision)
+            difference = np.abs(runtime.predict_sequences(self.tensor) - exact).max()
+            self.assertLessEqual(difference, PARITY_TOLERANCE[precision], precision)
+
+    def test_int8_kernels_round_trip_within_half_a_step(self):
+        stored = quantize(self.arrays, 'int8')
+        for name in ('l1.kernel', 'l1.recurrent_kernel', 'l2.kernel'):
+            self.assertEqual(stored[name].dtype, np.int8)
+            restored = stored[name].astype(np.float32) * stored[name + '.scale']
+            self.assertTrue(np.all(np.abs(restored - self.arrays[name]) <= stored[name + '.scale'] / 2 + 1e-7))
+        self.assertEqual(stored['l1.bias'].dtype, np.float32)
+
+    def test_version_is_read_from_the_export_sidecar(self):
+        path = os.path.join(self.directory, 'hlrnn.npz')
+        open(path, 'wb').close()
+        with open(metadata_path(path), 'w') as handle:
+            json.dump({'version': 'hlrnn-1-int8'}, handle)
+        self.assertEqual(read_version(path), 'hlrnn-1-int8')
+
+
+if __name__ == '__main__':
+    unittest.main()
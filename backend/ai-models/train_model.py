@@ -0,0 +1,165 @@
+"""Train the HLRNN from a memory-mapped dataset built by training_data.py.
+
+Batches are read straight from the ``.npy`` memory maps, so the dataset can be
+far larger than RAM: only the rows of the current mini-batch are paged in.
+Each batch is sorted by row for sequential reads and trimmed to the weeks in
+which at least one of its students has history; earlier steps are all-zero
+and masked anyway.
+
+Usage:
+    python train_model.py <dataset dir> [--out models/hlrnn.h5] [--epochs 20]
+                          [--batch-size 256] [--register [--activate]]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from model_loader import DEFAULT_MODEL_PATH, metadata_path
+from training_data import load_dataset, trim_leading
+
+
+class BatchStream:
+    """Mini-batches of (X, y) over ``indices`` of a memory-mapped dataset."""
+
+    def __init__(self, X, mask, y, indices, batch_size, shuffle=False, seed=0):
+        self.X = X
+        self.mask = mask
+        self.y = y
+        self.indices = np.asarray(indices)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return -(-len(self.indices) // self.batch_size)
+
+    def __iter__(self):
+        order = self.rng.permutation(self.indices) if self.shuffle else self.indices
+        for start in range(0, len(order), self.batch_size):
+            rows = np.sort(order[start:start + self.batch_size])
+            inputs, _ = trim_leading(np.asarray(self.X[rows]), np.asarray(self.mask[rows]))
+            yield inputs, np.asarray(self.y[rows])
+
+
+def split(count, validation, seed=0):
+    order = np.random.default_rng(seed).permutation(count)
+    holdout = int(count * validation)
+    return np.sort(order[holdout:]), np.sort(order[:holdout])
+
+
+def class_weights(y, indices):
+    """Inverse-frequency weights so the rarer dropout class is not ignored."""
+    positives = float(np.asarray(y[indices]).sum())
+    negatives = len(indices) - positives
+    if positives == 0 or negatives == 0:
+        return None
+    return {0: len(indices) / (2.0 * negatives), 1: len(indices) / (2.0 * positives)}
+
+
+def build_model(features):
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    from tensorflow import keras
+
+    model = keras.Sequential([
+        keras.layers.Input(shape=(None, features)),
+        keras.layers.Masking(mask_value=0.0),
+        keras.layers.LSTM(64, return_sequences=True),
+        keras.layers.LSTM(32),
+        keras.layers.Dense(16, activation='relu'),
+        keras.layers.Dropout(0.2),
+        keras.layers.Dense(1, activation='sigmoid'),
+    ])
+    model.compile(optimizer='adam', loss='binary_crossentropy')
+    return model
+
+
+def evaluate(model, stream):
+    """(log loss, accuracy) over a stream, scored a batch at a time."""
+    losses, correct, seen = 0.0, 0, 0
+    for inputs, labels in stream:
+        p = np.clip(np.asarray(model.predict_on_batch(inputs))[:, -1], 1e-7, 1 - 1e-7)
+        losses -= float(np.sum(labels * np.log(p) + (1 - labels) * np.log(1 - p)))
+        correct += int(np.sum((p >= 0.5) == (labels >= 0.5)))
+        seen += len(labels)
+    return losses / max(seen, 1), correct / max(seen, 1)
+
+
+def train(directory, out_path, epochs=20, batch_size=256, validation=0.1, patience=3, seed=0):
+    X, mask, y, _, meta = load_dataset(directory)
+    train_rows, validation_rows = split(len(y), validation, seed)
+    training = BatchStream(X, mask, y, train_rows, batch_size, shuffle=True, seed=seed)
+    holdout = BatchStream(X, mask, y, validation_rows, batch_size)
+    weights = class_weights(y, train_rows)
+
+    model = build_model(X.shape[2])
+    best = {'loss': np.inf, 'weights': None, 'epoch': 0}
+    history = []
+
+    for epoch in range(1, epochs + 1):
+        started = time.time()
+        loss = 0.0
+        for inputs, labels in training:
+            loss += float(model.train_on_batch(inputs, labels, class_weight=weights))
+        val_loss, val_accuracy = evaluate(model, holdout) if len(validation_rows) else (np.nan, np.nan)
+        history.append({
+            'epoch': epoch,
+            'loss': loss / max(len(training), 1),
+            'valLoss': val_loss,
+            'valAccuracy': val_accuracy,
+            'seconds': round(time.time() - started, 1),
+        })
+        print(json.dumps(history[-1]), flush=True)
+
+        if not val_loss >= best['loss']:
+            best = {'loss': val_loss, 'weights': model.get_weights(), 'epoch': epoch}
+        elif epoch - best['epoch'] >= patience:
+            break
+
+    if best['weights'] is not None:
+        model.set_weights(best['weights'])
+    model.save(out_path)
+
+    version = 'hlrnn-%s' % time.strftime('%Y%m%d%H%M%S')
+    metadata = {
+        'version': version,
+        'trainedAt': time.time(),
+        'dataset': os.path.abspath(directory),
+        'students': meta['students'],
+        'weeks': meta['weeks'],
+        'bestEpoch': best['epoch'],
+        'valLoss': None if np.isnan(history[best['epoch'] - 1]['valLoss']) else history[best['epoch'] - 1]['valLoss'],
+        'history': history,
+    }
+    with open(metadata_path(out_path), 'w') as handle:
+        json.dump(metadata, handle, indent=2)
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the HLRNN from a memory-mapped dataset.')
+    parser.add_argument('directory')
+    parser.add_argument('--out', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--validation', type=float, default=0.1)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--register', action='store_true', help='add the trained model to the model registry')
+    parser.add_argument('--activate', action='store_true', help='with --register, make it the active version')
+    args = parser.parse_args(argv)
+
+    metadata = train(args.directory, args.out, args.epochs, args.batch_size, args.validation, args.patience)
+    if args.register:
+        from model_registry import ModelRegistry
+
+        ModelRegistry().register(args.out, metadata['version'], args.activate)
+    print(json.dumps({key: value for key, value in metadata.items() if key != 'history'}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""Out-of-core training data for the HLRNN.
+
+Streams years of Attendance and Grade history from MongoDB into memory-mapped
+``.npy`` arrays, so building a dataset never holds more than one chunk of
+records as Python objects. Each student gets one weekly sequence on a shared
+time axis; every step is the encoded feature vector (features.FEATURE_NAMES)
+as of that week, with attendance rate, CGPA and both trends computed from the
+history up to the step. Trends are feature_engineering's least-squares slopes
+over its windows, fitted to the weekly rates (attendance: one point per week
+with classes; grades: the week's mean percentage weighted by its assessments)::
+
+    <dataset>/
+        ids.npy     (N,)        student ids
+        X.npy       (N, T, F)   float32 weekly feature vectors, zero before the first record
+        mask.npy    (N, T)      True from the student's first attendance/grade record on, and for the last week
+        y.npy       (N,)        1.0 for 'Dropped Out', 0.0 for 'Active' / 'Graduated'
+        meta.json
+
+With ``--from-cache`` the weekly counters come from the sequence cache
+(sequence_cache) after syncing it, instead of being re-aggregated from MongoDB.
+
+Usage:
+    python training_data.py <dataset dir> [--years 5] [--chunk-size 2000] [--from-cache]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+import feature_engineering
+from features import FEATURE_NAMES, encode_frame
+
+LABELS = {'Dropped Out': 1.0, 'Active': 0.0, 'Graduated': 0.0}
+WEEK_MS = 7 * 24 * 60 * 60 * 1000
+PERIODS_PER_DAY = 8
+DAYS_PER_BUCKET = 31
+WEEKS_PER_MONTH = feature_engineering.DAYS_PER_MONTH / 7
+# feature_engineering's trend windows, in weeks
+TREND_WINDOW_WEEKS = {
+    'attendance': int(round(feature_engineering.ATTENDANCE_WINDOW_MONTHS * WEEKS_PER_MONTH)),
+    'grades': feature_engineering.GRADE_WINDOW_DAYS // 7,
+}
+
+# Weekly counter channels
+PRESENT, TOTAL, GRADE_POINTS, PERCENTAGE, GRADE_COUNT = range(5)
+CHANNELS = 5
+
+COLUMN = {name: FEATURE_NAMES.index(name) for name in ('attendance_rate', 'current_cgpa', 'attendance_trend', 'grade_trend')}
+
+EMPTY_ATTENDANCE = pd.DataFrame(columns=['studentId', 'month', 'total', 'present'])
+EMPTY_GRADES = pd.DataFrame(columns=['studentId', 'semester', 'percentage', 'gradePoints', 'assessmentDate'])
+
+
+def open_array(directory, name, dtype, shape):
+    return np.lib.format.open_memmap(os.path.join(directory, name), mode='w+', dtype=dtype, shape=shape)
+
+
+class DatasetBuilder:
+
+    def __init__(self, db, directory, years=5, chunk_size=2000, now=None, cutoff=None):
+        self.db = db
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        self.weeks = int(years * 52) + 1
+        self.start = self.now - timedelta(weeks=self.weeks)
+        self.filter = {'status': {'$in': list(LABELS)}}
+        # Only records created before ``cutoff`` are aggregated (the sequence cache
+        # applies later ones from its event log)
+        self.cutoff = cutoff
+        self.created = {'createdAt': {'$lt': cutoff}} if cutoff else {}
+
+    def build(self, cache=None):
+        os.makedirs(self.directory, exist_ok=True)
+        capacity = self.db.students.count_documents(self.filter)
+        index = self.index_students(capacity)
+        count = len(index)
+
+        counters = open_array(self.directory, 'counters.tmp.npy', np.float32, (max(count, 1), self.weeks, CHANNELS))
+        if cache is not None:
+            self.now = cache.end()
+            self.start = self.now - timedelta(weeks=self.weeks)
+            ids = np.load(os.path.join(self.directory, 'ids.npy'), mmap_mode='r')
+            for start in range(0, count, self.chunk_size):
+                end = min(start + self.chunk_size, count)
+                counters[start:end] = cache.read(list(ids[start:end]), self.weeks)
+        elif os.environ.get('ATTENDANCE_STORAGE', 'document').lower() == 'bucketed':
+            self.add_bucketed_attendance(counters, index)
+            self.add_grades(counters, index)
+        else:
+            self.add_attendance(counters, index)
+            self.add_grades(counters, index)
+
+        self.build_sequences(counters, count)
+        del counters
+        os.remove(os.path.join(self.directory, 'counters.tmp.npy'))
+        os.remove(os.path.join(self.directory, 'static.tmp.npy'))
+
+        meta = {
+            'students': count,
+            'weeks': self.weeks,
+            'features': FEATURE_NAMES,
+            'start': self.start.isoformat(),
+            'end': self.now.isoformat(),
+            'positives': int(np.load(os.path.join(self.directory, 'y.npy'), mmap_mode='r').sum()),
+        }
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as handle:
+            json.dump(meta, handle, indent=2)
+        return meta
+
+    def index_students(self, capacity):
+        """Pass 1: row per student, labels and static encoded features, a chunk at a time."""
+        ids = open_array(self.directory, 'ids.npy', 'U24', (max(capacity, 1),))
+        labels = open_array(self.directory, 'y.npy', np.float32, (max(capacity, 1),))
+        static = open_array(self.directory, 'static.tmp.npy', np.float32, (max(capacity, 1), len(FEATURE_NAMES)))
+
+        projection = {**feature_engineering.STUDENT_PROJECTION, 'status': 1}
+        cursor = self.db.students.find(self.filter, projection).sort('_id', 1).batch_size(self.chunk_size)
+        index = {}
+        chunk = []
+
+        def flush():
+            start = len(index) - len(chunk)
+            frame = pd.json_normalize(chunk)
+            features = feature_engineering.compute_features(frame, EMPTY_ATTENDANCE, EMPTY_GRADES, now=self.now)
+            static[start:len(index)] = encode_frame(features)
+            labels[start:len(index)] = frame['status'].map(LABELS).to_numpy(dtype=np.float32)
+            chunk.clear()
+
+        for student in cursor:
+            if len(index) == capacity:
+                break
+            key = str(student['_id'])
+            ids[len(index)] = key
+            index[key] = len(index)
+            chunk.append(student)
+            if len(chunk) == self.chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        ids.flush()
+        labels.flush()
+        static.flush()
+        return index
+
+    def _accumulate(self, counters, index, rows, channels):
+        """np.add.at a chunk of (studentId, week, *values) rows into ``counters``."""
+        if not rows:
+            return
+        frame = pd.DataFrame(rows, columns=['studentId', 'week', *channels])
+        positions = frame['studentId'].astype(str).map(index)
+        keep = positions.notna() & frame['week'].between(0, self.weeks - 1)
+        frame = frame[keep]
+        student_rows = positions[keep].to_numpy(dtype=np.int64)
+        weeks = frame['week'].to_numpy(dtype=np.int64)
+        for channel, values in channels.items():
+            np.add.at(counters[:, :, channel], (student_rows, weeks), frame[values].to_numpy(dtype=np.float32))
+
+    def _stream(self, cursor, counters, index, channels, fields):
+        rows = []
+        for group in cursor:
+            rows.append((group['_id']['studentId'], int(group['_id']['week']), *(group[field] for field in fields)))
+            if len(rows) >= self.chunk_size * 50:
+                self._accumulate(counters, index, rows, channels)
+                rows = []
+        self._accumulate(counters, index, rows, channels)
+
+    def _week_of(self, field):
+        return {'$floor': {'$divide': [{'$subtract': [field, self.start]}, WEEK_MS]}}
+
+    def add_attendance(self, counters, index):
+        """Pass 2: weekly attendance counters, grouped server-side."""
+        cursor = self.db.attendances.aggregate([
+            {'$match': {'date': {'$gte': self.start, '$lt': self.now}, **self.created}},
+            {'$group': {
+                '_id': {'studentId': '$studentId', 'week': self._week_of('$date')},
+                'present': {'$sum': {'$cond': [{'$eq': ['$status', 'Present']}, 1, 0]}},
+                'total': {'$sum': 1},
+            }},
+        ], allowDiskUse=True, batchSize=10000)
+        self._stream(cursor, counters, index, {PRESENT: 'present', TOTAL: 'total'}, ['present', 'total'])
+
+    def add_bucketed_attendance(self, counters, index):
+        """Pass 2 for ATTENDANCE_STORAGE=bucketed: decode each month's packed status slots."""
+        cursor = self.db.attendancebuckets.find(
+            {'month': {'$gte': self.start.strftime('%Y-%m')}},
+            {'studentId': 1, 'month': 1, 'statuses': 1, 'updatedAt': 1},
+        ).batch_size(1000)
+
+        rows = []
+        touched = {}
+        for bucket in cursor:
+            if self.cutoff and bucket.get('updatedAt') and bucket['updatedAt'] >= self.cutoff:
+                touched[(str(bucket['studentId']), bucket['month'])] = datetime.now(timezone.utc).replace(tzinfo=None)
+            # One (day, period) segment per subject
+            statuses = np.frombuffer(bytes(bucket['statuses']), dtype=np.uint8)
+            statuses = statuses.reshape(-1, DAYS_PER_BUCKET, PERIODS_PER_DAY)
+            total = (statuses > 0).sum(axis=(0, 2))
+            present = (statuses == 1).sum(axis=(0, 2))
+            first_day = datetime.strptime(bucket['month'], '%Y-%m')
+            for day in np.flatnonzero(total):
+                week = ((first_day + timedelta(days=int(day))) - self.start).days // 7
+                rows.append((bucket['studentId'], week, int(present[day]), int(total[day])))
+            if len(rows) >= self.chunk_size * 50:
+                self._accumulate(counters, index, rows, {PRESENT: 'present', TOTAL: 'total'})
+                rows = []
+        self._accumulate(counters, index, rows, {PRESENT: 'present', TOTAL: 'total'})
+        if touched:
+            self.exclude_logged_attendance(counters, index, touched)
+
+    def exclude_logged_attendance(self, counters, index, touched):
+        """Apply the cutoff to buckets: take back records written after it.
+
+        Buckets carry no per-record creation time, so a bucket updated after the
+        cutoff already holds records that the event log also has. Those events
+        (logged before the bucket was read) are subtracted here and replayed by
+        the sequence cache instead. ``touched`` maps (studentId, month) to read time.
+        """
+        events = self.db.sequenceevents.find({
+            'source': 'attendance',
+            '_id': {'$gte': ObjectId.from_datetime(self.cutoff)},
+            'studentId': {'$in': [ObjectId(key) for key in {student for student, _ in touched}]},
+        }, {'studentId': 1, 'date': 1, 'present': 1, 'total': 1})
+
+        rows = []
+        for event in events:
+            read_at = touched.get((str(event['studentId']), event['date'].strftime('%Y-%m')))
+            if read_at is not None and event['_id'].generation_time.replace(tzinfo=None) <= read_at:
+                week = (event['date'] - self.start).days // 7
+                rows.append((event['studentId'], week, -event.get('present', 0), -event.get('total', 0)))
+        self._accumulate(counters, index, rows, {PRESENT: 'present', TOTAL: 'total'})
+
+    def add_grades(self, counters, index):
+        """Pass 3: weekly grade counters, grouped server-side."""
+        cursor = self.db.grades.aggregate([
+            {'$match': {'assessmentDate': {'$gte': self.start, '$lt': self.now}, **self.created}},
+            {'$group': {
+                '_id': {'studentId': '$studentId', 'week': self._week_of('$assessmentDate')},
+                'gradePoints': {'$sum': '$gradePoints'},
+                'percentage': {'$sum': '$percentage'},
+                'count': {'$sum': 1},
+            }},
+        ], allowDiskUse=True, batchSize=10000)
+        self._stream(
+            cursor, counters, index,
+            {GRADE_POINTS: 'gradePoints', PERCENTAGE: 'percentage', GRADE_COUNT: 'count'},
+            ['gradePoints', 'percentage', 'count'],
+        )
+
+    def build_sequences(self, counters, count):
+        """Pass 4: cumulative rates and trends per week, a chunk of students at a time."""
+        static = np.load(os.path.join(self.directory, 'static.tmp.npy'), mmap_mode='r')
+        X = open_array(self.directory, 'X.npy', np.float32, (max(count, 1), self.weeks, len(FEATURE_NAMES)))
+        mask = open_array(self.directory, 'mask.npy', np.bool_, (max(count, 1), self.weeks))
+
+        for start in range(0, count, self.chunk_size):
+            end = min(start + self.chunk_size, count)
+            X[start:end], mask[start:end] = sequences(np.asarray(counters[start:end]), np.asarray(static[start:end]))
+
+        X.flush()
+        mask.flush()
+
+
+def _trailing(values, window):
+    """Sum over the trailing ``window`` weeks, per step (axis 1)."""
+    cumulative = np.cumsum(values, axis=1)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, window:] = cumulative[:, :-window]
+    return cumulative - shifted
+
+
+def _rate(numerator, denominator):
+    return np.where(denominator > 0, numerator / np.maximum(denominator, 1), 0.0)
+
+
+def _trend(rates, weights, window):
+    """-1/0/1 per week: the feature_engineering trend of the weekly ``rates``
+    (percentage points) over the trailing ``window`` weeks, x in months."""
+    weights = np.asarray(weights, dtype=np.float64)
+    rates = np.asarray(rates, dtype=np.float64)
+    x = np.arange(rates.shape[1], dtype=np.float64) / WEEKS_PER_MONTH
+    wx = weights * x
+    moments = (_trailing(m, window) for m in (weights, wx, weights * rates, wx * x, wx * rates))
+    return feature_engineering.trend_codes(feature_engineering.slope_from_moments(*moments))
+
+
+def sequences(counters, static):
+    """(X, mask) for a chunk: counters (n, T, CHANNELS), static encoded features (n, F)."""
+    cumulative = np.cumsum(counters, axis=1)
+    attended, total = cumulative[..., PRESENT], cumulative[..., TOTAL]
+    grade_points, grade_count = cumulative[..., GRADE_POINTS], cumulative[..., GRADE_COUNT]
+
+    X = np.repeat(static[:, None, :], counters.shape[1], axis=1)
+    X[..., COLUMN['attendance_rate']] = np.where(total > 0, attended / np.maximum(total, 1), 1.0)
+    X[..., COLUMN['current_cgpa']] = np.where(
+        grade_count > 0, grade_points / np.maximum(grade_count, 1) / 4.0, X[..., COLUMN['current_cgpa']]
+    )
+    X[..., COLUMN['attendance_trend']] = _trend(
+        _rate(counters[..., PRESENT] * 100.0, counters[..., TOTAL]),
+        counters[..., TOTAL] > 0,
+        TREND_WINDOW_WEEKS['attendance'],
+    )
+    X[..., COLUMN['grade_trend']] = _trend(
+        _rate(counters[..., PERCENTAGE], counters[..., GRADE_COUNT]),
+        counters[..., GRADE_COUNT],
+        TREND_WINDOW_WEEKS['grades'],
+    )
+
+    # The last week is the student's current state, history or not
+    mask = (total + grade_count) > 0
+    mask[:, -1] = True
+    X[~mask] = 0.0
+    return X.astype(np.float32), mask
+
+
+def trim_leading(X, mask):
+    """Drop the leading weeks in which no row of the batch has history."""
+    active = mask.any(axis=0)
+    first = int(active.argmax()) if active.any() else X.shape[1] - 1
+    return X[:, first:], mask[:, first:]
+
+
+def load_dataset(directory):
+    """Memory-mapped (X, mask, y, ids, meta) of a built dataset."""
+    def array(name):
+        return np.load(os.path.join(directory, name), mmap_mode='r')
+
+    with open(os.path.join(directory, 'meta.json')) as handle:
+        meta = json.load(handle)
+    count = meta['students']
+    return array('X.npy')[:count], array('mask.npy')[:count], array('y.npy')[:count], array('ids.npy')[:count], meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build an HLRNN training dataset from MongoDB.')
+    parser.add_argument('directory')
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--from-cache', action='store_true', help='read weekly counters from the sequence cache')
+    args = parser.parse_args(argv)
+
+    db = feature_engineering.connect()
+    cache = None
+    if args.from_cache:
+        from sequence_cache import SequenceCache
+
+        cache = SequenceCache(db)
+        cache.sync()
+    meta = DatasetBuilder(db, args.directory, args.years, args.chunk_size).build(cache)
+    print(json.dumps(meta, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,65 @@
 const fs = require('fs');
+const { pipeline } = require('stream/promises');
+const mongoose = require('mongoose');
 const csv = require('csv-parser');
-const xlsx = require('xlsx');
-const axios = require('axios');
 const Student = require('../models/Student');
-const Attendance = require('../models/Attendance');
 const Grade = require('../models/Grade');
+const StudentImportService = require('../services/studentImportService');
+const AttendanceImportService = require('../services/attendanceImportService');
+const ImportQueue = require('../services/importQueue');
+const ImportLog = require('../models/ImportLog');
+const ConnectorClient = require('../services/connectorClient');
+const SyncService = require('../services/syncService');
+const SyncState = require('../models/SyncState');
+const { addImportError, createValidationStream, createBatchWriter } = require('../utils/importPipeline');
+const { createExcelRowStream } = require('../utils/excelReader');
 const { validationResult } = require('express-validator');
 
+// Student path → source column of an import row
+const IMPORT_FIELD_SOURCES = {
+    studentId: 'studentId',
+    firstName: 'firstName',
+    lastName: 'lastName',
+    email: 'email',
+    phone: 'phone',
+    dateOfBirth: 'dateOfBirth',
+    gender: 'gender',
+    course: 'course',
+    department: 'department',
+    batch: 'batch',
+    semester: 'semester',
+    rollNumber: 'rollNumber',
+    admissionDate: 'admissionDate',
+    expectedGraduation: 'expectedGraduation',
+    fatherName: 'fatherName',
+    fatherOccupation: 'fatherOccupation',
+    fatherEducation: 'fatherEducation',
+    motherName: 'motherName',
+    motherOccupation: 'motherOccupation',
+    motherEducation: 'motherEducation',
+    totalFees: 'totalFees',
+    feeStatus: 'feeStatus',
+    'address.street': 'street',
+    'address.city': 'city',
+    'address.state': 'state',
+    'address.pincode': 'pincode',
+    'address.country': 'country'
+};
+
+const hasImportValue = (value) => value !== undefined && value !== null && String(value).trim() !== '';
+
+// Lazily map an (async) iterable of connector records
+async function* mapRecords(records, map) {
+    for await (const record of records) yield map(record);
+}
+
 class DataImportController {
 
     // =============================================================================
     // STUDENT DATA IMPORT METHODS
     // =============================================================================
 
-    // Import students from CSV/Excel file upload
+    // Import students from CSV/Excel file upload (queued, processed in the background)
     static async importStudentsFromFile(req, res) {
         try {
             if (!req.file) {
@@ -23,33 +69,23 @@ class DataImportController {
             const filePath = req.file.path;
             const fileExtension = req.file.originalname.split('.').pop().toLowerCase();
 
-            let studentsData = [];
-
-            if (fileExtension === 'csv') {
-                // Process CSV file
-                studentsData = await DataImportController.processCSVFile(filePath);
-            } else if (fileExtension === 'xlsx' || fileExtension === 'xls') {
-                // Process Excel file
-                studentsData = await DataImportController.processExcelFile(filePath);
-            } else {
+            if (!['csv', 'xlsx', 'xls'].includes(fileExtension)) {
                 return res.status(400).json({ message: 'Unsupported file format' });
             }
 
-            // Validate and transform data
-            const validatedData = await DataImportController.validateStudentData(studentsData);
-
-            // Import to database
-            const results = await DataImportController.importStudentsToDatabase(validatedData, req.user.id);
-
-            // Clean up uploaded file
-            fs.unlinkSync(filePath);
+            const job = await ImportQueue.enqueue('students-file', {
+                type: 'Students',
+                source: fileExtension === 'csv' ? 'CSV File' : 'Excel File',
+                filename: req.file.originalname,
+                payload: { filePath, fileExtension, batchSize: parseInt(req.body.batchSize) || undefined },
+                userId: req.user.id,
+                host: ImportQueue.HOST
+            });
 
-            res.json({
-                message: 'File processed successfully',
-                imported: results.successful,
-                failed: results.failed,
-                total: studentsData.length,
-                errors: results.errors
+            res.status(202).json({
+                message: 'File queued for import',
+                importId: job._id,
+                status: job.status
             });
 
         } catch (error) {
@@ -61,48 +97,163 @@ class DataImportController {
         }
     }
 
+    static async runStudentFileImport(job, reportProgress) {
+        const { filePath, fileExtension, batchSize } = job.payload;
+
+        try {
+            // Stream rows (CSV parser or Excel worker thread) through validation into batched bulk writes
+            return await DataImportController.streamStudentsFromFile(filePath, fileExtension, job.importedBy, {
+                batchSize,
+                onProgress: reportProgress
+            });
+        } finally {
+            // Clean up uploaded file
+            fs.promises.unlink(filePath).catch(() => {});
+        }
+    }
+
     // Connect to existing Student Information System (SIS)
     static async connectToSIS(req, res) {
         try {
-            const { sisUrl, apiKey, institutionId, syncOptions } = req.body;
+            const { sisUrl, apiKey, institutionId, syncOptions = {} } = req.body;
+            const supportedTypes = ['PowerSchool', 'Skyward', 'Infinite Campus', 'Custom API'];
+
+            if (!supportedTypes.includes(syncOptions.sisType)) {
+                return res.status(400).json({ message: 'Unsupported SIS type' });
+            }
+
+            // Registering the source keeps its sync state, so repeat pulls are incremental
+            const state = await SyncService.register('sis', { sisUrl, apiKey, institutionId, syncOptions }, req.user.id, {
+                name: `SIS: ${syncOptions.sisType}`
+            });
+            const job = await SyncService.enqueue(state, req.user.id, { fullSync: !!syncOptions.fullSync });
+
+            res.status(202).json({
+                message: 'SIS synchronization queued',
+                importId: job._id,
+                status: job.status,
+                sourceKey: state.sourceKey,
+                sisType: syncOptions.sisType
+            });
+
+        } catch (error) {
+            console.error('Error connecting to SIS:', error);
+            res.status(500).json({ 
+                message: 'Error connecting to SIS', 
+                error: error.message 
+            });
+        }
+    }
+
+    static async runSISImport(job, reportProgress) {
+        const state = await SyncService.load(job.payload.syncKey);
+
+        try {
+            const { sisUrl, apiKey, institutionId, syncOptions } = state.config;
+            // Upstreams that support it are only asked for changes since the last sync
+            const sync = job.payload.fullSync ? {} : { since: state.watermark, etag: state.etag };
+            const syncStartedAt = new Date();
 
-            // Example integration with common SIS systems
+            // Example integration with common SIS systems; each fetcher streams
+            // records, which are synced as they arrive
             let studentsData = [];
 
             switch (syncOptions.sisType) {
                 case 'PowerSchool':
-                    studentsData = await DataImportController.fetchFromPowerSchool(sisUrl, apiKey, institutionId);
+                    studentsData = DataImportController.fetchFromPowerSchool(sisUrl, apiKey, institutionId, sync);
                     break;
                 case 'Skyward':
-                    studentsData = await DataImportController.fetchFromSkyward(sisUrl, apiKey, institutionId);
+                    studentsData = DataImportController.fetchFromSkyward(sisUrl, apiKey, institutionId, sync);
                     break;
                 case 'Infinite Campus':
-                    studentsData = await DataImportController.fetchFromInfiniteCampus(sisUrl, apiKey, institutionId);
+                    studentsData = DataImportController.fetchFromInfiniteCampus(sisUrl, apiKey, institutionId, sync);
                     break;
                 case 'Custom API':
-                    studentsData = await DataImportController.fetchFromCustomAPI(sisUrl, apiKey, syncOptions);
+                    studentsData = DataImportController.fetchFromCustomAPI(sisUrl, apiKey, syncOptions, sync);
                     break;
-                default:
-                    return res.status(400).json({ message: 'Unsupported SIS type' });
             }
 
-            const validatedData = await DataImportController.validateStudentData(studentsData);
-            const results = await DataImportController.importStudentsToDatabase(validatedData, req.user.id);
-
-            res.json({
-                message: 'SIS synchronization completed',
-                imported: results.successful,
-                failed: results.failed,
-                sisType: syncOptions.sisType
+            const { results, stats } = await DataImportController.syncStudents(
+                job,
+                studentsData,
+                student => student.rollNumber || student.email,
+                reportProgress
+            );
+            // With failed rows the watermark stays put, so the next `since` pull fetches them again
+            await SyncService.complete(state.sourceKey, {
+                stats,
+                watermark: stats.failed === 0 ? syncStartedAt : undefined,
+                etag: stats.failed === 0 ? sync.etag : undefined
             });
 
+            return results;
         } catch (error) {
-            console.error('Error connecting to SIS:', error);
-            res.status(500).json({ 
-                message: 'Error connecting to SIS', 
-                error: error.message 
+            await SyncService.fail(state.sourceKey, error);
+            throw error;
+        }
+    }
+
+    // Hash-compare fetched students with the last sync a batch at a time as they
+    // stream in, then validate and write only the changed ones. Hashes are
+    // committed per batch, only for rows that were written. `results` and `stats`
+    // may be shared by concurrent calls (one per Google Classroom course).
+    static async syncStudents(job, studentsData, keyOf, reportProgress, {
+        results = StudentImportService.createResults(),
+        stats = { fetched: 0, changed: 0, unchanged: 0, failed: 0 }
+    } = {}) {
+        const { syncKey, fullSync } = job.payload;
+
+        for await (const batch of ConnectorClient.batches(studentsData, StudentImportService.DEFAULT_BATCH_SIZE)) {
+            const { changed, unchanged, hashes } = await SyncService.filterChanged(syncKey, batch, keyOf, {
+                force: fullSync
+            });
+            // Row numbers are reserved before the next await so concurrent calls don't overlap
+            const rowOffset = stats.changed;
+            stats.fetched += batch.length;
+            stats.changed += changed.length;
+            stats.unchanged += unchanged;
+
+            const failedKeys = new Set();
+            const keyByEmail = new Map();
+            const validatedStudents = [];
+            changed.forEach((student, i) => {
+                const { student: validated, error } = DataImportController.validateStudentRow(student, rowOffset + i);
+                if (error) {
+                    results.failed++;
+                    addImportError(results, error);
+                    failedKeys.add(String(keyOf(student)));
+                    return;
+                }
+                keyByEmail.set(validated.email, String(keyOf(student)));
+                validatedStudents.push(validated);
             });
+
+            // Written into per-batch results so every write error maps back to its key,
+            // even once the shared error list is truncated
+            const written = StudentImportService.createResults();
+            if (validatedStudents.length > 0) {
+                await StudentImportService.importChunk(validatedStudents, job.importedBy, written);
+            }
+            for (const error of written.errors) {
+                if (error.email && keyByEmail.has(error.email)) failedKeys.add(keyByEmail.get(error.email));
+                addImportError(results, error);
+            }
+            for (const field of ['successful', 'failed', 'inserted', 'updated', 'skipped']) {
+                results[field] += written[field];
+            }
+
+            await SyncService.commitHashes(syncKey, hashes, failedKeys);
+            stats.failed += failedKeys.size;
+
+            results.unchanged = stats.unchanged;
+            results.total = stats.fetched;
+            if (reportProgress) reportProgress(results);
         }
+
+        results.unchanged = stats.unchanged;
+        results.total = stats.fetched;
+
+        return { results, stats };
     }
 
     // Import from Google Classroom
@@ -110,43 +261,16 @@ class DataImportController {
         try {
             const { accessToken, courseIds } = req.body;
 
-            const studentsData = [];
-
-            for (const courseId of courseIds) {
-                // Fetch students from Google Classroom API
-                const response = await axios.get(
-                    `https://classroom.googleapis.com/v1/courses/${courseId}/students`,
-                    {
-                        headers: {
-                            'Authorization': `Bearer ${accessToken}`,
-                            'Content-Type': 'application/json'
-                        }
-                    }
-                );
-
-                const classroomStudents = response.data.students || [];
-
-                // Transform Google Classroom data to our format
-                for (const student of classroomStudents) {
-                    studentsData.push({
-                        firstName: student.profile.name.givenName,
-                        lastName: student.profile.name.familyName,
-                        email: student.profile.emailAddress,
-                        googleClassroomId: student.userId,
-                        course: courseId, // This should be mapped to your course structure
-                        admissionDate: new Date(),
-                        status: 'Active'
-                    });
-                }
-            }
-
-            const validatedData = await DataImportController.validateStudentData(studentsData);
-            const results = await DataImportController.importStudentsToDatabase(validatedData, req.user.id);
+            const state = await SyncService.register('google-classroom', { accessToken, courseIds }, req.user.id, {
+                name: 'Google Classroom'
+            });
+            const job = await SyncService.enqueue(state, req.user.id);
 
-            res.json({
-                message: 'Google Classroom import completed',
-                imported: results.successful,
-                failed: results.failed,
+            res.status(202).json({
+                message: 'Google Classroom import queued',
+                importId: job._id,
+                status: job.status,
+                sourceKey: state.sourceKey,
                 coursesProcessed: courseIds.length
             });
 
@@ -159,11 +283,41 @@ class DataImportController {
         }
     }
 
+    static async runGoogleClassroomImport(job, reportProgress) {
+        const state = await SyncService.load(job.payload.syncKey);
+
+        try {
+            const { accessToken, courseIds } = state.config;
+
+            // Courses are synced concurrently into shared results; each course streams
+            // its nextPageToken pages
+            const results = StudentImportService.createResults();
+            const stats = { fetched: 0, changed: 0, unchanged: 0, failed: 0 };
+            const { errors: courseErrors } = await ConnectorClient.mapConcurrent(
+                courseIds,
+                courseId => DataImportController.syncStudents(
+                    job,
+                    DataImportController.fetchClassroomStudents(accessToken, courseId),
+                    student => `${student.course}:${student.googleClassroomId}`,
+                    reportProgress,
+                    { results, stats }
+                )
+            );
+            DataImportController.addConnectorErrors(results, 'course', courseErrors);
+            await SyncService.complete(state.sourceKey, { stats });
+
+            return results;
+        } catch (error) {
+            await SyncService.fail(state.sourceKey, error);
+            throw error;
+        }
+    }
+
     // =============================================================================
     // ATTENDANCE DATA IMPORT METHODS
     // =============================================================================
 
-    // Import attendance from file
+    // Import attendance from file (queued, processed in the background)
     static async importAttendanceFromFile(req, res) {
         try {
             if (!req.file) {
@@ -173,24 +327,23 @@ class DataImportController {
             const filePath = req.file.path;
             const fileExtension = req.file.originalname.split('.').pop().toLowerCase();
 
-            let attendanceData = [];
-
-            if (fileExtension === 'csv') {
-                attendanceData = await DataImportController.processAttendanceCSV(filePath);
-            } else if (fileExtension === 'xlsx' || fileExtension === 'xls') {
-                attendanceData = await DataImportController.processAttendanceExcel(filePath);
+            if (!['csv', 'xlsx', 'xls'].includes(fileExtension)) {
+                return res.status(400).json({ message: 'Unsupported file format' });
             }
 
-            const results = await DataImportController.importAttendanceToDatabase(attendanceData, req.user.id);
-
-            // Clean up file
-            fs.unlinkSync(filePath);
+            const job = await ImportQueue.enqueue('attendance-file', {
+                type: 'Attendance',
+                source: fileExtension === 'csv' ? 'CSV File' : 'Excel File',
+                filename: req.file.originalname,
+                payload: { filePath, fileExtension },
+                userId: req.user.id,
+                host: ImportQueue.HOST
+            });
 
-            res.json({
-                message: 'Attendance data imported successfully',
-                imported: results.successful,
-                failed: results.failed,
-                total: attendanceData.length
+            res.status(202).json({
+                message: 'Attendance file queued for import',
+                importId: job._id,
+                status: job.status
             });
 
         } catch (error) {
@@ -202,35 +355,34 @@ class DataImportController {
         }
     }
 
+    static async runAttendanceFileImport(job, reportProgress) {
+        const { filePath, fileExtension } = job.payload;
+
+        try {
+            return await DataImportController.streamAttendanceFromFile(filePath, fileExtension, job.importedBy, {
+                onProgress: reportProgress
+            });
+        } finally {
+            // Clean up file
+            fs.promises.unlink(filePath).catch(() => {});
+        }
+    }
+
     // Connect to biometric attendance system
     static async connectToBiometricSystem(req, res) {
         try {
             const { systemUrl, apiKey, deviceIds } = req.body;
 
-            const attendanceData = [];
-
-            // Fetch attendance data from biometric devices
-            for (const deviceId of deviceIds) {
-                const response = await axios.get(
-                    `${systemUrl}/api/attendance/${deviceId}/today`,
-                    {
-                        headers: {
-                            'Authorization': `Bearer ${apiKey}`,
-                            'Content-Type': 'application/json'
-                        }
-                    }
-                );
-
-                const deviceAttendance = response.data;
-                attendanceData.push(...deviceAttendance);
-            }
-
-            const results = await DataImportController.processBiometricData(attendanceData, req.user.id);
+            const state = await SyncService.register('biometric', { systemUrl, apiKey, deviceIds }, req.user.id, {
+                name: 'Biometric System'
+            });
+            const job = await SyncService.enqueue(state, req.user.id);
 
-            res.json({
-                message: 'Biometric attendance synchronized',
-                imported: results.successful,
-                failed: results.failed,
+            res.status(202).json({
+                message: 'Biometric attendance sync queued',
+                importId: job._id,
+                status: job.status,
+                sourceKey: state.sourceKey,
                 devicesProcessed: deviceIds.length
             });
 
@@ -243,194 +395,478 @@ class DataImportController {
         }
     }
 
+    static async runBiometricImport(job) {
+        const state = await SyncService.load(job.payload.syncKey);
+
+        try {
+            const { systemUrl, apiKey, deviceIds } = state.config;
+
+            // Devices are polled concurrently (bounded per host) over pooled connections,
+            // each from its own watermark
+            const results = AttendanceImportService.createResults();
+            const { errors: deviceErrors, cursors, fetched, changed } = await DataImportController.fetchSinceWatermarks(
+                job,
+                state,
+                deviceIds,
+                (deviceId, since) => ConnectorClient.streamRecords(
+                    `${systemUrl}/api/attendance/${deviceId}/today`,
+                    {
+                        headers: { 'Authorization': `Bearer ${apiKey}` },
+                        params: since ? { since } : undefined
+                    }
+                ),
+                punch => punch.date || punch.punchTime || punch.timestamp,
+                punches => DataImportController.processBiometricData(punches, job.importedBy, { results })
+            );
+
+            DataImportController.addConnectorErrors(results, 'device', deviceErrors);
+            results.total = changed;
+
+            await SyncService.complete(state.sourceKey, {
+                stats: { fetched, changed, unchanged: fetched - changed },
+                cursors
+            });
+
+            return results;
+        } catch (error) {
+            await SyncService.fail(state.sourceKey, error);
+            throw error;
+        }
+    }
+
     // Connect to RFID attendance system
     static async connectToRFIDSystem(req, res) {
         try {
             const { systemUrl, credentials, locationIds } = req.body;
 
-            const attendanceData = [];
+            const state = await SyncService.register('rfid', { systemUrl, credentials, locationIds }, req.user.id, {
+                name: 'RFID System'
+            });
+            const job = await SyncService.enqueue(state, req.user.id);
+
+            res.status(202).json({
+                message: 'RFID attendance sync queued',
+                importId: job._id,
+                status: job.status,
+                sourceKey: state.sourceKey
+            });
 
-            // Fetch from RFID system API
-            for (const locationId of locationIds) {
-                const response = await axios.post(
+        } catch (error) {
+            console.error('Error connecting to RFID system:', error);
+            res.status(500).json({ 
+                message: 'Error connecting to RFID system', 
+                error: error.message 
+            });
+        }
+    }
+
+    static async runRFIDImport(job) {
+        const state = await SyncService.load(job.payload.syncKey);
+
+        try {
+            const { systemUrl, credentials, locationIds } = state.config;
+            const date = new Date().toISOString().split('T')[0];
+
+            // Fetch from RFID system API, all locations concurrently
+            const results = AttendanceImportService.createResults();
+            const { errors: locationErrors, cursors, fetched, changed } = await DataImportController.fetchSinceWatermarks(
+                job,
+                state,
+                locationIds,
+                (locationId, since) => ConnectorClient.streamRecords(
                     `${systemUrl}/api/rfid/attendance-report`,
                     {
-                        location: locationId,
-                        date: new Date().toISOString().split('T')[0],
-                        ...credentials
+                        method: 'POST',
+                        data: { location: locationId, date, since, ...credentials },
+                        select: body => body.attendance
                     }
-                );
+                ),
+                scan => scan.date || scan.scanTime || scan.timestamp,
+                scans => DataImportController.processRFIDData(scans, job.importedBy, { results })
+            );
+
+            DataImportController.addConnectorErrors(results, 'location', locationErrors);
+            results.total = changed;
 
-                attendanceData.push(...response.data.attendance);
+            await SyncService.complete(state.sourceKey, {
+                stats: { fetched, changed, unchanged: fetched - changed },
+                cursors
+            });
+
+            return results;
+        } catch (error) {
+            await SyncService.fail(state.sourceKey, error);
+            throw error;
+        }
+    }
+
+    // Stream every sub-source (device, location) concurrently from its own watermark
+    // into importRecords(records). Records at or before the watermark are dropped in
+    // case the upstream ignores `since`. importRecords resolves to { failed }, the count of
+    // rows that failed; a sub-source's watermark only advances when its fetch succeeded
+    // and none of its rows failed, so failed rows are fetched again on the next run.
+    static async fetchSinceWatermarks(job, state, sourceIds, fetchRecords, timeOf, importRecords) {
+        const cursors = {};
+        let fetched = 0;
+        let changed = 0;
+
+        const { errors } = await ConnectorClient.mapConcurrent(sourceIds, async (sourceId) => {
+            const { watermark } = job.payload.fullSync ? {} : SyncService.cursorFor(state, sourceId);
+            const since = watermark ? new Date(watermark) : null;
+            let latest = since;
+
+            async function* fresh() {
+                for await (const record of fetchRecords(sourceId, watermark)) {
+                    fetched++;
+                    const time = new Date(timeOf(record));
+                    if (!isNaN(time.getTime())) {
+                        if (!latest || time > latest) latest = time;
+                        if (since && time <= since) continue;
+                    }
+                    changed++;
+                    yield record;
+                }
             }
 
-            const results = await DataImportController.processRFIDData(attendanceData, req.user.id);
+            const { failed } = await importRecords(fresh());
+            if (failed === 0) cursors[sourceId] = { watermark: latest };
+        });
 
-            res.json({
-                message: 'RFID attendance synchronized',
-                imported: results.successful,
-                failed: results.failed
+        return { errors, cursors, fetched, changed };
+    }
+
+    // Failed upstream sources reported alongside row errors instead of failing the whole job
+    static connectorErrors(sourceType, errors) {
+        return errors.map(({ item, error }) => ({
+            [sourceType]: item,
+            error: error.message
+        }));
+    }
+
+    static addConnectorErrors(results, sourceType, errors) {
+        for (const error of DataImportController.connectorErrors(sourceType, errors)) {
+            addImportError(results, error);
+        }
+    }
+
+    // =============================================================================
+    // SIS CONNECTORS
+    // =============================================================================
+
+    // PowerSchool REST API: school students, paged with page/pagesize.
+    // No change feed here, so deltas come from the per-record hashes.
+    static fetchFromPowerSchool(sisUrl, apiKey, institutionId, sync = {}) {
+        const pageSize = 100;
+
+        const students = ConnectorClient.paginate(async (page = 1) => {
+            const body = await ConnectorClient.get(`${sisUrl}/ws/v1/school/${institutionId}/student`, {
+                headers: { 'Authorization': `Bearer ${apiKey}`, 'Accept': 'application/json' },
+                params: { page, pagesize: pageSize, expansions: 'demographics,contact_info' }
             });
+            const records = [].concat(body.students?.student || []);
+            return { records, next: records.length === pageSize ? page + 1 : null };
+        });
 
-        } catch (error) {
-            console.error('Error connecting to RFID system:', error);
-            res.status(500).json({ 
-                message: 'Error connecting to RFID system', 
-                error: error.message 
+        return mapRecords(students, student => ({
+            firstName: student.name?.first_name,
+            lastName: student.name?.last_name,
+            email: student.contact_info?.email,
+            phone: student.contact_info?.phone,
+            dateOfBirth: student.demographics?.birth_date,
+            gender: DataImportController.mapGender(student.demographics?.gender),
+            rollNumber: student.local_id ? String(student.local_id) : undefined,
+            semester: student.grade_level
+        }));
+    }
+
+    // Skyward exposes a OneRoster 1.1 API
+    static fetchFromSkyward(sisUrl, apiKey, institutionId, sync = {}) {
+        return DataImportController.fetchOneRosterStudents(
+            `${sisUrl}/ims/oneroster/v1p1/schools/${institutionId}/students`,
+            apiKey,
+            sync
+        );
+    }
+
+    // Infinite Campus exposes a OneRoster 1.2 API
+    static fetchFromInfiniteCampus(sisUrl, apiKey, institutionId, sync = {}) {
+        return DataImportController.fetchOneRosterStudents(
+            `${sisUrl}/campus/api/oneroster/v1p2/schools/${institutionId}/students`,
+            apiKey,
+            sync
+        );
+    }
+
+    // OneRoster users, paged with limit/offset; with `sync.since` only users
+    // modified after the last sync are requested
+    static async *fetchOneRosterStudents(url, apiKey, sync = {}) {
+        const limit = 500;
+        const filter = sync.since ? `dateLastModified>'${new Date(sync.since).toISOString()}'` : undefined;
+
+        const users = ConnectorClient.paginate(async (offset = 0) => {
+            const body = await ConnectorClient.get(url, {
+                headers: { 'Authorization': `Bearer ${apiKey}` },
+                params: { limit, offset, filter }
             });
+            const records = body.users || [];
+            return { records, next: records.length === limit ? offset + limit : null };
+        });
+
+        for await (const user of users) {
+            if (user.status === 'tobedeleted') continue;
+            yield {
+                firstName: user.givenName,
+                lastName: user.familyName,
+                email: user.email,
+                phone: user.phone || user.sms,
+                rollNumber: user.identifier || user.sourcedId,
+                semester: Array.isArray(user.grades) ? user.grades[0] : undefined
+            };
         }
     }
 
+    // Custom API: rows already in our import format, streamed when the upstream sends NDJSON.
+    // Conditional on the last ETag and asking for `updatedSince` the last sync;
+    // the new ETag is written back to `sync.etag`.
+    static fetchFromCustomAPI(sisUrl, apiKey, syncOptions, sync = {}) {
+        return ConnectorClient.streamRecords(
+            `${sisUrl}${syncOptions.endpoint || '/students'}`,
+            {
+                headers: { 'Authorization': `Bearer ${apiKey}` },
+                params: {
+                    ...syncOptions.params,
+                    updatedSince: sync.since ? new Date(sync.since).toISOString() : undefined
+                },
+                etag: sync.etag,
+                onResponse: (response) => {
+                    if (response.headers.etag) sync.etag = response.headers.etag;
+                },
+                select: body => (Array.isArray(body) ? body : body.students)
+            }
+        );
+    }
+
+    // Google Classroom course roster, following nextPageToken paging
+    static fetchClassroomStudents(accessToken, courseId) {
+        const students = ConnectorClient.paginate(async (pageToken) => {
+            const page = await ConnectorClient.get(
+                `https://classroom.googleapis.com/v1/courses/${courseId}/students`,
+                {
+                    headers: { 'Authorization': `Bearer ${accessToken}` },
+                    params: { pageSize: 100, pageToken }
+                }
+            );
+            return { records: page.students || [], next: page.nextPageToken };
+        });
+
+        // Transform Google Classroom data to our format
+        return mapRecords(students, student => ({
+            firstName: student.profile.name.givenName,
+            lastName: student.profile.name.familyName,
+            email: student.profile.emailAddress,
+            googleClassroomId: student.userId,
+            course: courseId, // This should be mapped to your course structure
+            status: 'Active'
+        }));
+    }
+
+    static mapGender(value) {
+        const gender = String(value || '').toUpperCase();
+        if (gender === 'M' || gender === 'MALE') return 'Male';
+        if (gender === 'F' || gender === 'FEMALE') return 'Female';
+        return 'Other';
+    }
+
     // =============================================================================
     // UTILITY METHODS FOR PROCESSING DATA
     // =============================================================================
 
-    static async processCSVFile(filePath) {
-        return new Promise((resolve, reject) => {
-            const results = [];
-            fs.createReadStream(filePath)
-                .pipe(csv())
-                .on('data', (data) => results.push(data))
-                .on('end', () => resolve(results))
-                .on('error', reject);
-        });
+    // Object-mode row source for an uploaded file; Excel is parsed in a worker thread.
+    // Only CSV is read incrementally: the worker loads the whole workbook before
+    // sending rows, so an Excel upload holds its full sheet in the worker's memory.
+    static createRowStreams(filePath, fileExtension) {
+        if (fileExtension === 'csv') {
+            return [fs.createReadStream(filePath), csv()];
+        }
+        return [createExcelRowStream(filePath)];
     }
 
-    static async processExcelFile(filePath) {
-        const workbook = xlsx.readFile(filePath);
-        const sheetName = workbook.SheetNames[0];
-        const worksheet = workbook.Sheets[sheetName];
-        return xlsx.utils.sheet_to_json(worksheet);
+    // Streaming student import: parse → validate → batch → bulk write.
+    // For CSV, memory stays bounded by the batch size regardless of file size (see
+    // createRowStreams for Excel), and each batch is written while the parser
+    // keeps reading ahead.
+    static async streamStudentsFromFile(filePath, fileExtension, userId, { batchSize, onProgress } = {}) {
+        const results = StudentImportService.createResults();
+        results.total = 0;
+
+        const streams = DataImportController.createRowStreams(filePath, fileExtension);
+        const { size: totalBytes } = await fs.promises.stat(filePath);
+        const source = streams[0];
+
+        await pipeline(
+            ...streams,
+            createValidationStream(DataImportController.validateStudentRow, results),
+            createBatchWriter(
+                async (batch) => {
+                    await StudentImportService.importChunk(batch, userId, results);
+                    if (onProgress) {
+                        // Byte progress is only known for the CSV read stream
+                        onProgress(results, source.bytesRead !== undefined ? { bytesProcessed: source.bytesRead, totalBytes } : {});
+                    }
+                },
+                { batchSize: batchSize || StudentImportService.DEFAULT_BATCH_SIZE }
+            )
+        );
+
+        return results;
     }
 
-    static async validateStudentData(studentsData) {
-        const validatedStudents = [];
-        const errors = [];
+    // Streaming attendance import: parse → batch → bulk upsert, like student files.
+    // Student lookups are cached across batches.
+    static async streamAttendanceFromFile(filePath, fileExtension, userId, { batchSize, onProgress } = {}) {
+        const results = AttendanceImportService.createResults();
+        results.total = 0;
+
+        const streams = DataImportController.createRowStreams(filePath, fileExtension);
+        const { size: totalBytes } = await fs.promises.stat(filePath);
+        const source = streams[0];
+        const studentIdCache = new Map();
+
+        await pipeline(
+            ...streams,
+            createBatchWriter(
+                async (batch) => {
+                    const rowOffset = results.total;
+                    results.total += batch.length;
+                    await AttendanceImportService.importChunk(batch, userId, results, { rowOffset, studentIdCache });
+                    if (onProgress) {
+                        onProgress(results, source.bytesRead !== undefined ? { bytesProcessed: source.bytesRead, totalBytes } : {});
+                    }
+                },
+                { batchSize: batchSize || AttendanceImportService.DEFAULT_BATCH_SIZE }
+            )
+        );
 
-        for (let i = 0; i < studentsData.length; i++) {
-            const student = studentsData[i];
-            const rowNumber = i + 1;
+        return results;
+    }
+
+    // Validate and transform one raw row; returns { student } or { error }
+    static validateStudentRow(student, i) {
+        const rowNumber = i + 1;
 
-            try {
-                // Required field validation
-                if (!student.firstName || !student.lastName || !student.email) {
-                    errors.push({
+        try {
+            // Required field validation
+            if (!student.firstName || !student.lastName || !student.email) {
+                return {
+                    error: {
                         row: rowNumber,
                         error: 'Missing required fields (firstName, lastName, email)'
-                    });
-                    continue;
-                }
+                    }
+                };
+            }
 
-                // Email validation
-                const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
-                if (!emailRegex.test(student.email)) {
-                    errors.push({
+            // Email validation
+            const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+            if (!emailRegex.test(student.email)) {
+                return {
+                    error: {
                         row: rowNumber,
                         error: 'Invalid email format'
-                    });
-                    continue;
-                }
-
-                // Transform and validate data
-                const validatedStudent = {
-                    firstName: student.firstName.trim(),
-                    lastName: student.lastName.trim(),
-                    email: student.email.toLowerCase().trim(),
-                    phone: student.phone || '',
-                    dateOfBirth: student.dateOfBirth ? new Date(student.dateOfBirth) : new Date('2000-01-01'),
-                    gender: student.gender || 'Other',
-                    course: student.course || 'General',
-                    department: student.department || 'General',
-                    batch: student.batch || new Date().getFullYear().toString(),
-                    semester: parseInt(student.semester) || 1,
-                    rollNumber: student.rollNumber || `AUTO_${Date.now()}_${i}`,
-                    admissionDate: student.admissionDate ? new Date(student.admissionDate) : new Date(),
-                    expectedGraduation: student.expectedGraduation ? new Date(student.expectedGraduation) : new Date(Date.now() + 4 * 365 * 24 * 60 * 60 * 1000),
-
-                    // Family information
-                    fatherName: student.fatherName || '',
-                    fatherOccupation: student.fatherOccupation || '',
-                    fatherEducation: student.fatherEducation || 'Graduate',
-                    motherName: student.motherName || '',
-                    motherOccupation: student.motherOccupation || '',
-                    motherEducation: student.motherEducation || 'Graduate',
-
-                    // Financial information
-                    totalFees: parseFloat(student.totalFees) || 0,
-                    feeStatus: student.feeStatus || 'Pending',
-
-                    // Address
-                    address: {
-                        street: student.street || '',
-                        city: student.city || '',
-                        state: student.state || '',
-                        pincode: student.pincode || '',
-                        country: student.country || 'India'
-                    },
-
-                    // Default values
-                    status: 'Active',
-                    riskLevel: 'Low',
-                    riskScore: 0
+                    }
                 };
+            }
+
+            const validatedStudent = {
+                studentId: student.studentId ? String(student.studentId).trim() : undefined,
+                firstName: student.firstName.trim(),
+                lastName: student.lastName.trim(),
+                email: student.email.toLowerCase().trim(),
+                phone: student.phone || '',
+                dateOfBirth: student.dateOfBirth ? new Date(student.dateOfBirth) : new Date('2000-01-01'),
+                gender: student.gender || 'Other',
+                course: student.course || 'General',
+                department: student.department || 'General',
+                batch: student.batch || new Date().getFullYear().toString(),
+                semester: parseInt(student.semester) || 1,
+                rollNumber: student.rollNumber || `AUTO_${Date.now()}_${i}`,
+                admissionDate: student.admissionDate ? new Date(student.admissionDate) : new Date(),
+                expectedGraduation: student.expectedGraduation ? new Date(student.expectedGraduation) : new Date(Date.now() + 4 * 365 * 24 * 60 * 60 * 1000),
+
+                // Family information
+                fatherName: student.fatherName || '',
+                fatherOccupation: student.fatherOccupation || '',
+                fatherEducation: student.fatherEducation || 'Graduate',
+                motherName: student.motherName || '',
+                motherOccupation: student.motherOccupation || '',
+                motherEducation: student.motherEducation || 'Graduate',
+
+                // Financial information
+                totalFees: parseFloat(student.totalFees) || 0,
+                feeStatus: student.feeStatus || 'Pending',
+
+                // Address
+                address: {
+                    street: student.street || '',
+                    city: student.city || '',
+                    state: student.state || '',
+                    pincode: student.pincode || '',
+                    country: student.country || 'India'
+                },
+
+                // Default values
+                status: 'Active',
+                riskLevel: 'Low',
+                riskScore: 0
+            };
+
+            // Institution ID falls back to the roll number
+            validatedStudent.studentId = validatedStudent.studentId || validatedStudent.rollNumber;
 
-                validatedStudents.push(validatedStudent);
+            // Fields that came from the source; the rest are defaults, which are
+            // used for new students but never overwrite an existing student
+            validatedStudent.providedFields = Object.keys(IMPORT_FIELD_SOURCES)
+                .filter(field => hasImportValue(student[IMPORT_FIELD_SOURCES[field]]));
 
-            } catch (error) {
-                errors.push({
+            return { student: validatedStudent };
+
+        } catch (error) {
+            return {
+                error: {
                     row: rowNumber,
                     error: `Data processing error: ${error.message}`
-                });
-            }
-        }
-
-        return { validatedStudents, errors };
-    }
-
-    static async importStudentsToDatabase(validatedData, userId) {
-        const { validatedStudents, errors } = validatedData;
-        const results = {
-            successful: 0,
-            failed: 0,
-            errors: [...errors]
-        };
-
-        for (const studentData of validatedStudents) {
-            try {
-                studentData.createdBy = userId;
-
-                // Check if student already exists
-                const existingStudent = await Student.findOne({
-                    $or: [
-                        { email: studentData.email },
-                        { rollNumber: studentData.rollNumber }
-                    ]
-                });
-
-                if (existingStudent) {
-                    // Update existing student
-                    await Student.findByIdAndUpdate(existingStudent._id, {
-                        ...studentData,
-                        lastUpdatedBy: userId
-                    });
-                    results.successful++;
-                } else {
-                    // Create new student
-                    const newStudent = new Student(studentData);
-                    await newStudent.save();
-                    results.successful++;
                 }
-
-            } catch (error) {
-                results.failed++;
-                results.errors.push({
-                    student: `${studentData.firstName} ${studentData.lastName}`,
-                    error: error.message
-                });
-            }
+            };
         }
+    }
 
-        return results;
+    // Biometric punches (an async iterable): one row per student punch, a punch counts as Present
+    static async processBiometricData(attendanceData, userId, options = {}) {
+        const rows = mapRecords(attendanceData, punch => ({
+            studentId: punch.studentId || punch.enrollmentId || punch.userId,
+            rollNumber: punch.rollNumber,
+            date: punch.date || punch.punchTime || punch.timestamp,
+            subject: punch.subject || 'Daily Attendance',
+            period: punch.period || 1,
+            status: punch.status || 'Present',
+            remarks: punch.deviceId ? `Biometric device ${punch.deviceId}` : undefined
+        }));
+
+        return await AttendanceImportService.importStream(rows, userId, options);
+    }
+
+    // RFID scans (an async iterable): one row per card scan at a location, a scan counts as Present
+    static async processRFIDData(attendanceData, userId, options = {}) {
+        const rows = mapRecords(attendanceData, scan => ({
+            studentId: scan.studentId || scan.cardHolderId,
+            rollNumber: scan.rollNumber,
+            date: scan.date || scan.scanTime || scan.timestamp,
+            subject: scan.subject || 'Daily Attendance',
+            period: scan.period || 1,
+            status: scan.status || 'Present',
+            remarks: scan.location ? `RFID location ${scan.location}` : undefined
+        }));
+
+        return await AttendanceImportService.importStream(rows, userId, options);
     }
 
     // Download template files for data import
@@ -487,23 +923,29 @@ class DataImportController {
     // Get import history
     static async getImportHistory(req, res) {
         try {
-            // This would typically come from a separate ImportLog model
-            // For now, we'll return a mock response
-            const importHistory = [
-                {
-                    id: 1,
-                    type: 'Students',
-                    source: 'CSV File',
-                    filename: 'students_batch_2024.csv',
-                    importedBy: 'Admin User',
-                    importDate: new Date(),
-                    recordsProcessed: 150,
-                    recordsSuccessful: 145,
-                    recordsFailed: 5,
-                    status: 'Completed'
-                }
-                // Add more mock data as needed
-            ];
+            const { limit = 50 } = req.query;
+
+            const logs = await ImportLog.find()
+                .sort({ createdAt: -1 })
+                .limit(Math.min(parseInt(limit) || 50, 200))
+                .select('-errorDetails')
+                .populate('importedBy', 'firstName lastName')
+                .lean();
+
+            const importHistory = logs.map(log => ({
+                id: log._id,
+                type: log.type,
+                source: log.source,
+                filename: log.filename,
+                importedBy: log.importedBy ? `${log.importedBy.firstName} ${log.importedBy.lastName}` : 'Unknown',
+                importDate: log.queuedAt,
+                recordsProcessed: log.recordsProcessed,
+                recordsSuccessful: log.recordsSuccessful,
+                recordsFailed: log.recordsFailed,
+                throughput: log.throughput,
+                durationMs: log.durationMs,
+                status: log.status
+            }));
 
             res.json({ importHistory });
 
@@ -515,6 +957,130 @@ class DataImportController {
             });
         }
     }
+
+    // Get progress / result of a queued import
+    static async getImportStatus(req, res) {
+        try {
+            const { importId } = req.params;
+
+            if (!mongoose.isValidObjectId(importId)) {
+                return res.status(400).json({ message: 'Invalid import id' });
+            }
+
+            const log = await ImportLog.findById(importId);
+            if (!log || (req.user.role !== 'admin' && String(log.importedBy) !== String(req.user.id))) {
+                return res.status(404).json({ message: 'Import not found' });
+            }
+
+            res.json(log.toStatus());
+
+        } catch (error) {
+            console.error('Error fetching import status:', error);
+            res.status(500).json({ 
+                message: 'Error fetching import status', 
+                error: error.message 
+            });
+        }
+    }
+
+    // =============================================================================
+    // SYNCHRONIZATION
+    // =============================================================================
+
+    // Register (or update) a source for scheduled incremental sync
+    static async setupAutoSync(req, res) {
+        try {
+            const { sourceType, config, name, intervalMinutes, enabled = true } = req.body;
+
+            if (!SyncService.sourceTypes().includes(sourceType)) {
+                return res.status(400).json({ message: 'Unsupported sync source type' });
+            }
+            if (!config) {
+                return res.status(400).json({ message: 'Sync configuration is required' });
+            }
+
+            const state = await SyncService.register(sourceType, config, req.user.id, {
+                name,
+                enabled,
+                intervalMinutes: intervalMinutes !== undefined ? parseInt(intervalMinutes) : undefined
+            });
+
+            res.json({
+                message: 'Automatic sync configured',
+                sync: {
+                    sourceKey: state.sourceKey,
+                    sourceType: state.sourceType,
+                    enabled: state.enabled,
+                    intervalMinutes: state.intervalMinutes,
+                    nextSyncAt: state.nextSyncAt
+                }
+            });
+
+        } catch (error) {
+            console.error('Error setting up auto sync:', error);
+            res.status(500).json({ 
+                message: 'Error setting up auto sync', 
+                error: error.message 
+            });
+        }
+    }
+
+    // Queue an incremental sync now, for one source or every enabled source
+    static async triggerManualSync(req, res) {
+        try {
+            const { sourceKey, fullSync = false } = req.body || {};
+
+            const states = await SyncState.find(sourceKey ? { sourceKey } : { enabled: true });
+            if (sourceKey && states.length === 0) {
+                return res.status(404).json({ message: 'Sync source not found' });
+            }
+
+            const imports = [];
+            for (const state of states) {
+                const job = await SyncService.enqueue(state, req.user.id, { fullSync });
+                imports.push({ sourceKey: state.sourceKey, importId: job._id });
+            }
+
+            res.status(202).json({
+                message: `${imports.length} sync job(s) queued`,
+                imports
+            });
+
+        } catch (error) {
+            console.error('Error triggering manual sync:', error);
+            res.status(500).json({ 
+                message: 'Error triggering manual sync', 
+                error: error.message 
+            });
+        }
+    }
+
+    // Last run, markers and schedule of every sync source
+    static async getSyncStatus(req, res) {
+        try {
+            const syncs = await SyncState.find()
+                .select('-cursors')
+                .sort({ sourceType: 1, sourceKey: 1 })
+                .lean();
+
+            res.json({ syncs });
+
+        } catch (error) {
+            console.error('Error fetching sync status:', error);
+            res.status(500).json({ 
+                message: 'Error fetching sync status', 
+                error: error.message 
+            });
+        }
+    }
 }
 
+// Background job handlers
+ImportQueue.register('students-file', DataImportController.runStudentFileImport);
+ImportQueue.register('students-sis', DataImportController.runSISImport);
+ImportQueue.register('students-google-classroom', DataImportController.runGoogleClassroomImport);
+ImportQueue.register('attendance-file', DataImportController.runAttendanceFileImport);
+ImportQueue.register('attendance-biometric', DataImportController.runBiometricImport);
+ImportQueue.register('attendance-rfid', DataImportController.runRFIDImport);
+
 module.exports = DataImportController;
\ No newline at end of file
@@ -1,10 +1,28 @@
 const Student = require('../models/Student');
-const Attendance = require('../models/Attendance');
+const AttendanceSummary = require('../models/AttendanceSummary');
 const Grade = require('../models/Grade');
 const Prediction = require('../models/Prediction');
 const Intervention = require('../models/Intervention');
 const PredictionService = require('../services/predictionService');
+const AttendanceStore = require('../services/attendanceStore');
 const { validationResult } = require('express-validator');
+const { applyCursor, keysetSort, buildPage } = require('../utils/pagination');
+const { getCachedCount } = require('../utils/countCache');
+
+// $lookup with localField/foreignField plus a pipeline needs MongoDB 5.0+; older
+// servers (3.6+) get the equivalent let/$expr join. Checked once per process.
+let legacyLookup = null;
+const usesLegacyLookup = () => {
+    if (legacyLookup === null) {
+        legacyLookup = Student.db.db.admin().serverInfo()
+            .then(info => parseInt(info.version, 10) < 5)
+            .catch((error) => {
+                legacyLookup = null;
+                throw error;
+            });
+    }
+    return legacyLookup;
+};
 
 class StudentController {
 
@@ -20,7 +38,10 @@ class StudentController {
                 status,
                 search,
                 sortBy = 'createdAt',
-                sortOrder = 'desc'
+                sortOrder = 'desc',
+                cursor,
+                pagination,
+                includeTotal
             } = req.query;
 
             // Build filter object
@@ -31,112 +52,218 @@ class StudentController {
             if (riskLevel) filter.riskLevel = riskLevel;
             if (status) filter.status = status;
 
-            // Handle search across multiple fields
+            // Handle search across multiple fields (prefix/n-gram token index)
             if (search) {
-                filter.$or = [
-                    { firstName: { $regex: search, $options: 'i' } },
-                    { lastName: { $regex: search, $options: 'i' } },
-                    { email: { $regex: search, $options: 'i' } },
-                    { studentId: { $regex: search, $options: 'i' } },
-                    { rollNumber: { $regex: search, $options: 'i' } }
-                ];
+                Object.assign(filter, Student.buildSearchFilter(search));
             }
 
             // Role-based filtering
-            if (req.user.role === 'teacher') {
-                // Teachers can only see students from their department
-                filter.department = req.user.department;
-            } else if (req.user.role === 'parent') {
-                // Parents can only see their children
-                filter._id = { $in: req.user.parentData.children };
+            StudentController.applyRoleFilter(filter, req.user);
+
+            const limitNum = Math.min(Math.max(parseInt(limit) || 20, 1), 100);
+            const direction = sortOrder === 'asc' ? 1 : -1;
+            const sortObj = keysetSort(sortBy, direction);
+
+            // Keyset pagination: ?pagination=cursor for the first page, then ?cursor=<nextCursor>.
+            // The total is only counted on request (?includeTotal=true) and served from a short-lived cache.
+            if (cursor !== undefined || pagination === 'cursor') {
+                const pageFilter = applyCursor(filter, sortBy, direction, cursor);
+                const legacy = await usesLegacyLookup();
+                const [rows, total] = await Promise.all([
+                    Student.aggregate(StudentController.buildListingPipeline(pageFilter, sortObj, 0, limitNum + 1, legacy)),
+                    includeTotal === 'true' ? getCachedCount(Student, filter) : null
+                ]);
+                const { items, hasNextPage, nextCursor } = buildPage(rows, limitNum, sortBy, direction);
+
+                return res.json({
+                    students: items,
+                    nextCursor,
+                    hasNextPage,
+                    total
+                });
             }
 
-            // Execute query with pagination
-            const skip = (page - 1) * limit;
-            const sortObj = {};
-            sortObj[sortBy] = sortOrder === 'asc' ? 1 : -1;
+            // Execute query with offset pagination
+            const pageNum = Math.max(parseInt(page) || 1, 1);
+            const skip = (pageNum - 1) * limitNum;
 
-            const students = await Student.find(filter)
-                .select('-createdBy -lastUpdatedBy')
-                .sort(sortObj)
-                .limit(limit * 1)
-                .skip(skip)
-                .lean();
-
-            const total = await Student.countDocuments(filter);
-
-            // Add computed fields
-            for (let student of students) {
-                // Calculate attendance percentage
-                const attendanceRecords = await Attendance.find({ studentId: student._id });
-                if (attendanceRecords.length > 0) {
-                    const presentCount = attendanceRecords.filter(record => record.status === 'Present').length;
-                    student.attendancePercentage = Math.round((presentCount / attendanceRecords.length) * 100);
-                } else {
-                    student.attendancePercentage = 0;
-                }
-
-                // Get latest prediction
-                const latestPrediction = await Prediction.findOne({ 
-                    studentId: student._id, 
-                    isActive: true 
-                }).sort({ predictionDate: -1 });
-
-                student.latestPrediction = latestPrediction ? {
-                    riskScore: latestPrediction.riskScore,
-                    riskLevel: latestPrediction.riskLevel,
-                    dropoutProbability: latestPrediction.dropoutProbability
-                } : null;
-            }
+            // Computed fields are joined server-side, one round trip per page
+            const legacy = await usesLegacyLookup();
+            const [students, total] = await Promise.all([
+                Student.aggregate(StudentController.buildListingPipeline(filter, sortObj, skip, limitNum, legacy)),
+                getCachedCount(Student, filter)
+            ]);
 
             res.json({
                 students,
-                totalPages: Math.ceil(total / limit),
-                currentPage: parseInt(page),
+                totalPages: Math.ceil(total / limitNum),
+                currentPage: pageNum,
                 total,
-                hasNextPage: page < Math.ceil(total / limit),
-                hasPrevPage: page > 1
+                hasNextPage: pageNum < Math.ceil(total / limitNum),
+                hasPrevPage: pageNum > 1
             });
 
         } catch (error) {
+            if (error.status === 400 || error.name === 'CastError') {
+                return res.status(400).json({ message: error.message });
+            }
+
             console.error('Error fetching students:', error);
             res.status(500).json({ message: 'Error fetching students', error: error.message });
         }
     }
 
-    // Get single student by ID
-    static async getStudentById(req, res) {
+    // Restrict a student filter to what the requesting user may see
+    static applyRoleFilter(filter, user) {
+        if (user.role === 'teacher') {
+            // Teachers can only see students from their department
+            filter.department = user.department;
+        } else if (user.role === 'parent') {
+            // Parents can only see their children
+            filter._id = { $in: user.parentData.children };
+        }
+        return filter;
+    }
+
+    // Type-ahead search served from the searchTokens index
+    static async searchStudents(req, res) {
         try {
-            const { id } = req.params;
+            const { query = '', filters = {}, limit = 20 } = req.body;
 
-            const student = await Student.findById(id);
-            if (!student) {
-                return res.status(404).json({ message: 'Student not found' });
+            const searchFilter = Student.buildSearchFilter(query);
+            if (!searchFilter.searchTokens) {
+                return res.json({ students: [], count: 0 });
+            }
+
+            const filter = { ...searchFilter };
+            for (const field of ['course', 'department', 'riskLevel', 'status', 'batch']) {
+                if (typeof filters[field] === 'string') filter[field] = filters[field];
             }
+            StudentController.applyRoleFilter(filter, req.user);
+
+            const students = await Student.find(filter)
+                .select('firstName lastName email studentId rollNumber course department riskLevel riskScore')
+                .limit(Math.min(parseInt(limit) || 20, 100))
+                .lean();
+
+            res.json({ students, count: students.length });
+
+        } catch (error) {
+            console.error('Error searching students:', error);
+            res.status(500).json({ 
+                message: 'Error searching students', 
+                error: error.message 
+            });
+        }
+    }
+
+    // Aggregation pipeline for the student list: one page of students with
+    // attendancePercentage (from AttendanceSummary) and latestPrediction joined by $lookup
+    static buildListingPipeline(filter, sortObj, skip, limit, legacyLookup = false) {
+        return [
+            // Aggregation skips schema casting, so query values are cast here
+            { $match: Student.find().cast(Student, filter) },
+            { $sort: sortObj },
+            { $skip: skip },
+            { $limit: limit },
+            { $project: { createdBy: 0, lastUpdatedBy: 0, searchTokens: 0 } },
+            StudentController.lookupByStudent(AttendanceSummary.collection.name, [
+                { $project: { _id: 0, total: 1, present: 1 } }
+            ], 'attendanceStats', legacyLookup),
+            StudentController.lookupByStudent(Prediction.collection.name, [
+                { $match: { isActive: true } },
+                { $sort: { predictionDate: -1 } },
+                { $limit: 1 },
+                { $project: { _id: 0, riskScore: 1, riskLevel: 1, dropoutProbability: 1 } }
+            ], 'latestPrediction', legacyLookup),
+            {
+                $addFields: {
+                    attendancePercentage: {
+                        $let: {
+                            vars: { stats: { $arrayElemAt: ['$attendanceStats', 0] } },
+                            in: {
+                                $cond: [
+                                    { $gt: ['$$stats.total', 0] },
+                                    // Math.round semantics (half up), $round would round half to even
+                                    { $floor: { $add: [{ $multiply: [{ $divide: ['$$stats.present', '$$stats.total'] }, 100] }, 0.5] } },
+                                    0
+                                ]
+                            }
+                        }
+                    },
+                    latestPrediction: { $ifNull: [{ $arrayElemAt: ['$latestPrediction', 0] }, null] }
+                }
+            },
+            { $project: { attendanceStats: 0 } }
+        ];
+    }
+
+    // Join a per-student collection on studentId, running `pipeline` on the matches
+    static lookupByStudent(from, pipeline, as, legacy) {
+        if (legacy) {
+            return {
+                $lookup: {
+                    from,
+                    let: { studentId: '$_id' },
+                    pipeline: [{ $match: { $expr: { $eq: ['$studentId', '$$studentId'] } } }, ...pipeline],
+                    as
+                }
+            };
+        }
+        return { $lookup: { from, localField: '_id', foreignField: 'studentId', pipeline, as } };
+    }
+
+    // Get single student by ID.
+    // ?fields=student,attendance,grades,prediction,interventions selects the profile
+    // sections to load (default: all); the selected reads run concurrently.
+    static async getStudentById(req, res) {
+        try {
+            const { id } = req.params;
+            const sections = StudentController.parseProfileFields(req.query.fields);
 
             // Role-based access control
             if (req.user.role === 'parent') {
-                if (!req.user.parentData.children.includes(student._id)) {
+                if (!req.user.parentData.children.some(child => child.toString() === id)) {
                     return res.status(403).json({ message: 'Access denied' });
                 }
             }
 
-            // Get additional data
-            const attendancePercentage = await student.calculateAttendancePercentage();
-            const latestGrades = await student.getLatestGrades();
+            const [student, attendancePercentage, latestGrades, latestPrediction, activeInterventions] = await Promise.all([
+                Student.findById(id).select(sections.has('student') ? '' : '_id').lean(),
+
+                sections.has('attendance')
+                    ? AttendanceSummary.getAttendancePercentage(id)
+                    : undefined,
+
+                sections.has('grades')
+                    ? Grade.find({ studentId: id })
+                        .select('subject subjectCode semester academicYear assessmentType maxMarks obtainedMarks percentage grade gradePoints assessmentDate')
+                        .sort({ createdAt: -1 })
+                        .limit(10)
+                        .lean()
+                    : undefined,
+
+                sections.has('prediction')
+                    ? Prediction.findOne({ studentId: id, isActive: true })
+                        .select('dropoutProbability riskScore riskLevel prediction modelVersion modelType featureImportance explanation predictionDate validUntil')
+                        .sort({ predictionDate: -1 })
+                        .lean()
+                    : undefined,
+
+                sections.has('interventions')
+                    ? Intervention.find({ studentId: id, status: { $in: ['Planned', 'Active'] } })
+                        .select('type title description assignedTo startDate endDate frequency totalSessions status')
+                        .populate('assignedTo', 'firstName lastName')
+                        .lean()
+                    : undefined
+            ]);
 
-            const latestPrediction = await Prediction.findOne({ 
-                studentId: id, 
-                isActive: true 
-            }).sort({ predictionDate: -1 });
-
-            const activeInterventions = await Intervention.find({ 
-                studentId: id, 
-                status: { $in: ['Planned', 'Active'] }
-            }).populate('assignedTo', 'firstName lastName');
+            if (!student) {
+                return res.status(404).json({ message: 'Student not found' });
+            }
 
             res.json({
-                student,
+                student: sections.has('student') ? student : undefined,
                 attendancePercentage,
                 latestGrades,
                 latestPrediction,
@@ -149,6 +276,18 @@ class StudentController {
         }
     }
 
+    static parseProfileFields(fields) {
+        const allSections = ['student', 'attendance', 'grades', 'prediction', 'interventions'];
+        if (!fields) return new Set(allSections);
+
+        return new Set(
+            String(fields)
+                .split(',')
+                .map(field => field.trim())
+                .filter(field => allSections.includes(field))
+        );
+    }
+
     // Create new student
     static async createStudent(req, res) {
         try {
@@ -165,8 +304,12 @@ class StudentController {
             const student = new Student(studentData);
             await student.save();
 
-            // Generate initial risk assessment
-            await PredictionService.generatePrediction(student._id);
+            // Initial risk assessment is queued, not awaited: the student is saved either
+            // way, and one that could not be scored now (inference pool down) is scored
+            // on its first risk-assessment read or the next batch scoring run
+            PredictionService.generatePrediction(student._id).catch((error) => {
+                console.error(`Initial prediction for student ${student._id} failed:`, error.message);
+            });
 
             res.status(201).json({
                 message: 'Student created successfully',
@@ -208,13 +351,12 @@ class StudentController {
                 return res.status(404).json({ message: 'Student not found' });
             }
 
-            // Regenerate risk assessment if key fields changed
-            const keyFields = ['currentCGPA', 'feeStatus', 'status'];
-            const changedFields = Object.keys(updates);
-            const shouldRegenerate = keyFields.some(field => changedFields.includes(field));
-
-            if (shouldRegenerate) {
-                await PredictionService.generatePrediction(student._id);
+            // Re-score only if the update actually changed a model input; the
+            // Student update hook has already expired the cached prediction then
+            if (Student.touchesPredictionInputs(Object.keys(updates))) {
+                PredictionService.getPrediction(student._id).catch((error) => {
+                    console.error(`Re-scoring student ${student._id} failed:`, error.message);
+                });
             }
 
             res.json({
@@ -242,7 +384,7 @@ class StudentController {
             }
 
             // Clean up related data
-            await Attendance.deleteMany({ studentId: id });
+            await AttendanceStore.deleteForStudent(id);
             await Grade.deleteMany({ studentId: id });
             await Prediction.deleteMany({ studentId: id });
             await Intervention.deleteMany({ studentId: id });
@@ -258,23 +400,97 @@ class StudentController {
         }
     }
 
+    // Get student's attendance records (works in either attendance storage mode)
+    static async getStudentAttendance(req, res) {
+        try {
+            const { id } = req.params;
+            const { from, to } = req.query;
+
+            if (req.user.role === 'parent' &&
+                !req.user.parentData.children.some(child => child.toString() === id)) {
+                return res.status(403).json({ message: 'Access denied' });
+            }
+
+            const [records, summary] = await Promise.all([
+                AttendanceStore.findForStudent(id, { from, to }),
+                AttendanceSummary.findOne({ studentId: id }).lean()
+            ]);
+
+            res.json({ records, summary, count: records.length });
+
+        } catch (error) {
+            console.error('Error fetching student attendance:', error);
+            res.status(500).json({ 
+                message: 'Error fetching attendance', 
+                error: error.message 
+            });
+        }
+    }
+
+    // Get student's current risk assessment (cached until its inputs change).
+    // ?explain=exact computes exact feature attributions for this view; routine
+    // scoring only stores the approximate ones.
+    static async getStudentRiskAssessment(req, res) {
+        try {
+            const { id } = req.params;
+
+            if (req.user.role === 'parent' &&
+                !req.user.parentData.children.some(child => child.toString() === id)) {
+                return res.status(403).json({ message: 'Access denied' });
+            }
+
+            const prediction = req.query.explain === 'exact'
+                ? await PredictionService.explainPrediction(id)
+                : await PredictionService.getPrediction(id);
+
+            res.json({ prediction, topRiskFactors: prediction.getTopRiskFactors() });
+
+        } catch (error) {
+            if (error.message.startsWith('Student not found')) {
+                return res.status(404).json({ message: 'Student not found' });
+            }
+
+            console.error('Error fetching risk assessment:', error);
+            res.status(500).json({
+                message: 'Error fetching risk assessment',
+                error: error.message
+            });
+        }
+    }
+
     // Additional methods...
     static async getStudentsByRiskLevel(req, res) {
         try {
             const { level } = req.params;
+            const { cursor, limit = 50, includeTotal } = req.query;
             const validLevels = ['Low', 'Medium', 'High'];
 
             if (!validLevels.includes(level)) {
                 return res.status(400).json({ message: 'Invalid risk level' });
             }
 
-            const students = await Student.find({ riskLevel: level })
-                .select('firstName lastName studentId course department riskScore')
-                .sort({ riskScore: -1 });
+            // Keyset pagination on { riskScore: -1, _id: -1 }
+            const limitNum = Math.min(Math.max(parseInt(limit) || 50, 1), 100);
+            const filter = { riskLevel: level };
+            const pageFilter = applyCursor(filter, 'riskScore', -1, cursor);
 
-            res.json({ students, count: students.length });
+            const [rows, total] = await Promise.all([
+                Student.find(pageFilter)
+                    .select('firstName lastName studentId course department riskScore')
+                    .sort(keysetSort('riskScore', -1))
+                    .limit(limitNum + 1)
+                    .lean(),
+                includeTotal === 'true' ? getCachedCount(Student, filter) : null
+            ]);
+            const { items, hasNextPage, nextCursor } = buildPage(rows, limitNum, 'riskScore', -1);
+
+            res.json({ students: items, count: items.length, nextCursor, hasNextPage, total });
 
         } catch (error) {
+            if (error.status === 400) {
+                return res.status(400).json({ message: error.message });
+            }
+
             console.error('Error fetching students by risk level:', error);
             res.status(500).json({ 
                 message: 'Error fetching students', 
@@ -1,4 +1,7 @@
 const mongoose = require('mongoose');
+const AttendanceSummary = require('./AttendanceSummary');
+const Prediction = require('./Prediction');
+const SequenceEvent = require('./SequenceEvent');
 
 const AttendanceSchema = new mongoose.Schema({
     studentId: {
@@ -57,4 +60,116 @@ AttendanceSchema.index({ teacherId: 1, date: 1 });
 // Compound index for unique attendance per student per subject per period per day
 AttendanceSchema.index({ studentId: 1, date: 1, subject: 1, period: 1 }, { unique: true });
 
+// Attendance changes, as { studentId, date, subject, status, count } deltas, are
+// rolled into AttendanceSummary, expire the students' cached predictions and are
+// logged for the sequence cache
+const toDeltas = (records, count) => records.map(record => ({
+    studentId: record.studentId,
+    date: record.date,
+    subject: record.subject,
+    status: record.status,
+    count
+}));
+
+const applyChanges = async (deltas) => {
+    const changed = deltas.filter(delta => delta.count);
+    if (changed.length === 0) return;
+
+    await AttendanceSummary.applyDeltas(changed);
+    await Prediction.invalidate([...new Set(changed.map(delta => String(delta.studentId)))], 'attendance');
+    await SequenceEvent.recordAttendance(changed);
+};
+
+AttendanceSchema.statics.applyChanges = applyChanges;
+
+// Changes made through the model are applied by these hooks: saves, inserts,
+// updates and findOneAndDelete. bulkWrite is not covered; it is used by
+// AttendanceStore, which applies exact deltas itself via Attendance.applyChanges
+// (and passes { skipSummary: true } on its queries).
+AttendanceSchema.post('init', function() {
+    this.$locals.summarized = { date: this.date, subject: this.subject, status: this.status };
+});
+
+AttendanceSchema.post('save', async function() {
+    const previous = this.$locals.summarized;
+    const current = { studentId: this.studentId, date: this.date, subject: this.subject, status: this.status };
+
+    if (!previous) {
+        await applyChanges(toDeltas([current], 1));
+    } else if (previous.status !== current.status ||
+               previous.subject !== current.subject ||
+               previous.date.getTime() !== current.date.getTime()) {
+        await applyChanges([...toDeltas([{ studentId: this.studentId, ...previous }], -1), ...toDeltas([current], 1)]);
+    }
+
+    this.$locals.summarized = { date: this.date, subject: this.subject, status: this.status };
+});
+
+AttendanceSchema.post('findOneAndDelete', async function(doc) {
+    if (doc) {
+        await applyChanges(toDeltas([doc], -1));
+    }
+});
+
+AttendanceSchema.post('insertMany', async function(docs) {
+    await applyChanges(toDeltas(docs, 1));
+});
+
+// Query updates: snapshot the matched records before the write, then diff the
+// same records (or the upserted one) afterwards
+const SUMMARY_FIELDS = 'studentId date subject status';
+const matchedBefore = new WeakMap();
+
+const summarized = (record) => ({
+    studentId: record.studentId,
+    date: record.date,
+    subject: record.subject,
+    status: record.status
+});
+
+const snapshotMatches = async function() {
+    if (this.getOptions().skipSummary) return;
+    const filter = this.getFilter();
+    const matches = this.op === 'updateMany'
+        ? await this.model.find(filter).select(SUMMARY_FIELDS).lean()
+        : [await this.model.findOne(filter).select(SUMMARY_FIELDS).lean()].filter(Boolean);
+    matchedBefore.set(this, matches);
+};
+
+const summarizeUpdate = async function() {
+    const before = matchedBefore.get(this);
+    if (!before) return;
+    matchedBefore.delete(this);
+
+    let after = [];
+    if (before.length > 0) {
+        after = await this.model.find({ _id: { $in: before.map(record => record._id) } }).select(SUMMARY_FIELDS).lean();
+    } else if (this.getOptions().upsert) {
+        after = [await this.model.findOne(this.getFilter()).select(SUMMARY_FIELDS).lean()].filter(Boolean);
+    }
+
+    const beforeById = new Map(before.map(record => [record._id.toString(), record]));
+    const removed = [];
+    const added = [];
+    for (const record of after) {
+        const previous = beforeById.get(record._id.toString());
+        if (previous &&
+            String(previous.studentId) === String(record.studentId) &&
+            previous.status === record.status &&
+            previous.subject === record.subject &&
+            previous.date.getTime() === record.date.getTime()) {
+            continue;
+        }
+        if (previous) removed.push(summarized(previous));
+        added.push(summarized(record));
+    }
+
+    await applyChanges([...toDeltas(removed, -1), ...toDeltas(added, 1)]);
+};
+
+for (const op of ['findOneAndUpdate', 'updateOne', 'updateMany']) {
+    AttendanceSchema.pre(op, { document: false, query: true }, snapshotMatches);
+    AttendanceSchema.post(op, { document: false, query: true }, summarizeUpdate);
+}
+
 module.exports = mongoose.model('Attendance', AttendanceSchema);
\ No newline at end of file
@@ -0,0 +1,281 @@
+const mongoose = require('mongoose');
+
+// Bucketed attendance storage: one document per student per month.
+// Every (subject, day, period) owns one byte-sized status slot: `statuses` holds
+// one segment of SLOT_COUNT slots per entry of `subjects`, in dictionary order.
+
+const PERIODS_PER_DAY = 8;
+const SLOT_COUNT = 31 * PERIODS_PER_DAY;
+const STATUS_CODES = [null, 'Present', 'Absent', 'Late', 'Excused'];
+const MAX_WRITE_ATTEMPTS = 3;
+// Write tokens kept per bucket to tell a writer's own update from a competing one
+const RECENT_WRITES = 16;
+
+const AttendanceBucketSchema = new mongoose.Schema({
+    studentId: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'Student',
+        required: true
+    },
+    month: {
+        type: String, // YYYY-MM (UTC)
+        required: true,
+        match: /^\d{4}-\d{2}$/
+    },
+
+    // Subject dictionary; subject i owns statuses[i * SLOT_COUNT, (i + 1) * SLOT_COUNT)
+    subjects: [String],
+    statuses: {
+        type: Buffer,
+        default: () => Buffer.alloc(0)
+    },
+    count: {
+        type: Number,
+        default: 0
+    },
+
+    // Optimistic concurrency for read-modify-write of the packed buffer
+    revision: {
+        type: Number,
+        default: 0
+    },
+    writes: [mongoose.Schema.Types.ObjectId]
+}, {
+    timestamps: true
+});
+
+// One bucket per student per month
+AttendanceBucketSchema.index({ studentId: 1, month: 1 }, { unique: true });
+
+// Lean reads return BSON Binary for Buffer paths
+const toBuffer = (value) => {
+    if (!value) return Buffer.alloc(0);
+    return Buffer.from(Buffer.isBuffer(value) ? value : value.buffer);
+};
+
+const locate = (date, period) => {
+    const day = new Date(date);
+    return {
+        month: day.toISOString().slice(0, 7),
+        slot: (day.getUTCDate() - 1) * PERIODS_PER_DAY + (period - 1)
+    };
+};
+
+// A bucket's subjects and per-subject status segments (a writable copy)
+const unpack = (bucket) => {
+    const subjects = bucket ? [...bucket.subjects] : [];
+    const statuses = Buffer.alloc(subjects.length * SLOT_COUNT);
+    toBuffer(bucket && bucket.statuses).copy(statuses);
+    return { subjects, statuses };
+};
+
+// Expand a (lean or hydrated) bucket into Attendance-shaped records, by date and period
+const expand = (bucket) => {
+    const { subjects, statuses } = unpack(bucket);
+    const [year, month] = bucket.month.split('-').map(Number);
+    const records = [];
+
+    for (let slot = 0; slot < SLOT_COUNT; slot++) {
+        for (let code = 0; code < subjects.length; code++) {
+            const status = statuses[code * SLOT_COUNT + slot];
+            if (!status) continue;
+            records.push({
+                studentId: bucket.studentId,
+                date: new Date(Date.UTC(year, month - 1, Math.floor(slot / PERIODS_PER_DAY) + 1)),
+                period: (slot % PERIODS_PER_DAY) + 1,
+                subject: subjects[code],
+                status: STATUS_CODES[status]
+            });
+        }
+    }
+
+    return records;
+};
+
+AttendanceBucketSchema.methods.toRecords = function() {
+    return expand(this);
+};
+
+// Write attendance records into their monthly buckets.
+// Returns { written: [{ index, previous }], errors: [{ index, error }] } where
+// `index` points into `records` and `previous` is the slot's prior record (if any).
+// An occupied slot is reported as a duplicate unless `overwrite` is set.
+AttendanceBucketSchema.statics.writeRecords = async function(records, { overwrite = false } = {}) {
+    const result = { written: [], errors: [] };
+    let pending = new Map();
+
+    records.forEach((record, index) => {
+        // The buckets are written through the raw collection, so ids are cast here
+        let studentId;
+        try {
+            ({ studentId } = this.castObject({ studentId: record.studentId }));
+        } catch (error) {
+            result.errors.push({ index, error: `Invalid studentId: ${record.studentId}` });
+            return;
+        }
+
+        const { month, slot } = locate(record.date, record.period);
+        const key = `${studentId}:${month}`;
+        if (!pending.has(key)) {
+            pending.set(key, { studentId, month, items: [] });
+        }
+        pending.get(key).items.push({ record, index, slot });
+    });
+
+    for (let attempt = 1; pending.size > 0; attempt++) {
+        const groups = [...pending.values()];
+        const existing = await this.find({
+            $or: groups.map(group => ({ studentId: group.studentId, month: group.month }))
+        }).lean();
+        const existingByKey = new Map(existing.map(bucket => [`${bucket.studentId}:${bucket.month}`, bucket]));
+
+        const writeToken = new mongoose.Types.ObjectId();
+        const operations = [];
+        const operationKeys = [];
+        const outcomes = new Map();
+
+        for (const [key, group] of pending) {
+            const bucket = existingByKey.get(key);
+            let { subjects, statuses } = unpack(bucket);
+            let count = bucket ? bucket.count : 0;
+            const written = [];
+            const errors = [];
+
+            for (const { record, index, slot } of group.items) {
+                const statusCode = STATUS_CODES.indexOf(record.status);
+                if (statusCode <= 0) {
+                    errors.push({ index, error: `Invalid attendance status: ${record.status}` });
+                    continue;
+                }
+
+                let subjectCode = subjects.indexOf(record.subject) + 1;
+                if (subjectCode === 0) {
+                    subjects.push(record.subject);
+                    statuses = Buffer.concat([statuses, Buffer.alloc(SLOT_COUNT)]);
+                    subjectCode = subjects.length;
+                }
+                const position = (subjectCode - 1) * SLOT_COUNT + slot;
+
+                let previous = null;
+                if (statuses[position]) {
+                    previous = {
+                        studentId: group.studentId,
+                        date: record.date,
+                        period: record.period,
+                        subject: record.subject,
+                        status: STATUS_CODES[statuses[position]]
+                    };
+                    if (!overwrite) {
+                        errors.push({ index, error: 'Duplicate attendance record for this period' });
+                        continue;
+                    }
+                } else {
+                    count++;
+                }
+
+                statuses[position] = statusCode;
+                written.push({ index, previous });
+            }
+
+            outcomes.set(key, { written, errors });
+            if (written.length === 0) continue;
+
+            const fields = this.castObject({ subjects, statuses, count, updatedAt: new Date() });
+            operationKeys.push(key);
+            if (bucket) {
+                operations.push({
+                    updateOne: {
+                        filter: { _id: bucket._id, revision: bucket.revision },
+                        update: {
+                            $set: fields,
+                            $inc: { revision: 1 },
+                            $push: { writes: { $each: [writeToken], $slice: -RECENT_WRITES } }
+                        }
+                    }
+                });
+            } else {
+                operations.push({
+                    insertOne: {
+                        document: this.castObject({
+                            studentId: group.studentId,
+                            month: group.month,
+                            ...fields,
+                            revision: 1,
+                            writes: [writeToken],
+                            createdAt: new Date()
+                        })
+                    }
+                });
+            }
+        }
+
+        // Failed inserts (another writer created the bucket first) and updates whose
+        // revision moved underneath us lost a race: re-read and retry those buckets.
+        // An update landed only if the bucket carries this attempt's write token, so a
+        // later competing write is never mistaken for (or hides) our own.
+        const retry = new Map();
+        if (operations.length > 0) {
+            let bulkResult;
+            try {
+                bulkResult = await this.collection.bulkWrite(operations, { ordered: false });
+            } catch (error) {
+                if (!error.writeErrors) throw error;
+                bulkResult = error.result;
+                for (const writeError of error.writeErrors) {
+                    const key = operationKeys[writeError.index];
+                    retry.set(key, pending.get(key));
+                }
+            }
+
+            const updateKeys = operationKeys.filter((key, i) => operations[i].updateOne);
+            if (bulkResult.matchedCount < updateKeys.length) {
+                const landed = await this.find({
+                    _id: { $in: updateKeys.map(key => existingByKey.get(key)._id) },
+                    writes: writeToken
+                }).select('studentId month').lean();
+                const landedKeys = new Set(landed.map(bucket => `${bucket.studentId}:${bucket.month}`));
+
+                for (const key of updateKeys) {
+                    if (!landedKeys.has(key)) retry.set(key, pending.get(key));
+                }
+            }
+        }
+
+        for (const [key, outcome] of outcomes) {
+            if (retry.has(key) && attempt < MAX_WRITE_ATTEMPTS) continue;
+            if (retry.has(key)) {
+                result.errors.push(...outcome.written.map(({ index }) => ({
+                    index,
+                    error: 'Concurrent update conflict, please retry'
+                })));
+            } else {
+                result.written.push(...outcome.written);
+            }
+            result.errors.push(...outcome.errors);
+        }
+
+        pending = attempt < MAX_WRITE_ATTEMPTS ? retry : new Map();
+    }
+
+    return result;
+};
+
+// Records for one student, optionally limited to a date range
+AttendanceBucketSchema.statics.findRecords = async function(studentId, { from, to } = {}) {
+    const filter = { studentId };
+    if (from || to) {
+        filter.month = {};
+        if (from) filter.month.$gte = new Date(from).toISOString().slice(0, 7);
+        if (to) filter.month.$lte = new Date(to).toISOString().slice(0, 7);
+    }
+
+    const buckets = await this.find(filter).sort({ month: 1 }).lean();
+    return buckets
+        .flatMap(expand)
+        .filter(record => (!from || record.date >= new Date(from)) && (!to || record.date <= new Date(to)));
+};
+
+AttendanceBucketSchema.statics.expand = expand;
+AttendanceBucketSchema.statics.locate = locate;
+
+module.exports = mongoose.model('AttendanceBucket', AttendanceBucketSchema);
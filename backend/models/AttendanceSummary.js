@@ -0,0 +1,225 @@
+const mongoose = require('mongoose');
+
+// Per-student attendance rollup, maintained incrementally by every attendance
+// write path so percentages can be read without scanning Attendance.
+
+const CounterSchema = new mongoose.Schema({
+    total: { type: Number, default: 0 },
+    present: { type: Number, default: 0 },
+    late: { type: Number, default: 0 },
+    absent: { type: Number, default: 0 },
+    excused: { type: Number, default: 0 }
+}, { _id: false });
+
+const AttendanceSummarySchema = new mongoose.Schema({
+    studentId: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'Student',
+        required: true,
+        unique: true
+    },
+
+    // Overall counters
+    total: { type: Number, default: 0 },
+    present: { type: Number, default: 0 },
+    late: { type: Number, default: 0 },
+    absent: { type: Number, default: 0 },
+    excused: { type: Number, default: 0 },
+
+    // Breakdown counters, keyed by subject and by month (YYYY-MM)
+    bySubject: {
+        type: Map,
+        of: CounterSchema,
+        default: {}
+    },
+    byMonth: {
+        type: Map,
+        of: CounterSchema,
+        default: {}
+    },
+
+    lastRecordDate: {
+        type: Date
+    },
+
+    // Start of the rebuild that last recomputed this summary
+    rebuiltAt: {
+        type: Date
+    }
+}, {
+    timestamps: true
+});
+
+const STATUS_COUNTERS = {
+    Present: 'present',
+    Absent: 'absent',
+    Late: 'late',
+    Excused: 'excused'
+};
+
+// Map keys cannot contain '.' or start with '$'
+const subjectKey = (subject) => String(subject).replace(/[.$]/g, '_');
+
+const monthKey = (date) => new Date(date).toISOString().slice(0, 7);
+
+// Apply +1/-1 deltas for a list of attendance records.
+// Each entry is { studentId, date, subject, status, count }.
+AttendanceSummarySchema.statics.applyDeltas = async function(entries) {
+    const incByStudent = new Map();
+    const lastDateByStudent = new Map();
+
+    for (const entry of entries) {
+        const counter = STATUS_COUNTERS[entry.status];
+        if (!counter || !entry.count) continue;
+
+        const key = entry.studentId.toString();
+        if (!incByStudent.has(key)) incByStudent.set(key, {});
+        const inc = incByStudent.get(key);
+
+        const prefixes = [
+            '',
+            `bySubject.${subjectKey(entry.subject)}.`,
+            `byMonth.${monthKey(entry.date)}.`
+        ];
+        for (const prefix of prefixes) {
+            inc[`${prefix}total`] = (inc[`${prefix}total`] || 0) + entry.count;
+            inc[`${prefix}${counter}`] = (inc[`${prefix}${counter}`] || 0) + entry.count;
+        }
+
+        if (entry.count > 0) {
+            const date = new Date(entry.date);
+            const lastDate = lastDateByStudent.get(key);
+            if (!lastDate || date > lastDate) lastDateByStudent.set(key, date);
+        }
+    }
+
+    if (incByStudent.size === 0) return;
+
+    const operations = [];
+    for (const [studentId, inc] of incByStudent) {
+        const update = { $inc: inc };
+        if (lastDateByStudent.has(studentId)) {
+            update.$max = { lastRecordDate: lastDateByStudent.get(studentId) };
+        }
+        operations.push({
+            updateOne: {
+                filter: { studentId: new mongoose.Types.ObjectId(studentId) },
+                update,
+                upsert: true
+            }
+        });
+    }
+
+    await this.bulkWrite(operations, { ordered: false });
+};
+
+// Percentage of classes attended (Present), rounded to 2 decimal places
+AttendanceSummarySchema.statics.getAttendancePercentage = async function(studentId) {
+    const summary = await this.findOne({ studentId }).select('total present').lean();
+    if (!summary || summary.total === 0) return 0;
+
+    return Math.round((summary.present / summary.total) * 100 * 100) / 100;
+};
+
+// Recompute summaries from stored attendance (backfill / repair).
+// Pass a filter such as { studentId } to limit the rebuild, and
+// { source: 'buckets' } when attendance is kept in AttendanceBucket.
+// Summaries in scope (all, or the filter's studentId) of students without any
+// attendance left are deleted.
+AttendanceSummarySchema.statics.rebuild = async function(filter = {}, { source = 'documents' } = {}) {
+    const startedAt = new Date();
+    const groups = source === 'buckets'
+        ? bucketGroups(mongoose.model('AttendanceBucket'), filter)
+        : mongoose.model('Attendance').aggregate([
+            { $match: filter },
+            {
+                $group: {
+                    _id: {
+                        studentId: '$studentId',
+                        subject: '$subject',
+                        month: { $dateToString: { format: '%Y-%m', date: '$date' } },
+                        status: '$status'
+                    },
+                    count: { $sum: 1 },
+                    lastRecordDate: { $max: '$date' }
+                }
+            },
+            { $sort: { '_id.studentId': 1 } }
+        ]).cursor({ batchSize: 1000 });
+
+    let current = null;
+    let rebuilt = 0;
+
+    const flush = async () => {
+        if (!current) return;
+        await this.replaceOne({ studentId: current.studentId }, { ...current, rebuiltAt: startedAt }, { upsert: true });
+        rebuilt++;
+    };
+
+    for await (const group of groups) {
+        const { studentId, subject, month, status } = group._id;
+        const counter = STATUS_COUNTERS[status];
+        if (!counter) continue;
+
+        if (!current || !current.studentId.equals(studentId)) {
+            await flush();
+            current = {
+                studentId,
+                total: 0, present: 0, late: 0, absent: 0, excused: 0,
+                bySubject: {},
+                byMonth: {},
+                lastRecordDate: null
+            };
+        }
+
+        const subjectCounters = current.bySubject[subjectKey(subject)] ||= { total: 0, present: 0, late: 0, absent: 0, excused: 0 };
+        const monthCounters = current.byMonth[month] ||= { total: 0, present: 0, late: 0, absent: 0, excused: 0 };
+        for (const counters of [current, subjectCounters, monthCounters]) {
+            counters.total += group.count;
+            counters[counter] += group.count;
+        }
+        if (!current.lastRecordDate || group.lastRecordDate > current.lastRecordDate) {
+            current.lastRecordDate = group.lastRecordDate;
+        }
+    }
+    await flush();
+
+    // Other filters (e.g. by date) do not select whole summaries, so nothing is pruned
+    const scope = Object.keys(filter).length === 0 ? {}
+        : Object.keys(filter).length === 1 && filter.studentId !== undefined ? { studentId: filter.studentId }
+        : null;
+    // Summaries written by incremental updates during the rebuild are kept
+    if (scope) {
+        await this.deleteMany({
+            ...scope,
+            updatedAt: { $lt: startedAt },
+            $or: [{ rebuiltAt: { $exists: false } }, { rebuiltAt: { $lt: startedAt } }]
+        });
+    }
+
+    return rebuilt;
+};
+
+// Same group shape as the Attendance aggregation, one record per group
+async function* bucketGroups(AttendanceBucket, filter) {
+    const cursor = AttendanceBucket.find(filter).sort({ studentId: 1, month: 1 }).lean().cursor();
+    for await (const bucket of cursor) {
+        for (const record of AttendanceBucket.expand(bucket)) {
+            yield {
+                _id: {
+                    studentId: record.studentId,
+                    subject: record.subject,
+                    month: bucket.month,
+                    status: record.status
+                },
+                count: 1,
+                lastRecordDate: record.date
+            };
+        }
+    }
+}
+
+AttendanceSummarySchema.statics.subjectKey = subjectKey;
+AttendanceSummarySchema.statics.monthKey = monthKey;
+
+module.exports = mongoose.model('AttendanceSummary', AttendanceSummarySchema);
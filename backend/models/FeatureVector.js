@@ -0,0 +1,75 @@
+const mongoose = require('mongoose');
+
+// Precomputed model inputs per student and feature-set version, written by the
+// inference server (ai-models/feature_store.py). `vector` holds the encoded
+// features as little-endian float32; `watermarks` record the source versions
+// they were computed from, so a vector is rebuilt only when its student,
+// attendance or grades actually changed.
+const FeatureVectorSchema = new mongoose.Schema({
+    studentId: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'Student',
+        required: true
+    },
+    featureSetVersion: {
+        type: String,
+        required: true
+    },
+
+    vector: {
+        type: Buffer,
+        required: true
+    },
+    dimensions: {
+        type: Number,
+        required: true
+    },
+    // Prediction.inputFeatures the vector was encoded from
+    features: {
+        type: mongoose.Schema.Types.Mixed
+    },
+
+    // Source versions: Student.updatedAt, AttendanceSummary.updatedAt, latest
+    // Grade.updatedAt with the grade count, and the month time-based features refer to
+    watermarks: {
+        student: Date,
+        attendance: Date,
+        grades: Date,
+        gradeCount: Number,
+        period: String
+    },
+
+    // When the vector content last changed / was last checked against its sources
+    computedAt: {
+        type: Date,
+        required: true
+    },
+    refreshedAt: {
+        type: Date,
+        required: true
+    },
+
+    // Last scoring of this vector; re-scoring is needed when the vector changed
+    // since, or the model version differs
+    scoredAt: {
+        type: Date
+    },
+    scoredModelVersion: {
+        type: String
+    }
+});
+
+FeatureVectorSchema.index({ studentId: 1, featureSetVersion: 1 }, { unique: true });
+FeatureVectorSchema.index({ featureSetVersion: 1, computedAt: 1 });
+
+// Record that these students were scored from their current vectors
+FeatureVectorSchema.statics.markScored = function(studentIds, { featureSetVersion, modelVersion, scoredAt = new Date() }) {
+    if (!featureSetVersion || studentIds.length === 0) return Promise.resolve();
+
+    return this.updateMany(
+        { studentId: { $in: studentIds }, featureSetVersion },
+        { $set: { scoredAt, scoredModelVersion: modelVersion } }
+    );
+};
+
+module.exports = mongoose.model('FeatureVector', FeatureVectorSchema);
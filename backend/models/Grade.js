@@ -1,4 +1,6 @@
 const mongoose = require('mongoose');
+const Prediction = require('./Prediction');
+const SequenceEvent = require('./SequenceEvent');
 
 const GradeSchema = new mongoose.Schema({
     studentId: {
@@ -107,6 +109,42 @@ GradeSchema.index({ studentId: 1, semester: 1 });
 GradeSchema.index({ subject: 1, assessmentType: 1 });
 GradeSchema.index({ assessmentDate: 1 });
 GradeSchema.index({ facultyId: 1, assessmentDate: 1 });
+GradeSchema.index({ studentId: 1, createdAt: -1 });
+
+// Grade changes expire the cached predictions of the students involved and
+// are logged for the sequence cache
+const invalidatePredictions = (studentIds) => Prediction.invalidate(studentIds, 'grades');
+
+GradeSchema.pre('save', function() {
+    this.$locals.wasNew = this.isNew;
+});
+
+GradeSchema.post('save', async function() {
+    await invalidatePredictions([this.studentId]);
+    if (this.$locals.wasNew) await SequenceEvent.recordGrades([this]);
+    else await SequenceEvent.resyncGrades([this.studentId]);
+});
+
+GradeSchema.post('insertMany', async function(docs) {
+    await invalidatePredictions([...new Set(docs.map(doc => String(doc.studentId)))]);
+    await SequenceEvent.recordGrades(docs);
+});
+
+GradeSchema.post(['findOneAndUpdate', 'findOneAndDelete'], async function(doc) {
+    if (!doc) return;
+    await invalidatePredictions([doc.studentId]);
+    await SequenceEvent.resyncGrades([doc.studentId]);
+});
+
+GradeSchema.pre(['updateOne', 'updateMany', 'deleteOne', 'deleteMany'], { document: false, query: true }, async function() {
+    this._affectedStudentIds = await this.model.distinct('studentId', this.getFilter());
+});
+
+GradeSchema.post(['updateOne', 'updateMany', 'deleteOne', 'deleteMany'], { document: false, query: true }, async function() {
+    if (!this._affectedStudentIds) return;
+    await invalidatePredictions(this._affectedStudentIds);
+    await SequenceEvent.resyncGrades(this._affectedStudentIds);
+});
 
 // Methods
 GradeSchema.methods.isPassingGrade = function() {
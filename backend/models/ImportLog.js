@@ -0,0 +1,106 @@
+const mongoose = require('mongoose');
+
+// Persistent import job: queued by the import endpoints, claimed and run by
+// the background ImportQueue worker, and served by the history/status endpoints.
+const ImportLogSchema = new mongoose.Schema({
+    // Handler key registered with ImportQueue (e.g. 'students-file')
+    jobType: {
+        type: String,
+        required: true
+    },
+    type: {
+        type: String,
+        enum: ['Students', 'Attendance', 'Grades', 'Fees'],
+        required: true
+    },
+    source: {
+        type: String,
+        required: true
+    },
+    filename: {
+        type: String
+    },
+
+    // Job parameters (file path, connector config); may hold credentials
+    payload: {
+        type: mongoose.Schema.Types.Mixed,
+        select: false
+    },
+
+    status: {
+        type: String,
+        enum: ['Queued', 'Processing', 'Completed', 'Failed'],
+        default: 'Queued'
+    },
+
+    // Progress counters
+    recordsProcessed: { type: Number, default: 0 },
+    recordsSuccessful: { type: Number, default: 0 },
+    recordsFailed: { type: Number, default: 0 },
+    recordsInserted: { type: Number, default: 0 },
+    recordsUpdated: { type: Number, default: 0 },
+    recordsSkipped: { type: Number, default: 0 },
+    recordsUnchanged: { type: Number, default: 0 }, // identical to the last sync, not written
+    bytesProcessed: { type: Number },
+    totalBytes: { type: Number },
+    throughput: {
+        type: Number // records per second
+    },
+
+    // Row-level errors ('errors' is reserved by Mongoose)
+    errorDetails: [mongoose.Schema.Types.Mixed],
+    errorsTruncated: { type: Number, default: 0 },
+    lastError: { type: String },
+
+    // Worker bookkeeping; `host` pins jobs that read host-local files
+    host: { type: String },
+    attempts: { type: Number, default: 0 },
+    workerId: { type: String },
+    heartbeatAt: { type: Date },
+    queuedAt: { type: Date, default: Date.now },
+    startedAt: { type: Date },
+    completedAt: { type: Date },
+    durationMs: { type: Number },
+
+    importedBy: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'User',
+        required: true
+    }
+}, {
+    timestamps: true
+});
+
+// Indexes
+ImportLogSchema.index({ status: 1, queuedAt: 1 });
+ImportLogSchema.index({ createdAt: -1 });
+ImportLogSchema.index({ importedBy: 1, createdAt: -1 });
+
+// Progress summary for the status endpoint
+ImportLogSchema.methods.toStatus = function() {
+    return {
+        importId: this._id,
+        type: this.type,
+        source: this.source,
+        filename: this.filename,
+        status: this.status,
+        recordsProcessed: this.recordsProcessed,
+        recordsSuccessful: this.recordsSuccessful,
+        recordsFailed: this.recordsFailed,
+        recordsInserted: this.recordsInserted,
+        recordsUpdated: this.recordsUpdated,
+        recordsSkipped: this.recordsSkipped,
+        recordsUnchanged: this.recordsUnchanged,
+        progress: this.totalBytes ? Math.round((this.bytesProcessed / this.totalBytes) * 100) : null,
+        throughput: this.throughput,
+        errors: this.errorDetails,
+        errorsTruncated: this.errorsTruncated,
+        lastError: this.lastError,
+        queuedAt: this.queuedAt,
+        startedAt: this.startedAt,
+        completedAt: this.completedAt,
+        durationMs: this.durationMs
+    };
+};
+
+module.exports = mongoose.model('ImportLog', ImportLogSchema);
@@ -36,6 +36,7 @@ const PredictionSchema = new mongoose.Schema({
         type: String,
         required: true
     },
+    // Model family and the runtime that scored it, e.g. 'HLRNN/keras', 'HLRNN/numpy-int8'
     modelType: {
         type: String,
         default: 'HLRNN',
@@ -96,7 +97,9 @@ const PredictionSchema = new mongoose.Schema({
         // Additional computed features
         previousGPA: Number,
         attendanceTrend: String,
-        gradeTrend: String
+        gradeTrend: String,
+        attendanceSlope: Number, // percentage points per month
+        gradeSlope: Number // percentage points per month
     },
 
     // Explanation
@@ -108,6 +111,12 @@ const PredictionSchema = new mongoose.Schema({
             type: Number,
             min: 0,
             max: 1
+        },
+        // How featureImportance was computed: 'approximate' (linear surrogate),
+        // 'exact' (Kernel SHAP / occlusion) or 'rules' (no attributions)
+        method: {
+            type: String,
+            enum: ['approximate', 'exact', 'rules']
         }
     },
 
@@ -125,6 +134,14 @@ const PredictionSchema = new mongoose.Schema({
         type: Boolean,
         default: true
     },
+    // Set when a change to the student's inputs expired the prediction early
+    invalidatedAt: {
+        type: Date
+    },
+    invalidatedBy: {
+        type: String,
+        enum: ['attendance', 'grades', 'student']
+    },
 
     // Metadata
     generatedBy: {
@@ -144,6 +161,27 @@ PredictionSchema.index({ studentId: 1, predictionDate: -1 });
 PredictionSchema.index({ riskLevel: 1, predictionDate: -1 });
 PredictionSchema.index({ modelVersion: 1 });
 PredictionSchema.index({ validUntil: 1, isActive: 1 });
+PredictionSchema.index({ studentId: 1, isActive: 1, validUntil: -1 });
+// At most one active prediction per student, even when concurrent batches score the same student.
+// Databases with duplicates from before this index need `npm run dedupe:predictions` first.
+PredictionSchema.index({ studentId: 1 }, { unique: true, partialFilterExpression: { isActive: true } });
+
+// Active, unexpired prediction for a student (the cached result), or null
+PredictionSchema.statics.findCurrent = function(studentId) {
+    return this.findOne({ studentId, isActive: true, validUntil: { $gt: new Date() } });
+};
+
+// Expire the students' cached predictions after a change to their inputs;
+// source is 'attendance', 'grades' or 'student'
+PredictionSchema.statics.invalidate = function(studentIds, source) {
+    if (studentIds.length === 0) return Promise.resolve();
+
+    const now = new Date();
+    return this.updateMany(
+        { studentId: { $in: studentIds }, isActive: true, validUntil: { $gt: now } },
+        { $set: { validUntil: now, invalidatedAt: now, invalidatedBy: source } }
+    );
+};
 
 // Methods
 PredictionSchema.methods.isExpired = function() {
@@ -167,4 +205,12 @@ PredictionSchema.methods.generateSummary = function() {
     };
 };
 
-module.exports = mongoose.model('Prediction', PredictionSchema);
\ No newline at end of file
+const Prediction = mongoose.model('Prediction', PredictionSchema);
+
+// autoIndex failures are otherwise silent; without the unique index concurrent
+// batches can leave a student with several active predictions
+Prediction.on('index', (error) => {
+    if (error) console.error('❌ Prediction index build failed (run `npm run dedupe:predictions`):', error.message);
+});
+
+module.exports = Prediction;
\ No newline at end of file
@@ -0,0 +1,94 @@
+const mongoose = require('mongoose');
+
+// Append-only log of attendance and grade changes, consumed by the HLRNN
+// sequence cache (ai-models/sequence_cache.py). Each event carries signed
+// deltas for the weekly bin of `date`, so the cache folds in new events
+// instead of re-aggregating a student's history. Grade edits and deletions,
+// whose previous values are unknown here, are logged as `resync` events: the
+// cache then rebuilds that student's grade bins. Written only with
+// SEQUENCE_CACHE=on.
+const SequenceEventSchema = new mongoose.Schema({
+    studentId: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'Student',
+        required: true
+    },
+    source: {
+        type: String,
+        enum: ['attendance', 'grades'],
+        required: true
+    },
+    date: {
+        type: Date
+    },
+
+    // Signed deltas
+    present: { type: Number, default: 0 },
+    total: { type: Number, default: 0 },
+    gradePoints: { type: Number, default: 0 },
+    percentage: { type: Number, default: 0 },
+    grades: { type: Number, default: 0 },
+
+    resync: {
+        type: Boolean,
+        default: false
+    },
+
+    createdAt: {
+        type: Date,
+        default: Date.now
+    }
+}, {
+    versionKey: false
+});
+
+// Consumed events are only kept long enough for a stopped cache to catch up
+SequenceEventSchema.index({ createdAt: 1 }, { expireAfterSeconds: 30 * 24 * 60 * 60 });
+
+SequenceEventSchema.statics.enabled = function() {
+    return (process.env.SEQUENCE_CACHE || 'off').toLowerCase() === 'on';
+};
+
+// lean inserts skip schema defaults, so createdAt (the TTL field) is set here
+SequenceEventSchema.statics.record = function(events) {
+    if (!this.enabled() || events.length === 0) return Promise.resolve();
+    const createdAt = new Date();
+    return this.insertMany(events.map(event => ({ ...event, createdAt })), { ordered: false, lean: true });
+};
+
+// Attendance deltas ({ studentId, date, status, count }), one event per student and day
+SequenceEventSchema.statics.recordAttendance = function(entries) {
+    if (!this.enabled()) return Promise.resolve();
+
+    const byDay = new Map();
+    for (const entry of entries) {
+        if (!entry.count) continue;
+        const day = new Date(entry.date).toISOString().slice(0, 10);
+        const key = `${entry.studentId}:${day}`;
+        if (!byDay.has(key)) {
+            byDay.set(key, { studentId: entry.studentId, source: 'attendance', date: new Date(day), present: 0, total: 0 });
+        }
+        const event = byDay.get(key);
+        event.total += entry.count;
+        if (entry.status === 'Present') event.present += entry.count;
+    }
+    return this.record([...byDay.values()].filter(event => event.total || event.present));
+};
+
+// New grade documents are appended as deltas; anything else resyncs the student's grades
+SequenceEventSchema.statics.recordGrades = function(grades) {
+    return this.record(grades.map(grade => ({
+        studentId: grade.studentId,
+        source: 'grades',
+        date: grade.assessmentDate,
+        gradePoints: grade.gradePoints || 0,
+        percentage: grade.percentage || 0,
+        grades: 1
+    })));
+};
+
+SequenceEventSchema.statics.resyncGrades = function(studentIds) {
+    return this.record(studentIds.map(studentId => ({ studentId, source: 'grades', resync: true })));
+};
+
+module.exports = mongoose.model('SequenceEvent', SequenceEventSchema);
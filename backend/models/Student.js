@@ -182,6 +182,12 @@ const StudentSchema = new mongoose.Schema({
         type: Boolean,
         default: false
     },
+    // Recorded disciplinary incidents (a dropout model input)
+    disciplinaryIssues: {
+        type: Number,
+        default: 0,
+        min: 0
+    },
     specialNeeds: {
         hasSpecialNeeds: {
             type: Boolean,
@@ -219,6 +225,24 @@ const StudentSchema = new mongoose.Schema({
         default: 'Active'
     },
 
+    // Search index: lowercase prefix tokens of names/email and infix tokens of IDs
+    searchTokens: {
+        type: [String],
+        select: false
+    },
+
+    // Import change detection: hash of the import-sourced fields last written and a
+    // per-field hash (keyed by path with ':' for '.') to $set only what changed
+    importFingerprint: {
+        type: String,
+        select: false
+    },
+    importFieldHashes: {
+        type: Map,
+        of: String,
+        select: false
+    },
+
     // System Metadata
     createdBy: {
         type: mongoose.Schema.Types.ObjectId,
@@ -241,6 +265,13 @@ StudentSchema.index({ riskLevel: 1 });
 StudentSchema.index({ status: 1 });
 StudentSchema.index({ batch: 1, semester: 1 });
 
+// Keyset pagination indexes (sort field + _id tie-breaker)
+StudentSchema.index({ createdAt: -1, _id: -1 });
+StudentSchema.index({ riskLevel: 1, riskScore: -1, _id: -1 });
+
+// Type-ahead search (multikey)
+StudentSchema.index({ searchTokens: 1 });
+
 // Virtual for full name
 StudentSchema.virtual('fullName').get(function() {
     return `${this.firstName} ${this.lastName}`;
@@ -251,17 +282,170 @@ StudentSchema.virtual('age').get(function() {
     return Math.floor((Date.now() - this.dateOfBirth.getTime()) / (365.25 * 24 * 60 * 60 * 1000));
 });
 
-// Method to calculate attendance percentage
-StudentSchema.methods.calculateAttendancePercentage = async function() {
-    const Attendance = mongoose.model('Attendance');
-    const attendanceRecords = await Attendance.find({ studentId: this._id });
+// Search tokens
+const SEARCH_FIELDS = ['firstName', 'lastName', 'email', 'studentId', 'rollNumber'];
+const MAX_TOKEN_LENGTH = 15;
+const MIN_INFIX_LENGTH = 3;
+
+const normalizeSearchText = (value) => String(value || '').toLowerCase().trim();
 
-    if (attendanceRecords.length === 0) return 0;
+const prefixTokens = (word, tokens) => {
+    for (let i = 1; i <= Math.min(word.length, MAX_TOKEN_LENGTH); i++) {
+        tokens.add(word.slice(0, i));
+    }
+};
+
+const infixTokens = (word, tokens) => {
+    for (let start = 0; start < word.length; start++) {
+        for (let end = start + MIN_INFIX_LENGTH; end <= Math.min(word.length, start + MAX_TOKEN_LENGTH); end++) {
+            tokens.add(word.slice(start, end));
+        }
+    }
+    prefixTokens(word, tokens);
+};
+
+const buildSearchTokens = (student) => {
+    const tokens = new Set();
+
+    for (const field of ['firstName', 'lastName']) {
+        for (const word of normalizeSearchText(student[field]).split(/\s+/)) {
+            if (word) prefixTokens(word, tokens);
+        }
+    }
+
+    const email = normalizeSearchText(student.email);
+    if (email) {
+        prefixTokens(email, tokens);
+        for (const part of email.split('@')[0].split(/[._+-]/)) {
+            if (part) prefixTokens(part, tokens);
+        }
+    }
+
+    for (const field of ['studentId', 'rollNumber']) {
+        const id = normalizeSearchText(student[field]);
+        if (id) infixTokens(id, tokens);
+    }
+
+    return [...tokens];
+};
 
-    const totalClasses = attendanceRecords.length;
-    const presentClasses = attendanceRecords.filter(record => record.status === 'Present').length;
+// Query terms matched against searchTokens with $all (every term must match)
+const buildSearchFilter = (query) => {
+    const terms = normalizeSearchText(query)
+        .split(/\s+/)
+        .filter(Boolean)
+        .map(term => term.slice(0, MAX_TOKEN_LENGTH));
 
-    return Math.round((presentClasses / totalClasses) * 100 * 100) / 100; // Round to 2 decimal places
+    return terms.length > 0 ? { searchTokens: { $all: terms } } : {};
+};
+
+// Student fields the dropout model reads as inputs. status is not a model feature,
+// but a status change (e.g. re-admission) still calls for a fresh assessment.
+const PREDICTION_INPUT_FIELDS = [
+    'status', 'dateOfBirth', 'gender', 'nationality', 'currentCGPA', 'semester', 'feeStatus', 'scholarship',
+    'fatherEducation', 'motherEducation', 'fatherOccupation', 'motherOccupation', 'disciplinaryIssues', 'specialNeeds',
+    'displaced'
+];
+
+const touchesPredictionInputs = (paths) => paths.some(path => PREDICTION_INPUT_FIELDS.includes(path.split('.')[0]));
+
+const predictionInputsKey = (student) => JSON.stringify(PREDICTION_INPUT_FIELDS.map(field => student[field] ?? null));
+
+StudentSchema.statics.buildSearchTokens = buildSearchTokens;
+StudentSchema.statics.buildSearchFilter = buildSearchFilter;
+StudentSchema.statics.SEARCH_FIELDS = SEARCH_FIELDS;
+StudentSchema.statics.PREDICTION_INPUT_FIELDS = PREDICTION_INPUT_FIELDS;
+StudentSchema.statics.touchesPredictionInputs = touchesPredictionInputs;
+
+// pre('validate') also covers insertMany, which skips save middleware
+StudentSchema.pre('validate', function(next) {
+    if (this.isNew || SEARCH_FIELDS.some(field => this.isModified(field))) {
+        this.searchTokens = buildSearchTokens(this);
+    }
+    next();
+});
+
+// Query updates touching a search field refresh the tokens of the matched documents.
+// They are collected before the update: the filter may not match them afterwards
+// (e.g. updateOne({ email: old }, { $set: { email: new } })).
+StudentSchema.pre(['findOneAndUpdate', 'updateOne', 'updateMany'], async function() {
+    const update = this.getUpdate() || {};
+    const touched = { ...update, ...update.$set, ...update.$unset };
+    if (!SEARCH_FIELDS.some(field => field in touched)) return;
+
+    this._searchTokenIds = await this.model.find(this.getFilter()).distinct('_id');
+});
+
+StudentSchema.post(['findOneAndUpdate', 'updateOne', 'updateMany'], async function(result) {
+    const ids = this._searchTokenIds;
+    if (!ids) return;
+
+    // An upsert inserts a document the pre hook could not see (updateOne/updateMany
+    // report its upsertedId, findOneAndUpdate returns the document)
+    if (result && result.upsertedId) ids.push(result.upsertedId);
+    if (result && result._id) ids.push(result._id);
+    if (ids.length > 0) await this.model.refreshSearchTokens({ _id: { $in: ids } });
+});
+
+// Query updates touching a prediction input expire the cached predictions of the
+// students whose input values actually changed
+StudentSchema.pre(['findOneAndUpdate', 'updateOne', 'updateMany'], async function() {
+    const update = this.getUpdate() || {};
+    const touched = Object.keys({ ...update, ...update.$set, ...update.$unset, ...update.$inc });
+    if (!touchesPredictionInputs(touched)) return;
+
+    this._predictionInputsBefore = await this.model.find(this.getFilter())
+        .select(PREDICTION_INPUT_FIELDS.join(' '))
+        .lean();
+});
+
+StudentSchema.post(['findOneAndUpdate', 'updateOne', 'updateMany'], async function() {
+    const before = this._predictionInputsBefore;
+    if (!before || before.length === 0) return;
+
+    const after = await this.model.find({ _id: { $in: before.map(student => student._id) } })
+        .select(PREDICTION_INPUT_FIELDS.join(' '))
+        .lean();
+    const keyById = new Map(before.map(student => [String(student._id), predictionInputsKey(student)]));
+    const changed = after
+        .filter(student => keyById.get(String(student._id)) !== predictionInputsKey(student))
+        .map(student => student._id);
+
+    await mongoose.model('Prediction').invalidate(changed, 'student');
+});
+
+// Recompute searchTokens for matching students (also used to backfill)
+StudentSchema.statics.refreshSearchTokens = async function(filter = {}, { batchSize = 1000 } = {}) {
+    const cursor = this.find(filter).select(SEARCH_FIELDS.join(' ')).lean().cursor({ batchSize });
+    let operations = [];
+    let refreshed = 0;
+
+    for await (const student of cursor) {
+        operations.push({
+            updateOne: {
+                filter: { _id: student._id },
+                update: { $set: { searchTokens: buildSearchTokens(student) } },
+                timestamps: false
+            }
+        });
+        if (operations.length >= batchSize) {
+            await this.bulkWrite(operations, { ordered: false });
+            refreshed += operations.length;
+            operations = [];
+        }
+    }
+    if (operations.length > 0) {
+        await this.bulkWrite(operations, { ordered: false });
+        refreshed += operations.length;
+    }
+
+    return refreshed;
+};
+
+// Method to calculate attendance percentage (served from the AttendanceSummary rollup)
+StudentSchema.methods.calculateAttendancePercentage = async function() {
+    const AttendanceSummary = mongoose.model('AttendanceSummary');
+    return await AttendanceSummary.getAttendancePercentage(this._id);
 };
 
 // Method to get latest grades
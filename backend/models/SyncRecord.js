@@ -0,0 +1,30 @@
+const mongoose = require('mongoose');
+
+// Content hash of the last version of each external record written by a sync,
+// so unchanged upstream records can be skipped before validation and writes.
+const SyncRecordSchema = new mongoose.Schema({
+    sourceKey: {
+        type: String,
+        required: true
+    },
+    // Upstream identity of the record (e.g. SIS local id or email)
+    recordKey: {
+        type: String,
+        required: true
+    },
+    hash: {
+        type: String,
+        required: true
+    },
+    lastSeenAt: {
+        type: Date,
+        default: Date.now
+    }
+}, {
+    timestamps: true
+});
+
+// Indexes
+SyncRecordSchema.index({ sourceKey: 1, recordKey: 1 }, { unique: true });
+
+module.exports = mongoose.model('SyncRecord', SyncRecordSchema);
@@ -0,0 +1,99 @@
+const mongoose = require('mongoose');
+
+// Per-source synchronization state for external systems (SIS, Google Classroom,
+// biometric and RFID). Holds the connection config, the schedule and the
+// change markers (watermark, ETag, change token) that make re-syncs incremental.
+const SyncStateSchema = new mongoose.Schema({
+    // e.g. 'sis:PowerSchool:<institutionId>', 'biometric:<systemUrl>'
+    sourceKey: {
+        type: String,
+        required: true,
+        unique: true
+    },
+    sourceType: {
+        type: String,
+        enum: ['sis', 'google-classroom', 'biometric', 'rfid'],
+        required: true
+    },
+    name: {
+        type: String,
+        trim: true
+    },
+
+    // Connector parameters, including credentials
+    config: {
+        type: mongoose.Schema.Types.Mixed,
+        select: false
+    },
+
+    // Scheduling
+    enabled: {
+        type: Boolean,
+        default: true
+    },
+    intervalMinutes: {
+        type: Number,
+        default: 360,
+        min: 5
+    },
+    nextSyncAt: {
+        type: Date
+    },
+
+    // Change markers. `cursors` holds per-device/location/course markers
+    // keyed by sub-source id ({ watermark, etag }).
+    watermark: {
+        type: Date
+    },
+    etag: {
+        type: String
+    },
+    changeToken: {
+        type: String
+    },
+    cursors: {
+        type: Map,
+        of: mongoose.Schema.Types.Mixed,
+        default: {}
+    },
+
+    // Last run
+    lastSyncAt: {
+        type: Date
+    },
+    lastStatus: {
+        type: String,
+        enum: ['Never', 'Queued', 'Completed', 'Failed'],
+        default: 'Never'
+    },
+    lastImportId: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'ImportLog'
+    },
+    lastStats: {
+        fetched: { type: Number, default: 0 },
+        changed: { type: Number, default: 0 },
+        unchanged: { type: Number, default: 0 }
+    },
+    lastError: {
+        type: String
+    },
+
+    createdBy: {
+        type: mongoose.Schema.Types.ObjectId,
+        ref: 'User',
+        required: true
+    }
+}, {
+    timestamps: true
+});
+
+// Indexes
+SyncStateSchema.index({ enabled: 1, nextSyncAt: 1 });
+
+SyncStateSchema.methods.scheduleNext = function(from = new Date()) {
+    this.nextSyncAt = new Date(from.getTime() + this.intervalMinutes * 60 * 1000);
+    return this.nextSyncAt;
+};
+
+module.exports = mongoose.model('SyncState', SyncStateSchema);
@@ -17,7 +17,8 @@ const storage = multer.diskStorage({
 const upload = multer({ 
     storage: storage,
     limits: {
-        fileSize: 10 * 1024 * 1024 // 10MB limit
+        // Imports are streamed, so the limit only guards disk usage (default 500MB)
+        fileSize: (parseInt(process.env.IMPORT_MAX_FILE_SIZE_MB) || 500) * 1024 * 1024
     },
     fileFilter: function (req, file, cb) {
         // Accept CSV, Excel, and JSON files
@@ -147,10 +148,10 @@ router.get('/history',
     DataImportController.getImportHistory
 );
 
-// Get import status
+// Get import status (teachers only see the jobs they submitted)
 router.get('/status/:importId', 
     auth, 
-    authorize(['admin']), 
+    authorize(['admin', 'teacher']), 
     DataImportController.getImportStatus
 );
 
@@ -22,6 +22,10 @@ const userRoutes = require('./routes/users');
 const PredictionService = require('./services/predictionService');
 const AlertService = require('./services/alertService');
 const DataProcessingService = require('./services/dataProcessingService');
+const ImportQueue = require('./services/importQueue');
+const SyncService = require('./services/syncService');
+const BatchScoringService = require('./services/batchScoringService');
+const InferencePool = require('./services/inferencePool');
 
 const app = express();
 const server = http.createServer(app);
@@ -43,6 +47,10 @@ app.use(cors({
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true, limit: '10mb' }));
 
+// Start the inference workers right away: they load and warm the registry's active
+// model in the background, in parallel with the DB connection, without blocking the API
+PredictionService.initializeModel();
+
 // Database Connection
 mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction', {
     useNewUrlParser: true,
@@ -50,8 +58,10 @@ mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropou
 })
 .then(() => {
     console.log('✅ Connected to MongoDB');
-    // Initialize AI models after DB connection
-    PredictionService.initializeModel();
+    // Resume background imports (and requeue any orphaned by a restart)
+    ImportQueue.start({ io }).catch((error) => {
+        console.error('❌ Import queue failed to start:', error);
+    });
 })
 .catch((err) => {
     console.error('❌ MongoDB connection error:', err);
@@ -89,7 +99,8 @@ app.get('/api/health', (req, res) => {
     res.json({ 
         status: 'OK', 
         timestamp: new Date().toISOString(),
-        version: '1.0.0'
+        version: '1.0.0',
+        modelVersion: InferencePool.modelVersion()
     });
 });
 
@@ -120,6 +131,18 @@ cron.schedule('0 8 * * *', async () => {
     }
 });
 
+// Nightly (default 2:00 AM): re-score every active student, or with
+// RESCORING_CHANGED_ONLY=true only those whose features changed
+cron.schedule(process.env.RESCORING_CRON || '0 2 * * *', async () => {
+    console.log('🔄 Running nightly risk re-scoring...');
+    try {
+        const stats = await BatchScoringService.rescoreAll({ changedOnly: process.env.RESCORING_CHANGED_ONLY === 'true' });
+        console.log(`✅ Re-scored ${stats.scored}/${stats.total} students in ${Math.round(stats.durationMs / 1000)}s (${stats.throughput}/s)`);
+    } catch (error) {
+        console.error('❌ Nightly re-scoring failed:', error);
+    }
+});
+
 // Run every hour to check for critical alerts
 cron.schedule('0 * * * *', async () => {
     try {
@@ -129,6 +152,18 @@ cron.schedule('0 * * * *', async () => {
     }
 });
 
+// Every 5 minutes: queue incremental syncs for sources that are due
+cron.schedule('*/5 * * * *', async () => {
+    try {
+        const queued = await SyncService.runDueSyncs();
+        if (queued.length > 0) {
+            console.log(`🔄 Queued ${queued.length} scheduled sync(s)`);
+        }
+    } catch (error) {
+        console.error('❌ Scheduled sync check failed:', error);
+    }
+});
+
 const PORT = process.env.PORT || 5000;
 
 server.listen(PORT, () => {
@@ -0,0 +1,180 @@
+const mongoose = require('mongoose');
+const ConnectorClient = require('./connectorClient');
+const Student = require('../models/Student');
+const Attendance = require('../models/Attendance');
+const AttendanceStore = require('./attendanceStore');
+const { addImportError } = require('../utils/importPipeline');
+
+const DEFAULT_BATCH_SIZE = parseInt(process.env.ATTENDANCE_IMPORT_BATCH_SIZE) || 5000;
+// IANA zone whose calendar day timestamps are filed under (e.g. 'Asia/Kolkata')
+const SCHOOL_TIMEZONE = process.env.SCHOOL_TIMEZONE || 'UTC';
+const DATE_ONLY = /^\d{4}-\d{2}-\d{2}$/;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// en-CA formats as YYYY-MM-DD
+const schoolDay = new Intl.DateTimeFormat('en-CA', {
+    timeZone: SCHOOL_TIMEZONE,
+    year: 'numeric',
+    month: '2-digit',
+    day: '2-digit'
+});
+
+// Bulk attendance ingestion: each chunk resolves its student identifiers with one
+// query and is upserted on { studentId, date, subject, period }, so re-running a
+// sync updates or skips rows instead of failing on duplicate keys.
+class AttendanceImportService {
+
+    static createResults() {
+        return {
+            successful: 0,
+            failed: 0,
+            inserted: 0,
+            updated: 0,
+            skipped: 0,
+            errors: []
+        };
+    }
+
+    // rows: { studentId | rollNumber, date, subject, status, period, remarks, teacherId }
+    static async importAttendance(rows, userId, { batchSize = DEFAULT_BATCH_SIZE, results = AttendanceImportService.createResults(), onProgress } = {}) {
+        const studentIdCache = new Map();
+
+        for (let i = 0; i < rows.length; i += batchSize) {
+            await AttendanceImportService.importChunk(rows.slice(i, i + batchSize), userId, results, {
+                rowOffset: i,
+                studentIdCache
+            });
+            if (onProgress) onProgress(results);
+        }
+
+        return results;
+    }
+
+    // Same as importAttendance for an (async) iterable of rows, read one batch at a
+    // time so memory stays bounded by the batch size (connector streams). `results`
+    // may be shared by concurrent streams, so the rows that failed in this stream
+    // are returned separately as `failed`.
+    static async importStream(rows, userId, { batchSize = DEFAULT_BATCH_SIZE, results = AttendanceImportService.createResults(), onProgress } = {}) {
+        const studentIdCache = new Map();
+        let rowOffset = 0;
+        let failed = 0;
+
+        for await (const batch of ConnectorClient.batches(rows, batchSize)) {
+            failed += await AttendanceImportService.importChunk(batch, userId, results, { rowOffset, studentIdCache });
+            rowOffset += batch.length;
+            if (onProgress) onProgress(results);
+        }
+
+        return { results, failed };
+    }
+
+    // Returns the number of rows in the chunk that failed
+    static async importChunk(rows, userId, results, { rowOffset = 0, studentIdCache = new Map() } = {}) {
+        await AttendanceImportService.resolveStudents(rows, studentIdCache);
+
+        const records = [];
+        const rowNumbers = [];
+
+        rows.forEach((row, i) => {
+            const rowNumber = rowOffset + i + 1;
+            const identifier = AttendanceImportService.identifierOf(row);
+            const studentId = studentIdCache.get(identifier);
+
+            if (!studentId) {
+                AttendanceImportService.recordFailure(results, rowNumber, `Student not found: ${identifier}`);
+                return;
+            }
+
+            const attendance = new Attendance({
+                studentId,
+                date: AttendanceImportService.toAttendanceDate(row.date),
+                subject: row.subject,
+                status: row.status,
+                period: parseInt(row.period),
+                remarks: row.remarks || undefined,
+                teacherId: row.teacherId || userId,
+                markedBy: userId
+            });
+            const validationError = attendance.validateSync();
+            if (validationError) {
+                AttendanceImportService.recordFailure(results, rowNumber, validationError.message);
+                return;
+            }
+
+            records.push(attendance.toObject());
+            rowNumbers.push(rowNumber);
+        });
+
+        // Written in the configured storage mode and rolled into AttendanceSummary
+        const { inserted, updated, skipped, errors } = await AttendanceStore.upsertRecords(records);
+
+        for (const writeError of errors) {
+            AttendanceImportService.recordFailure(results, rowNumbers[writeError.index], writeError.error);
+        }
+        results.inserted += inserted.length;
+        results.updated += updated.length;
+        results.skipped += skipped.length;
+        results.successful += inserted.length + updated.length + skipped.length;
+
+        // Rows rejected before the write plus rows whose write failed
+        return rows.length - records.length + errors.length;
+    }
+
+    // One lookup per chunk for identifiers not already cached. Rows may carry the
+    // Mongo _id or the institution studentId/rollNumber.
+    static async resolveStudents(rows, studentIdCache) {
+        const unresolved = new Set();
+        for (const row of rows) {
+            const identifier = AttendanceImportService.identifierOf(row);
+            if (identifier && !studentIdCache.has(identifier)) unresolved.add(identifier);
+        }
+        if (unresolved.size === 0) return;
+
+        const identifiers = [...unresolved];
+        const objectIds = identifiers.filter(identifier => mongoose.isValidObjectId(identifier));
+
+        const students = await Student.find({
+            $or: [
+                { _id: { $in: objectIds } },
+                { studentId: { $in: identifiers } },
+                { rollNumber: { $in: identifiers } }
+            ]
+        }).select('_id studentId rollNumber').lean();
+
+        for (const identifier of identifiers) {
+            studentIdCache.set(identifier, null);
+        }
+        for (const student of students) {
+            for (const key of [student._id.toString(), student.studentId, student.rollNumber]) {
+                if (key && unresolved.has(key)) studentIdCache.set(key, student._id);
+            }
+        }
+    }
+
+    static identifierOf(row) {
+        return String(row.studentId || row.rollNumber || '').trim();
+    }
+
+    // Attendance is keyed by calendar day (stored as UTC midnight). Timestamps are
+    // placed on the school's calendar day (SCHOOL_TIMEZONE), so e.g. an IST punch
+    // before 05:30 is not filed under the previous day; plain dates (YYYY-MM-DD strings, spreadsheet
+    // dates at UTC midnight) are taken as given.
+    static toAttendanceDate(value) {
+        if (typeof value === 'string' && DATE_ONLY.test(value.trim())) {
+            return new Date(`${value.trim()}T00:00:00.000Z`);
+        }
+
+        const date = new Date(value);
+        if (isNaN(date.getTime()) || date.getTime() % DAY_MS === 0) return date;
+        return new Date(`${schoolDay.format(date)}T00:00:00.000Z`);
+    }
+
+    static recordFailure(results, row, message) {
+        results.failed++;
+        addImportError(results, { row, error: message });
+    }
+}
+
+AttendanceImportService.DEFAULT_BATCH_SIZE = DEFAULT_BATCH_SIZE;
+
+module.exports = AttendanceImportService;
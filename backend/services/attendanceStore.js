@@ -0,0 +1,228 @@
+const Attendance = require('../models/Attendance');
+const AttendanceBucket = require('../models/AttendanceBucket');
+const AttendanceSummary = require('../models/AttendanceSummary');
+
+// Parallel single-document updates per batch when existing records change
+const UPDATE_CONCURRENCY = 16;
+
+// Storage-mode aware access to attendance records.
+// ATTENDANCE_STORAGE=document (default) keeps one Attendance document per
+// student/subject/period/day; ATTENDANCE_STORAGE=bucketed packs a student's month
+// into a single AttendanceBucket (teacherId, remarks and markedBy are not kept).
+class AttendanceStore {
+
+    static isBucketed() {
+        return (process.env.ATTENDANCE_STORAGE || 'document').toLowerCase() === 'bucketed';
+    }
+
+    // Upsert validated attendance records on the natural key
+    // { studentId, date, subject, period } and roll the changes into AttendanceSummary.
+    // Returns { inserted, updated, skipped, errors } as lists of record indexes
+    // (errors as { index, error }); records whose stored values already match are skipped.
+    static async upsertRecords(records) {
+        const result = { inserted: [], updated: [], skipped: [], errors: [] };
+        if (records.length === 0) return result;
+
+        // When a batch repeats a key the last row wins; earlier ones are skipped
+        const lastIndexByKey = new Map();
+        records.forEach((record, index) => lastIndexByKey.set(AttendanceStore.naturalKey(record), index));
+        const indexes = [...lastIndexByKey.values()].sort((a, b) => a - b);
+        const unique = indexes.map(index => records[index]);
+
+        const batchResult = { inserted: [], updated: [], skipped: [], errors: [] };
+        const deltas = AttendanceStore.isBucketed()
+            ? await AttendanceStore.upsertBucketed(unique, batchResult)
+            : await AttendanceStore.upsertDocuments(unique, batchResult);
+
+        await Attendance.applyChanges(deltas);
+
+        const kept = new Set(indexes);
+        records.forEach((record, index) => {
+            if (!kept.has(index)) result.skipped.push(index);
+        });
+        for (const outcome of ['inserted', 'updated', 'skipped']) {
+            result[outcome].push(...batchResult[outcome].map(i => indexes[i]));
+        }
+        result.errors.push(...batchResult.errors.map(error => ({ ...error, index: indexes[error.index] })));
+
+        return result;
+    }
+
+    // Summary deltas come from what each write actually replaced, not from the
+    // read above it, so concurrent writers to the same key cannot skew the counts:
+    // new keys are insert-only upserts (upsertedIds says which rows were created),
+    // and existing keys are updated one by one, returning the prior document.
+    static async upsertDocuments(records, result) {
+        const existing = await Attendance.find({
+            studentId: { $in: [...new Set(records.map(record => record.studentId.toString()))] },
+            date: { $in: [...new Set(records.map(record => record.date.getTime()))].map(time => new Date(time)) }
+        }).select('studentId date subject period status remarks teacherId').lean();
+        const existingByKey = new Map(existing.map(record => [AttendanceStore.naturalKey(record), record]));
+
+        const inserts = [];
+        const updates = [];
+        records.forEach((record, index) => {
+            const previous = existingByKey.get(AttendanceStore.naturalKey(record));
+
+            if (previous &&
+                previous.status === record.status &&
+                (previous.remarks || undefined) === (record.remarks || undefined) &&
+                String(previous.teacherId) === String(record.teacherId)) {
+                result.skipped.push(index);
+                return;
+            }
+            (previous ? updates : inserts).push(index);
+        });
+
+        const deltas = [];
+        if (inserts.length > 0) {
+            const operations = inserts.map(index => ({
+                updateOne: {
+                    filter: AttendanceStore.keyFilter(records[index]),
+                    update: { $setOnInsert: AttendanceStore.writeFields(records[index]) },
+                    upsert: true
+                }
+            }));
+
+            let bulkResult;
+            const failedIndexes = new Set();
+            try {
+                bulkResult = await Attendance.bulkWrite(operations, { ordered: false });
+            } catch (error) {
+                if (!error.writeErrors) throw error;
+                bulkResult = error.result;
+
+                for (const writeError of error.writeErrors) {
+                    failedIndexes.add(writeError.index);
+                    // A concurrent writer created the key first: update it instead
+                    if (writeError.code === 11000) {
+                        updates.push(inserts[writeError.index]);
+                        continue;
+                    }
+                    result.errors.push({
+                        index: inserts[writeError.index],
+                        error: writeError.errmsg || writeError.err?.errmsg || 'Write failed'
+                    });
+                }
+            }
+
+            const upserted = new Set(Object.keys(bulkResult.upsertedIds || {}).map(Number));
+            inserts.forEach((index, operationIndex) => {
+                if (failedIndexes.has(operationIndex)) return;
+                if (upserted.has(operationIndex)) {
+                    AttendanceStore.collectDeltas(deltas, records[index], null);
+                    result.inserted.push(index);
+                } else {
+                    // Created since the read; $setOnInsert left it untouched
+                    updates.push(index);
+                }
+            });
+        }
+
+        for (let i = 0; i < updates.length; i += UPDATE_CONCURRENCY) {
+            await Promise.all(updates.slice(i, i + UPDATE_CONCURRENCY).map(async (index) => {
+                const record = records[index];
+                try {
+                    const previous = await Attendance.findOneAndUpdate(
+                        AttendanceStore.keyFilter(record),
+                        { $set: AttendanceStore.writeFields(record) },
+                        { upsert: true, new: false, lean: true, projection: 'date subject status', skipSummary: true }
+                    );
+                    AttendanceStore.collectDeltas(deltas, record, previous);
+                    result[previous ? 'updated' : 'inserted'].push(index);
+                } catch (error) {
+                    result.errors.push({ index, error: error.message });
+                }
+            }));
+        }
+
+        return deltas;
+    }
+
+    static keyFilter(record) {
+        return {
+            studentId: record.studentId,
+            date: record.date,
+            subject: record.subject,
+            period: record.period
+        };
+    }
+
+    static writeFields(record) {
+        return {
+            ...AttendanceStore.keyFilter(record),
+            status: record.status,
+            remarks: record.remarks,
+            teacherId: record.teacherId,
+            markedBy: record.markedBy,
+            markedAt: new Date()
+        };
+    }
+
+    static async upsertBucketed(records, result) {
+        const { written, errors } = await AttendanceBucket.writeRecords(records, { overwrite: true });
+        result.errors.push(...errors);
+
+        const deltas = [];
+        for (const { index, previous } of written) {
+            const record = records[index];
+
+            // Buckets only keep the status of a (subject, day, period) slot, so an identical one is a no-op
+            if (previous && previous.status === record.status) {
+                result.skipped.push(index);
+                continue;
+            }
+            AttendanceStore.collectDeltas(deltas, record, previous);
+            result[previous ? 'updated' : 'inserted'].push(index);
+        }
+
+        return deltas;
+    }
+
+    // Summary deltas for writing `record` over `previous` (null for a new record)
+    static collectDeltas(deltas, record, previous) {
+        if (previous) {
+            deltas.push({ ...previous, studentId: record.studentId, count: -1 });
+        }
+        deltas.push({
+            studentId: record.studentId,
+            date: record.date,
+            subject: record.subject,
+            status: record.status,
+            count: 1
+        });
+    }
+
+    static naturalKey(record) {
+        return `${record.studentId}:${new Date(record.date).getTime()}:${record.subject}:${record.period}`;
+    }
+
+    // Attendance records for a student in either storage mode, oldest first
+    static async findForStudent(studentId, { from, to } = {}) {
+        if (AttendanceStore.isBucketed()) {
+            return AttendanceBucket.findRecords(studentId, { from, to });
+        }
+
+        const filter = { studentId };
+        if (from || to) {
+            filter.date = {};
+            if (from) filter.date.$gte = new Date(from);
+            if (to) filter.date.$lte = new Date(to);
+        }
+
+        return Attendance.find(filter)
+            .select('studentId date subject period status remarks')
+            .sort({ date: 1, period: 1 })
+            .lean();
+    }
+
+    static async deleteForStudent(studentId) {
+        await Promise.all([
+            Attendance.deleteMany({ studentId }),
+            AttendanceBucket.deleteMany({ studentId }),
+            AttendanceSummary.deleteOne({ studentId })
+        ]);
+    }
+}
+
+module.exports = AttendanceStore;
@@ -0,0 +1,100 @@
+const Student = require('../models/Student');
+const PredictionService = require('./predictionService');
+
+// Nightly bulk re-scoring: streams student ids in chunks and scores several chunks
+// at once across the inference worker processes. Each chunk costs one feature
+// read per collection, one forward pass and one round of bulk writes. With
+// `changedOnly`, students whose feature vectors have not changed since they were
+// last scored by the current model are skipped.
+
+const CHUNK_SIZE = parseInt(process.env.BATCH_SCORING_CHUNK_SIZE) || 500;
+const CONCURRENCY = parseInt(process.env.BATCH_SCORING_CONCURRENCY) || parseInt(process.env.INFERENCE_WORKERS) || 2;
+const PROGRESS_INTERVAL_MS = 30 * 1000;
+// Inference timeout for a CHUNK_SIZE chunk, scaled with the chunk's size. Far above
+// the interactive default: a fresh worker also fits its explainer and syncs the
+// sequence cache within its first chunk.
+const TIMEOUT_MS = parseInt(process.env.BATCH_SCORING_TIMEOUT_MS) || 5 * 60 * 1000;
+
+class BatchScoringService {
+
+    static currentRun = null;
+
+    // Re-score every student matching `filter`; concurrent calls join the running job
+    static rescoreAll(options = {}) {
+        if (!BatchScoringService.currentRun) {
+            BatchScoringService.currentRun = BatchScoringService.run(options)
+                .finally(() => { BatchScoringService.currentRun = null; });
+        }
+        return BatchScoringService.currentRun;
+    }
+
+    static async run({ filter = { status: 'Active' }, changedOnly = false, chunkSize = CHUNK_SIZE, concurrency = CONCURRENCY, onProgress } = {}) {
+        const startedAt = Date.now();
+        const stats = {
+            total: await Student.countDocuments(filter),
+            processed: 0,
+            scored: 0,
+            unchanged: 0,
+            failed: 0,
+            chunks: 0,
+            durationMs: 0,
+            throughput: 0
+        };
+        let lastReportAt = startedAt;
+
+        const report = (force = false) => {
+            stats.durationMs = Date.now() - startedAt;
+            stats.throughput = Math.round(stats.processed / Math.max(stats.durationMs / 1000, 0.001));
+            if (!force && Date.now() - lastReportAt < PROGRESS_INTERVAL_MS) return;
+
+            lastReportAt = Date.now();
+            console.log(`📈 Re-scored ${stats.processed}/${stats.total} students (${stats.throughput}/s, ${stats.unchanged} unchanged, ${stats.failed} failed)`);
+            if (onProgress) onProgress({ ...stats });
+        };
+
+        const inFlight = new Set();
+        const schedule = async (studentIds) => {
+            while (inFlight.size >= concurrency) {
+                await Promise.race(inFlight);
+            }
+            const promise = BatchScoringService.scoreChunk(studentIds, stats, { changedOnly })
+                .then(() => report())
+                .finally(() => inFlight.delete(promise));
+            inFlight.add(promise);
+        };
+
+        const cursor = Student.find(filter).select('_id').sort({ _id: 1 }).lean().cursor({ batchSize: chunkSize });
+        let chunk = [];
+        for await (const student of cursor) {
+            chunk.push(String(student._id));
+            if (chunk.length === chunkSize) {
+                await schedule(chunk);
+                chunk = [];
+            }
+        }
+        if (chunk.length > 0) await schedule(chunk);
+        await Promise.all(inFlight);
+
+        report(true);
+        return stats;
+    }
+
+    static async scoreChunk(studentIds, stats, { changedOnly = false } = {}) {
+        try {
+            const timeoutMs = Math.ceil(TIMEOUT_MS * Math.max(1, studentIds.length / CHUNK_SIZE));
+            const results = await PredictionService.predictBatch(studentIds, { changedOnly, timeoutMs });
+            const failed = results.filter(result => result instanceof Error).length;
+            const unchanged = results.filter(result => result === null).length;
+            stats.scored += results.length - failed - unchanged;
+            stats.unchanged += unchanged;
+            stats.failed += failed;
+        } catch (error) {
+            console.error(`❌ Scoring chunk of ${studentIds.length} students failed:`, error.message);
+            stats.failed += studentIds.length;
+        }
+        stats.processed += studentIds.length;
+        stats.chunks++;
+    }
+}
+
+module.exports = BatchScoringService;
@@ -0,0 +1,184 @@
+const http = require('http');
+const https = require('https');
+const readline = require('readline');
+const axios = require('axios');
+
+// Shared HTTP layer for the external data connectors (SIS, Google Classroom,
+// biometric and RFID systems). Connections are reused through keep-alive
+// agents, each upstream host gets a bounded number of concurrent requests, and
+// transient failures (network errors, 429, 5xx) are retried with backoff.
+
+const MAX_SOCKETS = parseInt(process.env.CONNECTOR_MAX_SOCKETS) || 32;
+const HOST_CONCURRENCY = parseInt(process.env.CONNECTOR_CONCURRENCY) || 8;
+const MAX_RETRIES = parseInt(process.env.CONNECTOR_MAX_RETRIES) || 3;
+const BASE_BACKOFF_MS = 500;
+const MAX_BACKOFF_MS = 30 * 1000;
+const TIMEOUT_MS = parseInt(process.env.CONNECTOR_TIMEOUT_MS) || 30 * 1000;
+
+const RETRYABLE_CODES = new Set(['ECONNRESET', 'ECONNREFUSED', 'ETIMEDOUT', 'ECONNABORTED', 'EAI_AGAIN', 'EPIPE']);
+
+const client = axios.create({
+    timeout: TIMEOUT_MS,
+    httpAgent: new http.Agent({ keepAlive: true, maxSockets: MAX_SOCKETS }),
+    httpsAgent: new https.Agent({ keepAlive: true, maxSockets: MAX_SOCKETS }),
+    headers: { 'Content-Type': 'application/json' }
+});
+
+// Counting semaphore per upstream host
+class HostLimiter {
+
+    constructor(limit) {
+        this.limit = limit;
+        this.active = 0;
+        this.waiting = [];
+    }
+
+    async run(task) {
+        if (this.active >= this.limit) {
+            await new Promise(resolve => this.waiting.push(resolve));
+        }
+        this.active++;
+        try {
+            return await task();
+        } finally {
+            this.active--;
+            const next = this.waiting.shift();
+            if (next) next();
+        }
+    }
+}
+
+const limiters = new Map();
+
+const limiterFor = (url) => {
+    const host = new URL(url).host;
+    if (!limiters.has(host)) limiters.set(host, new HostLimiter(HOST_CONCURRENCY));
+    return limiters.get(host);
+};
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const isRetryable = (error) => {
+    if (!error.response) return RETRYABLE_CODES.has(error.code);
+    return error.response.status === 429 || error.response.status >= 500;
+};
+
+// Exponential backoff with full jitter; honours Retry-After when the upstream sends it
+const backoffDelay = (error, attempt) => {
+    const retryAfter = error.response && parseInt(error.response.headers['retry-after']);
+    if (retryAfter) return Math.min(retryAfter * 1000, MAX_BACKOFF_MS);
+    return Math.random() * Math.min(BASE_BACKOFF_MS * 2 ** attempt, MAX_BACKOFF_MS);
+};
+
+class ConnectorClient {
+
+    // axios request config → response, queued behind the host's concurrency limit
+    static async request(config) {
+        const limiter = limiterFor(config.url);
+
+        for (let attempt = 0; ; attempt++) {
+            try {
+                return await limiter.run(() => client.request(config));
+            } catch (error) {
+                if (attempt >= MAX_RETRIES || !isRetryable(error)) {
+                    error.message = `${config.method || 'GET'} ${config.url} failed: ${error.message}`;
+                    throw error;
+                }
+                await sleep(backoffDelay(error, attempt));
+            }
+        }
+    }
+
+    static async get(url, config = {}) {
+        const response = await ConnectorClient.request({ ...config, url, method: 'GET' });
+        return response.data;
+    }
+
+    static async post(url, data, config = {}) {
+        const response = await ConnectorClient.request({ ...config, url, data, method: 'POST' });
+        return response.data;
+    }
+
+    // Yield records from a response without buffering the raw body when the upstream
+    // streams NDJSON; JSON bodies are parsed once and `select(body)` picks the array.
+    // With `etag` the request is conditional and a 304 yields nothing;
+    // `onResponse(response)` sees the status and headers (e.g. the new ETag).
+    static async *streamRecords(url, { select = body => body, etag, onResponse, ...config } = {}) {
+        const response = await ConnectorClient.request({
+            ...config,
+            url,
+            method: config.method || 'GET',
+            responseType: 'stream',
+            headers: etag ? { ...config.headers, 'If-None-Match': etag } : config.headers,
+            validateStatus: status => (status >= 200 && status < 300) || status === 304
+        });
+        if (onResponse) onResponse(response);
+        if (response.status === 304) {
+            response.data.resume();
+            return;
+        }
+
+        const contentType = response.headers['content-type'] || '';
+
+        if (contentType.includes('ndjson') || contentType.includes('jsonl')) {
+            const lines = readline.createInterface({ input: response.data, crlfDelay: Infinity });
+            for await (const line of lines) {
+                if (line.trim()) yield JSON.parse(line);
+            }
+            return;
+        }
+
+        const chunks = [];
+        for await (const chunk of response.data) chunks.push(chunk);
+        const records = select(JSON.parse(Buffer.concat(chunks).toString('utf8'))) || [];
+        yield* records;
+    }
+
+    // Follow a paginated API: fetchPage(cursor) → { records, next } until next is empty
+    static async *paginate(fetchPage) {
+        let cursor;
+        do {
+            const { records, next } = await fetchPage(cursor);
+            yield* records;
+            cursor = next;
+        } while (cursor);
+    }
+
+    // Run task(item) for every item with at most `concurrency` in flight.
+    // Returns { results, errors } where errors are { item, error } for failed tasks.
+    static async mapConcurrent(items, task, { concurrency = HOST_CONCURRENCY } = {}) {
+        const results = new Array(items.length);
+        const errors = [];
+        let nextIndex = 0;
+
+        const worker = async () => {
+            while (nextIndex < items.length) {
+                const index = nextIndex++;
+                try {
+                    results[index] = await task(items[index], index);
+                } catch (error) {
+                    errors.push({ item: items[index], error });
+                }
+            }
+        };
+
+        await Promise.all(Array.from({ length: Math.min(concurrency, items.length) }, worker));
+        return { results, errors };
+    }
+
+    // Group an (async) iterable into arrays of up to `size` records, pulling the
+    // next record only when the consumer asks for the next batch
+    static async *batches(iterable, size) {
+        let batch = [];
+        for await (const record of iterable) {
+            batch.push(record);
+            if (batch.length === size) {
+                yield batch;
+                batch = [];
+            }
+        }
+        if (batch.length > 0) yield batch;
+    }
+}
+
+module.exports = ConnectorClient;
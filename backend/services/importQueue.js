@@ -0,0 +1,244 @@
+const os = require('os');
+const ImportLog = require('../models/ImportLog');
+
+// Persistent background import queue backed by the ImportLog collection.
+// Endpoints enqueue a job and return its id immediately; workers claim jobs
+// atomically (safe across several API instances), report progress into the
+// log and record the final counts, throughput and errors. Jobs reading a
+// host-local upload are pinned to that host and only claimed by its workers.
+
+const CONCURRENCY = parseInt(process.env.IMPORT_CONCURRENCY) || 2;
+const POLL_INTERVAL_MS = parseInt(process.env.IMPORT_POLL_INTERVAL_MS) || 5000;
+const HEARTBEAT_INTERVAL_MS = 10 * 1000;
+const STALE_AFTER_MS = 5 * 60 * 1000;
+const SWEEP_INTERVAL_MS = 60 * 1000;
+const PROGRESS_INTERVAL_MS = 1000;
+const MAX_STORED_ERRORS = 1000;
+// A job whose worker keeps dying (e.g. out of memory on a huge upload) is failed
+// after this many claims instead of being re-queued forever
+const MAX_ATTEMPTS = parseInt(process.env.IMPORT_MAX_ATTEMPTS) || 3;
+
+const HOST = os.hostname();
+const WORKER_ID = `${HOST}:${process.pid}`;
+
+class ImportQueue {
+
+    static handlers = new Map();
+    static running = 0;
+    static timer = null;
+    static sweepTimer = null;
+    static io = null;
+    static HOST = HOST;
+
+    // handler(job, reportProgress) → results; reportProgress(results, { bytesProcessed, totalBytes })
+    static register(jobType, handler) {
+        ImportQueue.handlers.set(jobType, handler);
+    }
+
+    // `host` pins the job to one host's workers (e.g. ImportQueue.HOST for uploaded files)
+    static async enqueue(jobType, { type, source, filename, payload, userId, host }) {
+        const job = await ImportLog.create({
+            jobType,
+            type,
+            source,
+            filename,
+            payload,
+            host,
+            importedBy: userId
+        });
+
+        setImmediate(() => ImportQueue.drain());
+        return job;
+    }
+
+    // Start polling for queued jobs; `io` (optional) receives progress events
+    static async start({ io } = {}) {
+        ImportQueue.io = io || null;
+
+        await ImportQueue.sweep();
+
+        if (!ImportQueue.timer) {
+            ImportQueue.timer = setInterval(() => ImportQueue.drain(), POLL_INTERVAL_MS);
+            ImportQueue.timer.unref();
+        }
+        if (!ImportQueue.sweepTimer) {
+            ImportQueue.sweepTimer = setInterval(() => {
+                ImportQueue.sweep().catch((error) => console.error('❌ Import queue sweep failed:', error));
+            }, SWEEP_INTERVAL_MS);
+            ImportQueue.sweepTimer.unref();
+        }
+        ImportQueue.drain();
+    }
+
+    static stop() {
+        clearInterval(ImportQueue.timer);
+        clearInterval(ImportQueue.sweepTimer);
+        ImportQueue.timer = null;
+        ImportQueue.sweepTimer = null;
+    }
+
+    // Put jobs of crashed workers back in the queue: any worker whose heartbeat
+    // went stale, and at once those of dead processes on this host. Jobs that
+    // have used up their attempts are failed instead.
+    static async sweep() {
+        await ImportQueue.release({ status: 'Processing', heartbeatAt: { $lt: new Date(Date.now() - STALE_AFTER_MS) } });
+
+        const local = await ImportLog.find({
+            status: 'Processing',
+            workerId: { $regex: `^${HOST.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}:` }
+        }).select('workerId').lean();
+        const dead = local.filter(job => !ImportQueue.isAlive(parseInt(job.workerId.split(':').pop())));
+        if (dead.length > 0) {
+            await ImportQueue.release({ _id: { $in: dead.map(job => job._id) }, status: 'Processing' });
+        }
+    }
+
+    static async release(filter) {
+        await ImportLog.updateMany(
+            { ...filter, attempts: { $gte: MAX_ATTEMPTS } },
+            {
+                $set: {
+                    status: 'Failed',
+                    lastError: `Import worker stopped during each of ${MAX_ATTEMPTS} attempts`,
+                    completedAt: new Date()
+                },
+                $unset: { workerId: 1, payload: 1 }
+            }
+        );
+        await ImportLog.updateMany(
+            { ...filter, attempts: { $lt: MAX_ATTEMPTS } },
+            { $set: { status: 'Queued' }, $unset: { workerId: 1 } }
+        );
+    }
+
+    static isAlive(pid) {
+        if (pid === process.pid) return true;
+        try {
+            process.kill(pid, 0);
+            return true;
+        } catch (error) {
+            return error.code === 'EPERM';
+        }
+    }
+
+    static async drain() {
+        while (ImportQueue.running < CONCURRENCY) {
+            ImportQueue.running++;
+            let job;
+            try {
+                job = await ImportLog.findOneAndUpdate(
+                    {
+                        status: 'Queued',
+                        attempts: { $lt: MAX_ATTEMPTS },
+                        jobType: { $in: [...ImportQueue.handlers.keys()] },
+                        host: { $in: [null, HOST] }
+                    },
+                    {
+                        $set: { status: 'Processing', startedAt: new Date(), heartbeatAt: new Date(), workerId: WORKER_ID },
+                        $inc: { attempts: 1 }
+                    },
+                    { sort: { queuedAt: 1 }, new: true }
+                ).select('+payload');
+            } catch (error) {
+                console.error('❌ Import queue poll failed:', error);
+            }
+
+            if (!job) {
+                ImportQueue.running--;
+                return;
+            }
+
+            ImportQueue.run(job).finally(() => {
+                ImportQueue.running--;
+                ImportQueue.drain();
+            });
+        }
+    }
+
+    static async run(job) {
+        const startedAt = Date.now();
+        let lastProgressAt = 0;
+
+        // Every write is conditional on this worker still owning the job, so a run
+        // the sweep handed to another worker cannot overwrite the newer run
+        const owned = { _id: job._id, workerId: WORKER_ID, status: 'Processing' };
+
+        const heartbeat = setInterval(() => {
+            ImportLog.updateOne(owned, { $set: { heartbeatAt: new Date() } }).catch(() => {});
+        }, HEARTBEAT_INTERVAL_MS);
+
+        const reportProgress = (results, bytes = {}) => {
+            if (Date.now() - lastProgressAt < PROGRESS_INTERVAL_MS) return;
+            lastProgressAt = Date.now();
+
+            const update = {
+                ...ImportQueue.countsFrom(results, startedAt),
+                heartbeatAt: new Date()
+            };
+            if (bytes.totalBytes) {
+                update.bytesProcessed = bytes.bytesProcessed;
+                update.totalBytes = bytes.totalBytes;
+            }
+
+            ImportLog.updateOne(owned, { $set: update }).catch(() => {});
+            ImportQueue.emit(job, { status: 'Processing', ...update });
+        };
+
+        try {
+            const handler = ImportQueue.handlers.get(job.jobType);
+            const results = await handler(job, reportProgress);
+            const errors = results.errors || [];
+
+            const update = {
+                ...ImportQueue.countsFrom(results, startedAt),
+                status: 'Completed',
+                errorDetails: errors.slice(0, MAX_STORED_ERRORS),
+                errorsTruncated: (results.errorsTruncated || 0) + Math.max(0, errors.length - MAX_STORED_ERRORS),
+                completedAt: new Date(),
+                durationMs: Date.now() - startedAt
+            };
+            await ImportLog.updateOne(owned, { $set: update, $unset: { payload: 1 } });
+            ImportQueue.emit(job, update);
+
+        } catch (error) {
+            console.error(`❌ Import ${job._id} failed:`, error);
+            const update = {
+                status: 'Failed',
+                lastError: error.message,
+                completedAt: new Date(),
+                durationMs: Date.now() - startedAt
+            };
+            await ImportLog.updateOne(owned, { $set: update, $unset: { payload: 1 } }).catch(() => {});
+            ImportQueue.emit(job, update);
+
+        } finally {
+            clearInterval(heartbeat);
+        }
+    }
+
+    static countsFrom(results, startedAt) {
+        const processed = results.total !== undefined ? results.total : results.successful + results.failed;
+        const elapsedSeconds = Math.max((Date.now() - startedAt) / 1000, 0.001);
+
+        return {
+            recordsProcessed: processed,
+            recordsSuccessful: results.successful || 0,
+            recordsFailed: results.failed || 0,
+            recordsInserted: results.inserted || 0,
+            recordsUpdated: results.updated || 0,
+            recordsSkipped: results.skipped || 0,
+            recordsUnchanged: results.unchanged || 0,
+            throughput: Math.round(processed / elapsedSeconds)
+        };
+    }
+
+    static emit(job, update) {
+        if (!ImportQueue.io) return;
+        ImportQueue.io.to(`user_${job.importedBy}`).emit('import_progress', {
+            importId: job._id,
+            ...update
+        });
+    }
+}
+
+module.exports = ImportQueue;
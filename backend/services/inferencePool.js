@@ -0,0 +1,214 @@
+const path = require('path');
+const readline = require('readline');
+const { spawn } = require('child_process');
+
+// Pool of long-lived Python inference processes (ai-models/inference_server.py).
+// Each process loads the model once and answers newline-delimited JSON requests
+// on stdin/stdout, so a prediction costs a forward pass rather than an
+// interpreter start, a TensorFlow import and a model load. Workers follow the
+// model registry's active version and hot-swap to it in the background,
+// reporting each swap with a 'model' message.
+
+const SERVER_SCRIPT = path.join(__dirname, '..', 'ai-models', 'inference_server.py');
+const PYTHON = process.env.PYTHON_PATH || 'python3';
+const POOL_SIZE = parseInt(process.env.INFERENCE_WORKERS) || 2;
+const REQUEST_TIMEOUT_MS = parseInt(process.env.INFERENCE_TIMEOUT_MS) || 10 * 1000;
+const STARTUP_TIMEOUT_MS = parseInt(process.env.INFERENCE_STARTUP_TIMEOUT_MS) || 2 * 60 * 1000;
+const RESTART_DELAY_MS = 1000;
+const MAX_RESTART_DELAY_MS = 60 * 1000;
+
+class InferenceWorker {
+
+    constructor(onExit) {
+        this.onExit = onExit;
+        this.pending = new Map();
+        this.nextId = 1;
+        this.info = null;
+        this.exited = false;
+
+        this.process = spawn(PYTHON, [SERVER_SCRIPT], {
+            cwd: path.dirname(SERVER_SCRIPT),
+            stdio: ['pipe', 'pipe', 'inherit'],
+            env: { ...process.env, PYTHONUNBUFFERED: '1' }
+        });
+
+        this.ready = new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                reject(new Error('Inference server did not become ready in time'));
+                this.kill();
+            }, STARTUP_TIMEOUT_MS);
+            this.resolveReady = (info) => { clearTimeout(timer); resolve(info); };
+            this.rejectReady = (error) => { clearTimeout(timer); reject(error); };
+        });
+        // Readiness failures are surfaced through InferencePool.ready()
+        this.ready.catch(() => {});
+
+        readline.createInterface({ input: this.process.stdout }).on('line', line => this.receive(line));
+
+        this.process.stdin.on('error', () => {});
+        this.process.on('error', (error) => this.exit(error));
+        this.process.on('exit', (code, signal) => {
+            this.exit(new Error(`Inference server exited (${signal || code})`));
+        });
+    }
+
+    receive(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (error) {
+            console.error('❌ Unreadable inference server output:', line);
+            return;
+        }
+
+        if (message.type === 'model') {
+            if (message.error) {
+                console.error(`❌ Inference worker could not switch to model ${message.version}: ${message.error}`);
+            } else {
+                this.info = { ...this.info, ...message };
+                console.log(`🤖 Inference worker ${message.pid} now serving ${message.modelVersion} (${message.modelType})`);
+            }
+            return;
+        }
+
+        if (message.type === 'ready') {
+            if (message.error) {
+                this.rejectReady(new Error(message.error));
+            } else {
+                this.info = message;
+                this.resolveReady(message);
+            }
+            return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (!request) return;
+        this.pending.delete(message.id);
+        clearTimeout(request.timer);
+
+        if (message.error) {
+            request.reject(new Error(message.error));
+        } else {
+            request.resolve(message.result);
+        }
+    }
+
+    call(method, params, { timeoutMs = REQUEST_TIMEOUT_MS } = {}) {
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`Inference request timed out after ${timeoutMs}ms`));
+            }, timeoutMs);
+
+            this.pending.set(id, { resolve, reject, timer });
+            this.process.stdin.write(JSON.stringify({ id, method, params }) + '\n');
+        });
+    }
+
+    exit(error) {
+        if (this.exited) return;
+        this.exited = true;
+
+        this.rejectReady(error);
+        for (const request of this.pending.values()) {
+            clearTimeout(request.timer);
+            request.reject(error);
+        }
+        this.pending.clear();
+        this.onExit(this, error);
+    }
+
+    kill() {
+        this.process.kill();
+    }
+}
+
+class InferencePool {
+
+    static workers = [];
+    static stopped = true;
+    static restartDelayMs = RESTART_DELAY_MS;
+
+    static start({ size = POOL_SIZE } = {}) {
+        InferencePool.stopped = false;
+        while (InferencePool.workers.length < size) {
+            InferencePool.spawnWorker();
+        }
+        return InferencePool.ready();
+    }
+
+    static spawnWorker() {
+        const worker = new InferenceWorker((exited, error) => {
+            InferencePool.workers = InferencePool.workers.filter(candidate => candidate !== exited);
+            if (InferencePool.stopped) return;
+
+            // Replace crashed workers, backing off while they keep failing
+            console.error(`❌ ${error.message}; restarting in ${InferencePool.restartDelayMs}ms`);
+            setTimeout(() => {
+                if (!InferencePool.stopped) InferencePool.spawnWorker();
+            }, InferencePool.restartDelayMs).unref();
+            InferencePool.restartDelayMs = Math.min(InferencePool.restartDelayMs * 2, MAX_RESTART_DELAY_MS);
+        });
+
+        worker.ready.then(() => { InferencePool.restartDelayMs = RESTART_DELAY_MS; }, () => {});
+        InferencePool.workers.push(worker);
+        return worker;
+    }
+
+    // Resolves with the model info once any worker is ready
+    static ready() {
+        if (InferencePool.workers.length === 0) {
+            return Promise.reject(new Error('Inference pool is not running'));
+        }
+        return Promise.any(InferencePool.workers.map(worker => worker.ready))
+            .catch(error => { throw error.errors ? error.errors[0] : error; });
+    }
+
+    // Model version served by the ready workers, or null before any is ready
+    static modelVersion() {
+        const worker = InferencePool.workers.find(candidate => candidate.info && !candidate.exited);
+        return worker ? worker.info.modelVersion : null;
+    }
+
+    // Send to the ready worker with the fewest requests in flight
+    static async call(method, params, options) {
+        if (InferencePool.stopped) InferencePool.start().catch(() => {});
+
+        let candidates = InferencePool.workers.filter(worker => worker.info && !worker.exited);
+        if (candidates.length === 0) {
+            await InferencePool.ready();
+            candidates = InferencePool.workers.filter(worker => worker.info && !worker.exited);
+        }
+
+        const worker = candidates.reduce((best, candidate) => (
+            candidate.pending.size < best.pending.size ? candidate : best
+        ));
+        return worker.call(method, params, options);
+    }
+
+    // inputFeatures dicts → { probabilities, modelVersion, modelType, inferenceMs }
+    static predict(instances, options) {
+        return InferencePool.call('predict', { instances }, options);
+    }
+
+    // Student ids → feature vectors read from the feature store in Python, then scored:
+    // { studentIds, unchangedIds, features, featureSetVersion, probabilities, modelVersion, modelType, ... }
+    // explain: 'approximate' adds featureImportance per student
+    static predictStudents(studentIds, { changedOnly = false, explain = null, ...options } = {}) {
+        return InferencePool.call('predict_students', { studentIds, changedOnly, explain }, options);
+    }
+
+    // Student ids → { studentIds, features, featureSetVersion } without scoring
+    static features(studentIds, options) {
+        return InferencePool.call('features', { studentIds }, options);
+    }
+
+    static stop() {
+        InferencePool.stopped = true;
+        for (const worker of InferencePool.workers) worker.kill();
+        InferencePool.workers = [];
+    }
+}
+
+module.exports = InferencePool;
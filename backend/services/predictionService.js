@@ -0,0 +1,325 @@
+const Student = require('../models/Student');
+const Prediction = require('../models/Prediction');
+const FeatureVector = require('../models/FeatureVector');
+const Alert = require('../models/Alert');
+const InferencePool = require('./inferencePool');
+const MicroBatcher = require('../utils/microBatcher');
+
+// Dropout risk predictions: the long-lived Python inference pool computes each
+// student's inputFeatures and scores them; the results are stored as the active Predictions.
+// Single requests are coalesced into micro-batches, so concurrent callers share
+// one bulk feature read, one model forward pass and one set of bulk writes.
+
+const VALIDITY_DAYS = parseInt(process.env.PREDICTION_VALIDITY_DAYS) || 7;
+const BATCH_SIZE = parseInt(process.env.PREDICTION_BATCH_SIZE) || 64;
+const BATCH_WAIT_MS = parseInt(process.env.PREDICTION_BATCH_WAIT_MS) || 10;
+const HIGH_RISK_SCORE = 70;
+const MEDIUM_RISK_SCORE = 40;
+// Attributions computed while scoring: 'approximate' (linear surrogate, near free) or 'off'
+const EXPLANATION_MODE = process.env.PREDICTION_EXPLANATIONS || 'approximate';
+const EXACT_EXPLANATION_TIMEOUT_MS = 60 * 1000;
+const KEY_FACTOR_COUNT = 3;
+const MAX_SAVE_ATTEMPTS = 3;
+
+// Key factor text for the model features (ai-models/features.py FEATURE_NAMES)
+const FACTOR_DESCRIPTIONS = {
+    age: (features) => `Age (${features.age})`,
+    gender_male: (features) => `Gender (${features.gender})`,
+    gender_female: (features) => `Gender (${features.gender})`,
+    nationality_foreign: (features) => `Nationality (${features.nationality})`,
+    current_cgpa: (features) => `CGPA (${features.currentCGPA})`,
+    attendance_rate: (features) => `Attendance (${features.attendanceRate}%)`,
+    semester: (features) => `Semester ${features.semester}`,
+    fee_status: (features) => `Fee status: ${features.feeStatus}`,
+    has_scholarship: (features) => (features.hasScholarship ? 'Scholarship' : 'No scholarship'),
+    father_education: (features) => `Father's education (${features.fatherEducation})`,
+    mother_education: (features) => `Mother's education (${features.motherEducation})`,
+    disciplinary_issues: (features) => `Disciplinary issues (${features.disciplinaryIssues})`,
+    special_needs: () => 'Special needs',
+    displaced: () => 'Displaced',
+    previous_gpa: (features) => `Previous GPA (${features.previousGPA})`,
+    attendance_trend: (features) => `Attendance ${features.attendanceTrend}`,
+    grade_trend: (features) => `Grades ${features.gradeTrend}`
+};
+
+class PredictionService {
+
+    // Start the inference workers in the background; readiness does not block the API
+    static initializeModel() {
+        return InferencePool.start()
+            .then((info) => {
+                console.log(`🤖 HLRNN model ready (${info.modelVersion})`);
+                return info;
+            })
+            .catch((error) => {
+                console.error('❌ HLRNN model failed to load:', error.message);
+            });
+    }
+
+    // Resolves with the student's new Prediction once its micro-batch is scored
+    static generatePrediction(studentId) {
+        return batcher.submit(String(studentId));
+    }
+
+    // The student's active, unexpired Prediction from the current model, scoring a
+    // new one only on a miss. Changes to attendance, grades or the student's input
+    // fields expire the cached prediction (Prediction.invalidate), so a hit always
+    // reflects the current inputs.
+    static async getPrediction(studentId, { force = false } = {}) {
+        if (!force) {
+            const cached = await Prediction.findCurrent(studentId);
+            const modelVersion = InferencePool.modelVersion();
+            if (cached && (!modelVersion || cached.modelVersion === modelVersion)) {
+                return cached;
+            }
+        }
+        return PredictionService.generatePrediction(studentId);
+    }
+
+    // Score a batch of students; returns an array aligned with studentIds holding
+    // each Prediction, or an Error for students that could not be scored.
+    // Features are read from the feature store kept by the inference server
+    // (ai-models/feature_store.py), so every scoring path shares them. With
+    // `changedOnly`, students already scored from their current feature vector by
+    // the current model are skipped and get null. `timeoutMs` overrides the
+    // inference request timeout (bulk scoring of large chunks).
+    static async predictBatch(studentIds, { changedOnly = false, timeoutMs } = {}) {
+        const startedAt = Date.now();
+        const result = await InferencePool.predictStudents(studentIds, {
+            changedOnly,
+            explain: EXPLANATION_MODE === 'off' ? null : EXPLANATION_MODE,
+            timeoutMs
+        });
+
+        const saved = new Map();
+        if (result.studentIds.length > 0) {
+            const predictions = await PredictionService.savePredictions(
+                result.studentIds.map((studentId, i) => ({
+                    studentId,
+                    features: result.features[i],
+                    dropoutProbability: result.probabilities[i],
+                    featureImportance: result.featureImportance ? result.featureImportance[i] : []
+                })),
+                {
+                    modelVersion: result.modelVersion,
+                    modelType: result.modelType,
+                    featureSetVersion: result.featureSetVersion,
+                    explanationMethod: result.explanationMethod,
+                    processingTime: Date.now() - startedAt
+                }
+            );
+            predictions.forEach(prediction => saved.set(String(prediction.studentId), prediction));
+        }
+
+        const unchanged = new Set(result.unchangedIds);
+        return studentIds.map(id => saved.get(id) || (unchanged.has(id) ? null : new Error(`Student not found: ${id}`)));
+    }
+
+    // Exact (Kernel SHAP) attributions for the student's current prediction, computed
+    // on demand for detail views and stored on the Prediction
+    static async explainPrediction(studentId) {
+        const prediction = await PredictionService.getPrediction(studentId);
+        if (prediction.explanation && prediction.explanation.method === 'exact') return prediction;
+
+        const { studentIds, featureImportance, explanationMethod } = await InferencePool.call(
+            'explain',
+            { studentIds: [String(studentId)], mode: 'exact' },
+            { timeoutMs: EXACT_EXPLANATION_TIMEOUT_MS }
+        );
+        if (studentIds.length === 0) return prediction;
+
+        const explanation = PredictionService.explain(
+            prediction.inputFeatures, prediction.dropoutProbability, prediction.riskLevel, featureImportance[0], explanationMethod
+        );
+        return Prediction.findByIdAndUpdate(
+            prediction._id,
+            { $set: { featureImportance: featureImportance[0], explanation } },
+            { new: true }
+        );
+    }
+
+    // Prediction.inputFeatures for one student
+    static async gatherFeatures(studentId) {
+        const featuresById = await PredictionService.gatherFeaturesBatch([String(studentId)]);
+        return featuresById.get(String(studentId)) || null;
+    }
+
+    // Prediction.inputFeatures for many students; returns Map studentId (string) → features,
+    // missing students omitted
+    static async gatherFeaturesBatch(studentIds) {
+        const { studentIds: found, features } = await InferencePool.features(studentIds);
+        return new Map(found.map((id, i) => [id, features[i]]));
+    }
+
+    static riskLevelFor(riskScore) {
+        if (riskScore >= HIGH_RISK_SCORE) return 'High';
+        if (riskScore >= MEDIUM_RISK_SCORE) return 'Medium';
+        return 'Low';
+    }
+
+    // Store scored predictions as the students' active ones and mirror them on Student.
+    // entries: [{ studentId, features, dropoutProbability }]
+    static async savePredictions(entries, { modelVersion, modelType, featureSetVersion, explanationMethod, processingTime }) {
+        const now = new Date();
+        const validUntil = new Date(now.getTime() + VALIDITY_DAYS * 24 * 60 * 60 * 1000);
+        const studentIds = entries.map(entry => entry.studentId);
+
+        const documents = entries.map(({ studentId, features, dropoutProbability, featureImportance = [] }) => {
+            const riskScore = Math.round(dropoutProbability * 100 * 100) / 100;
+            const riskLevel = PredictionService.riskLevelFor(riskScore);
+            return {
+                studentId,
+                dropoutProbability,
+                riskScore,
+                riskLevel,
+                prediction: dropoutProbability >= 0.5 ? 'Dropout' : 'Continue',
+                modelVersion,
+                modelType,
+                inputFeatures: features,
+                featureImportance,
+                explanation: PredictionService.explain(features, dropoutProbability, riskLevel, featureImportance, explanationMethod),
+                predictionDate: now,
+                validUntil,
+                processingTime
+            };
+        });
+
+        const predictions = await PredictionService.replaceActive(documents);
+
+        // Risk fields are model output, not a feature source: leave updatedAt (the
+        // feature store's Student watermark) untouched
+        await Student.bulkWrite(predictions.map(prediction => ({
+            updateOne: {
+                filter: { _id: prediction.studentId },
+                update: {
+                    $set: {
+                        riskScore: prediction.riskScore,
+                        riskLevel: prediction.riskLevel,
+                        lastRiskAssessment: now
+                    }
+                },
+                timestamps: false
+            }
+        })), { ordered: false });
+        await FeatureVector.markScored(studentIds, { featureSetVersion, modelVersion, scoredAt: now });
+
+        await PredictionService.raiseRiskAlerts(predictions.filter(prediction => prediction.riskLevel === 'High'));
+
+        return predictions;
+    }
+
+    // Save the new predictions inactive first, so a validation or write failure
+    // leaves the students' current predictions in place, then deactivate the older
+    // ones and activate the new. The partial unique index on active predictions
+    // rejects an activation that raced a concurrent batch for the same student;
+    // those students are deactivated and activated again, so the last batch wins.
+    static async replaceActive(documents) {
+        const inserted = await Prediction.insertMany(
+            documents.map(document => ({ ...document, isActive: false })),
+            { ordered: false }
+        );
+        let pending = inserted;
+
+        for (let attempt = 1; pending.length > 0; attempt++) {
+            await Prediction.updateMany(
+                {
+                    studentId: { $in: pending.map(prediction => prediction.studentId) },
+                    _id: { $nin: pending.map(prediction => prediction._id) },
+                    isActive: true
+                },
+                { $set: { isActive: false } }
+            );
+            try {
+                await Prediction.bulkWrite(pending.map(prediction => ({
+                    updateOne: { filter: { _id: prediction._id }, update: { $set: { isActive: true } } }
+                })), { ordered: false });
+                pending = [];
+            } catch (error) {
+                const writeErrors = error.writeErrors || [];
+                const conflicts = new Set(writeErrors.filter(writeError => writeError.code === 11000).map(writeError => writeError.index));
+                if (conflicts.size === 0 || conflicts.size < writeErrors.length || attempt >= MAX_SAVE_ATTEMPTS) throw error;
+
+                pending = pending.filter((prediction, i) => conflicts.has(i));
+            }
+        }
+
+        for (const prediction of inserted) prediction.isActive = true;
+        return inserted;
+    }
+
+    // Summary, key factors and recommendations. Key factors are the features whose
+    // attributions raise the risk most when attributions are available, otherwise
+    // rule-based; recommendations are rule-based.
+    static explain(features, dropoutProbability, riskLevel, featureImportance = [], method = null) {
+        const keyFactors = [];
+        const recommendations = [];
+
+        if (features.attendanceRate < 75) {
+            keyFactors.push(`Low attendance (${features.attendanceRate}%)`);
+            recommendations.push('Schedule an attendance counselling session');
+        }
+        if (features.currentCGPA < 2.0) {
+            keyFactors.push(`Low CGPA (${features.currentCGPA})`);
+            recommendations.push('Enrol in academic support / tutoring');
+        }
+        if (['Pending', 'Defaulted'].includes(features.feeStatus)) {
+            keyFactors.push(`Fee status: ${features.feeStatus}`);
+            recommendations.push('Review financial aid and scholarship options');
+        }
+        if (features.attendanceTrend === 'declining') keyFactors.push('Attendance declining');
+        if (features.gradeTrend === 'declining') keyFactors.push('Grades declining');
+
+        const riskFactors = featureImportance
+            .filter(entry => entry.impact === 'negative' && FACTOR_DESCRIPTIONS[entry.feature])
+            .sort((a, b) => b.importance - a.importance)
+            .slice(0, KEY_FACTOR_COUNT)
+            .map(entry => FACTOR_DESCRIPTIONS[entry.feature](features));
+        const attributed = riskFactors.length > 0;
+
+        return {
+            summary: `${riskLevel} dropout risk (${Math.round(dropoutProbability * 100)}% probability)`,
+            keyFactors: attributed ? [...new Set(riskFactors)] : keyFactors,
+            recommendations,
+            confidence: Math.round(Math.abs(dropoutProbability - 0.5) * 2 * 100) / 100,
+            method: attributed ? method : 'rules'
+        };
+    }
+
+    // One open high-risk alert per student
+    static async raiseRiskAlerts(predictions) {
+        if (predictions.length === 0) return;
+
+        const open = await Alert.find({
+            studentId: { $in: predictions.map(prediction => prediction.studentId) },
+            alertType: 'RISK_SCORE_HIGH',
+            status: { $in: ['Active', 'Acknowledged', 'In Progress'] }
+        }).select('studentId').lean();
+        const alerted = new Set(open.map(alert => String(alert.studentId)));
+
+        const alerts = predictions
+            .filter(prediction => !alerted.has(String(prediction.studentId)))
+            .map(prediction => ({
+                studentId: prediction.studentId,
+                alertType: 'RISK_SCORE_HIGH',
+                priority: prediction.riskScore >= 85 ? 'Critical' : 'High',
+                title: 'High dropout risk detected',
+                description: prediction.explanation.summary,
+                triggerValue: prediction.riskScore,
+                threshold: HIGH_RISK_SCORE,
+                currentValue: prediction.riskScore,
+                isAutoGenerated: true,
+                generatedBy: 'PredictionService'
+            }));
+
+        if (alerts.length > 0) {
+            await Alert.insertMany(alerts);
+        }
+    }
+}
+
+const batcher = new MicroBatcher(studentIds => PredictionService.predictBatch(studentIds), {
+    maxBatchSize: BATCH_SIZE,
+    maxWaitMs: BATCH_WAIT_MS
+});
+
+module.exports = PredictionService;
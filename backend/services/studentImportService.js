@@ -0,0 +1,201 @@
+const Student = require('../models/Student');
+const Prediction = require('../models/Prediction');
+const { addImportError } = require('../utils/importPipeline');
+const { hashValue } = require('../utils/fingerprint');
+
+const DEFAULT_BATCH_SIZE = parseInt(process.env.IMPORT_BATCH_SIZE) || 500;
+
+// Batched student import engine: existing students for a whole chunk are
+// resolved with one query and inserts/updates go out as one unordered bulkWrite.
+// Existing students are compared by import fingerprint: unchanged rows are
+// skipped and changed rows only $set the fields whose hash moved.
+class StudentImportService {
+
+    static createResults(errors = []) {
+        return {
+            successful: 0,
+            failed: 0,
+            inserted: 0,
+            updated: 0,
+            skipped: 0,
+            errors: [...errors]
+        };
+    }
+
+    // Import validated students in chunks of `batchSize`, accumulating into `results`
+    // (onProgress(results) is called after each chunk)
+    static async importStudents(students, userId, { batchSize = DEFAULT_BATCH_SIZE, results = StudentImportService.createResults(), onProgress } = {}) {
+        for (let i = 0; i < students.length; i += batchSize) {
+            await StudentImportService.importChunk(students.slice(i, i + batchSize), userId, results);
+            if (onProgress) onProgress(results);
+        }
+        return results;
+    }
+
+    static async importChunk(students, userId, results) {
+        // Rows sharing an email/rollNumber with an earlier row in the chunk are
+        // deferred to a later round so they update the record the earlier row wrote
+        for (const round of StudentImportService.splitRounds(students)) {
+            await StudentImportService.writeRound(round, userId, results);
+        }
+        return results;
+    }
+
+    static splitRounds(students) {
+        const rounds = [];
+
+        for (const student of students) {
+            const keys = [`email:${student.email}`, `roll:${student.rollNumber}`];
+            let round = rounds.find(candidate => keys.every(key => !candidate.keys.has(key)));
+            if (!round) {
+                round = { keys: new Set(), students: [] };
+                rounds.push(round);
+            }
+            keys.forEach(key => round.keys.add(key));
+            round.students.push(student);
+        }
+
+        return rounds.map(round => round.students);
+    }
+
+    static async writeRound(students, userId, results) {
+        const existingStudents = await Student.find({
+            $or: [
+                { email: { $in: students.map(student => student.email) } },
+                { rollNumber: { $in: students.map(student => student.rollNumber) } }
+            ]
+        }).select('_id email rollNumber studentId firstName lastName +importFingerprint +importFieldHashes').lean();
+
+        const byEmail = new Map(existingStudents.map(student => [student.email, student]));
+        const byRollNumber = new Map(existingStudents.map(student => [student.rollNumber, student]));
+
+        const operations = [];
+        const operationRows = [];
+
+        for (const row of students) {
+            const { providedFields, ...studentData } = row;
+            const existingStudent = byEmail.get(studentData.email) || byRollNumber.get(studentData.rollNumber);
+            const fields = StudentImportService.importFields(studentData, providedFields);
+            const { fingerprint, fieldHashes } = StudentImportService.fingerprint(fields);
+
+            if (existingStudent) {
+                if (existingStudent.importFingerprint === fingerprint) {
+                    results.successful++;
+                    results.skipped++;
+                    continue;
+                }
+
+                // Update only the import-sourced fields that changed since the last import
+                const storedHashes = existingStudent.importFieldHashes || {};
+                const updates = {};
+                for (const [path, value] of Object.entries(fields)) {
+                    if (storedHashes[StudentImportService.hashKey(path)] !== fieldHashes[StudentImportService.hashKey(path)]) {
+                        updates[path] = value;
+                    }
+                }
+                updates.importFingerprint = fingerprint;
+                updates.importFieldHashes = fieldHashes;
+                updates.lastUpdatedBy = userId;
+                if (Student.SEARCH_FIELDS.some(field => field in updates)) {
+                    updates.searchTokens = Student.buildSearchTokens({ ...existingStudent, ...updates });
+                }
+
+                operations.push({
+                    updateOne: {
+                        filter: { _id: existingStudent._id },
+                        update: { $set: updates }
+                    }
+                });
+                operationRows.push({
+                    studentData,
+                    type: 'updated',
+                    studentId: existingStudent._id,
+                    changesPredictionInputs: Student.touchesPredictionInputs(Object.keys(updates))
+                });
+            } else {
+                // Create new student (defaults fill the fields the source did not provide)
+                const newStudent = new Student({ ...studentData, createdBy: userId });
+                newStudent.searchTokens = Student.buildSearchTokens(newStudent);
+                newStudent.importFingerprint = fingerprint;
+                newStudent.importFieldHashes = fieldHashes;
+
+                const validationError = newStudent.validateSync();
+                if (validationError) {
+                    StudentImportService.recordFailure(results, studentData, validationError.message);
+                    continue;
+                }
+
+                operations.push({ insertOne: { document: newStudent.toObject() } });
+                operationRows.push({ studentData, type: 'inserted' });
+            }
+        }
+
+        if (operations.length === 0) return;
+
+        const failedIndexes = new Set();
+        try {
+            await Student.bulkWrite(operations, { ordered: false });
+        } catch (error) {
+            if (!error.writeErrors) throw error;
+
+            for (const writeError of error.writeErrors) {
+                failedIndexes.add(writeError.index);
+                StudentImportService.recordFailure(
+                    results,
+                    operationRows[writeError.index].studentData,
+                    writeError.errmsg || writeError.err?.errmsg || 'Write failed'
+                );
+            }
+        }
+
+        const invalidated = [];
+        operationRows.forEach((row, index) => {
+            if (failedIndexes.has(index)) return;
+            results.successful++;
+            results[row.type]++;
+            if (row.changesPredictionInputs) invalidated.push(row.studentId);
+        });
+
+        // bulkWrite bypasses the Student update hooks: expire cached predictions here
+        await Prediction.invalidate(invalidated, 'student');
+    }
+
+    // Flat { path: value } of the fields the source provided (all top-level
+    // fields when the caller did not say which were provided)
+    static importFields(studentData, providedFields) {
+        const paths = providedFields || Object.keys(studentData).filter(key => key !== 'createdBy');
+        const fields = {};
+
+        for (const path of paths) {
+            const value = path.split('.').reduce((target, key) => (target == null ? undefined : target[key]), studentData);
+            if (value !== undefined) fields[path] = value;
+        }
+        return fields;
+    }
+
+    static fingerprint(fields) {
+        const fieldHashes = {};
+        for (const [path, value] of Object.entries(fields)) {
+            fieldHashes[StudentImportService.hashKey(path)] = hashValue(value).slice(0, 12);
+        }
+        return { fingerprint: hashValue(fields), fieldHashes };
+    }
+
+    // Map keys cannot contain '.'
+    static hashKey(path) {
+        return path.replace(/\./g, ':');
+    }
+
+    static recordFailure(results, studentData, message) {
+        results.failed++;
+        addImportError(results, {
+            student: `${studentData.firstName} ${studentData.lastName}`,
+            email: studentData.email,
+            error: message
+        });
+    }
+}
+
+StudentImportService.DEFAULT_BATCH_SIZE = DEFAULT_BATCH_SIZE;
+
+module.exports = StudentImportService;
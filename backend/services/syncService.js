@@ -0,0 +1,210 @@
+const SyncState = require('../models/SyncState');
+const SyncRecord = require('../models/SyncRecord');
+const ImportQueue = require('./importQueue');
+const { hashValue } = require('../utils/fingerprint');
+
+// Incremental synchronization with external systems. Each source has a SyncState
+// (config, schedule, watermark/ETag markers) and a SyncRecord hash per upstream
+// record, so a re-sync only fetches what the upstream reports as changed and
+// only writes records whose content actually differs from the last sync.
+
+const HASH_LOOKUP_CHUNK = 5000;
+const HASH_WRITE_CHUNK = 1000;
+
+const JOB_TYPES = {
+    'sis': { jobType: 'students-sis', type: 'Students' },
+    'google-classroom': { jobType: 'students-google-classroom', type: 'Students' },
+    'biometric': { jobType: 'attendance-biometric', type: 'Attendance' },
+    'rfid': { jobType: 'attendance-rfid', type: 'Attendance' }
+};
+
+class SyncService {
+
+    static sourceTypes() {
+        return Object.keys(JOB_TYPES);
+    }
+
+    static sourceKeyFor(sourceType, config) {
+        switch (sourceType) {
+            case 'sis':
+                return `sis:${config.syncOptions?.sisType}:${config.institutionId || config.sisUrl}`;
+            case 'google-classroom':
+                return `google-classroom:${[...config.courseIds].sort().join(',')}`;
+            default:
+                return `${sourceType}:${config.systemUrl}`;
+        }
+    }
+
+    // Create or update the sync state for a source and return it
+    static async register(sourceType, config, userId, { name, enabled, intervalMinutes } = {}) {
+        const sourceKey = SyncService.sourceKeyFor(sourceType, config);
+        const update = { sourceType, config };
+        if (name !== undefined) update.name = name;
+        if (enabled !== undefined) update.enabled = enabled;
+        if (intervalMinutes !== undefined) update.intervalMinutes = intervalMinutes;
+
+        const state = await SyncState.findOneAndUpdate(
+            { sourceKey },
+            { $set: update, $setOnInsert: { createdBy: userId } },
+            { upsert: true, new: true, runValidators: true }
+        );
+
+        if (!state.nextSyncAt) {
+            state.scheduleNext();
+            await state.save();
+        }
+        return state;
+    }
+
+    static async load(sourceKey) {
+        const state = await SyncState.findOne({ sourceKey }).select('+config');
+        if (!state) throw new Error(`Unknown sync source: ${sourceKey}`);
+        return state;
+    }
+
+    // Queue an import job for a source; credentials stay in SyncState, not in the job
+    static async enqueue(state, userId, { fullSync = false } = {}) {
+        const { jobType, type } = JOB_TYPES[state.sourceType];
+
+        const job = await ImportQueue.enqueue(jobType, {
+            type,
+            source: state.name || state.sourceKey,
+            payload: { syncKey: state.sourceKey, fullSync },
+            userId
+        });
+
+        await SyncState.updateOne(
+            { _id: state._id },
+            { $set: { lastStatus: 'Queued', lastImportId: job._id } }
+        );
+        return job;
+    }
+
+    // Enqueue every enabled source whose nextSyncAt has passed. The claim advances
+    // nextSyncAt atomically so concurrent API instances never queue a source twice.
+    static async runDueSyncs() {
+        const queued = [];
+
+        for (;;) {
+            const now = new Date();
+            const state = await SyncState.findOneAndUpdate(
+                { enabled: true, nextSyncAt: { $lte: now } },
+                [{ $set: { nextSyncAt: { $add: [now, { $multiply: ['$intervalMinutes', 60 * 1000] }] } } }],
+                { new: true }
+            );
+            if (!state) break;
+
+            try {
+                queued.push(await SyncService.enqueue(state, state.createdBy));
+            } catch (error) {
+                console.error(`❌ Failed to queue sync ${state.sourceKey}:`, error);
+            }
+        }
+
+        return queued;
+    }
+
+    static hashRecord(record) {
+        return hashValue(record);
+    }
+
+    // Split records into those whose content changed since the last committed sync
+    // and those that did not. `hashes` (recordKey → hash) feeds commitHashes.
+    // With `force` every record counts as changed (full resync).
+    static async filterChanged(sourceKey, records, keyOf, { force = false } = {}) {
+        const hashes = new Map();
+        const keyed = records.map(record => {
+            const recordKey = String(keyOf(record));
+            const hash = SyncService.hashRecord(record);
+            return { record, recordKey, hash };
+        });
+
+        const stored = new Map();
+        if (!force) {
+            for (let i = 0; i < keyed.length; i += HASH_LOOKUP_CHUNK) {
+                const existing = await SyncRecord.find({
+                    sourceKey,
+                    recordKey: { $in: keyed.slice(i, i + HASH_LOOKUP_CHUNK).map(entry => entry.recordKey) }
+                }).select('recordKey hash').lean();
+                existing.forEach(entry => stored.set(entry.recordKey, entry.hash));
+            }
+        }
+
+        const changed = [];
+        let unchanged = 0;
+        for (const { record, recordKey, hash } of keyed) {
+            if (stored.get(recordKey) === hash) {
+                unchanged++;
+                continue;
+            }
+            changed.push(record);
+            hashes.set(recordKey, hash);
+        }
+
+        return { changed, unchanged, hashes };
+    }
+
+    // Persist hashes for records written successfully; `failedKeys` are left out
+    // so they are retried on the next sync
+    static async commitHashes(sourceKey, hashes, failedKeys = new Set()) {
+        const now = new Date();
+        let operations = [];
+
+        for (const [recordKey, hash] of hashes) {
+            if (failedKeys.has(recordKey)) continue;
+            operations.push({
+                updateOne: {
+                    filter: { sourceKey, recordKey },
+                    update: { $set: { hash, lastSeenAt: now } },
+                    upsert: true
+                }
+            });
+
+            if (operations.length === HASH_WRITE_CHUNK) {
+                await SyncRecord.bulkWrite(operations, { ordered: false });
+                operations = [];
+            }
+        }
+
+        if (operations.length > 0) {
+            await SyncRecord.bulkWrite(operations, { ordered: false });
+        }
+    }
+
+    // Record a finished run; `markers` may carry watermark, etag, changeToken and
+    // cursors (sub-source id → { watermark, etag })
+    static async complete(sourceKey, { stats, watermark, etag, changeToken, cursors = {} } = {}) {
+        const update = {
+            lastSyncAt: new Date(),
+            lastStatus: 'Completed',
+            lastError: null
+        };
+        if (stats) update.lastStats = stats;
+        if (watermark) update.watermark = watermark;
+        if (etag) update.etag = etag;
+        if (changeToken) update.changeToken = changeToken;
+        for (const [id, cursor] of Object.entries(cursors)) {
+            update[`cursors.${SyncService.cursorKey(id)}`] = cursor;
+        }
+
+        await SyncState.updateOne({ sourceKey }, { $set: update });
+    }
+
+    static async fail(sourceKey, error) {
+        await SyncState.updateOne(
+            { sourceKey },
+            { $set: { lastStatus: 'Failed', lastError: error.message } }
+        ).catch(() => {});
+    }
+
+    static cursorFor(state, id) {
+        return (state.cursors && state.cursors.get(SyncService.cursorKey(id))) || {};
+    }
+
+    // Map keys cannot contain '.' or start with '$'
+    static cursorKey(id) {
+        return String(id).replace(/[.$]/g, '_');
+    }
+}
+
+module.exports = SyncService;
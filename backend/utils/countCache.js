@@ -0,0 +1,35 @@
+// Short-lived cache for collection counts used by paginated list views.
+// Unfiltered counts use the collection metadata estimate; filtered counts are
+// computed once per TTL window per distinct filter.
+
+const DEFAULT_TTL_MS = parseInt(process.env.COUNT_CACHE_TTL_MS) || 30 * 1000;
+const MAX_ENTRIES = 500;
+
+const cache = new Map();
+
+const getCachedCount = async (Model, filter = {}, { ttlMs = DEFAULT_TTL_MS } = {}) => {
+    const key = `${Model.modelName}:${JSON.stringify(filter)}`;
+    const cached = cache.get(key);
+    if (cached && cached.expiresAt > Date.now()) {
+        return cached.count;
+    }
+
+    const count = Object.keys(filter).length === 0
+        ? await Model.estimatedDocumentCount()
+        : await Model.countDocuments(filter);
+
+    if (cache.size >= MAX_ENTRIES) {
+        cache.delete(cache.keys().next().value);
+    }
+    cache.set(key, { count, expiresAt: Date.now() + ttlMs });
+
+    return count;
+};
+
+const clearCountCache = (modelName) => {
+    for (const key of cache.keys()) {
+        if (!modelName || key.startsWith(`${modelName}:`)) cache.delete(key);
+    }
+};
+
+module.exports = { getCachedCount, clearCountCache };
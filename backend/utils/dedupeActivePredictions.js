@@ -0,0 +1,41 @@
+// Keep only the newest active prediction per student, then build the partial
+// unique index on active predictions (which fails while duplicates exist).
+// Usage: node utils/dedupeActivePredictions.js
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const Prediction = require('../models/Prediction');
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+
+    console.log('🔄 Deactivating duplicate active predictions...');
+    const duplicates = Prediction.aggregate([
+        { $match: { isActive: true } },
+        { $sort: { studentId: 1, predictionDate: -1, createdAt: -1, _id: -1 } },
+        { $group: { _id: '$studentId', ids: { $push: '$_id' }, count: { $sum: 1 } } },
+        { $match: { count: { $gt: 1 } } }
+    ]).allowDiskUse(true).cursor();
+
+    let students = 0;
+    let deactivated = 0;
+    for await (const { ids } of duplicates) {
+        const { modifiedCount } = await Prediction.updateMany(
+            { _id: { $in: ids.slice(1) } },
+            { $set: { isActive: false } }
+        );
+        students++;
+        deactivated += modifiedCount;
+    }
+    console.log(`✅ Deactivated ${deactivated} duplicate predictions for ${students} students`);
+
+    await Prediction.createIndexes();
+    console.log('✅ Prediction indexes built');
+
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Prediction dedupe failed:', error);
+    process.exit(1);
+});
@@ -0,0 +1,73 @@
+// Worker thread that parses Excel workbooks off the main event loop.
+// Protocol (parent → worker): { type: 'parse', filePath, chunkSize } | { type: 'next' } | { type: 'cancel' }
+// Protocol (worker → parent): { type: 'rows', rows } | { type: 'end' } | { type: 'error', message }
+// Rows are sent one chunk at a time; the next chunk waits for a 'next' message.
+const { parentPort } = require('worker_threads');
+const xlsx = require('xlsx');
+
+let job = null;
+
+const sendChunk = () => {
+    const { worksheet, range, headers, chunkSize } = job;
+
+    if (job.nextRow > range.e.r) {
+        job = null;
+        parentPort.postMessage({ type: 'end' });
+        return;
+    }
+
+    const endRow = Math.min(job.nextRow + chunkSize - 1, range.e.r);
+    const rows = xlsx.utils.sheet_to_json(worksheet, {
+        header: headers,
+        range: { s: { r: job.nextRow, c: range.s.c }, e: { r: endRow, c: range.e.c } }
+    });
+    job.nextRow = endRow + 1;
+
+    parentPort.postMessage({ type: 'rows', rows });
+};
+
+// The whole workbook is loaded here; rows are then handed out in chunks
+const startJob = ({ filePath, chunkSize }) => {
+    const workbook = xlsx.readFile(filePath);
+    const worksheet = workbook.Sheets[workbook.SheetNames[0]];
+
+    if (!worksheet || !worksheet['!ref']) {
+        parentPort.postMessage({ type: 'end' });
+        return;
+    }
+
+    const range = xlsx.utils.decode_range(worksheet['!ref']);
+    const [headers = []] = xlsx.utils.sheet_to_json(worksheet, {
+        header: 1,
+        range: { s: { r: range.s.r, c: range.s.c }, e: { r: range.s.r, c: range.e.c } }
+    });
+
+    // Same keys as sheet_to_json's default header handling (blank headers get __EMPTY names)
+    const seen = new Map();
+    const uniqueHeaders = [];
+    for (let c = 0; c <= range.e.c - range.s.c; c++) {
+        let header = headers[c] === undefined || headers[c] === null ? '__EMPTY' : String(headers[c]);
+        const count = seen.get(header) || 0;
+        seen.set(header, count + 1);
+        if (count > 0) header = `${header}_${count}`;
+        uniqueHeaders.push(header);
+    }
+
+    job = { worksheet, range, headers: uniqueHeaders, chunkSize, nextRow: range.s.r + 1 };
+    sendChunk();
+};
+
+parentPort.on('message', (message) => {
+    try {
+        if (message.type === 'parse') {
+            startJob(message);
+        } else if (message.type === 'next' && job) {
+            sendChunk();
+        } else if (message.type === 'cancel') {
+            job = null;
+        }
+    } catch (error) {
+        job = null;
+        parentPort.postMessage({ type: 'error', message: error.message });
+    }
+});
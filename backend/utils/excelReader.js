@@ -0,0 +1,133 @@
+const os = require('os');
+const path = require('path');
+const { Readable } = require('stream');
+const { Worker } = require('worker_threads');
+
+// Excel rows as an object-mode stream, parsed by a pool of worker threads so a
+// large workbook never blocks the API event loop. Chunks are requested from the
+// worker only when the stream wants more rows, so downstream backpressure holds.
+// The worker still reads the whole workbook into memory first (xlsx has no
+// streaming reader), so only the rows in flight are bounded, not the parse.
+
+const WORKER_FILE = path.join(__dirname, 'excelParserWorker.js');
+const POOL_SIZE = parseInt(process.env.EXCEL_WORKER_POOL_SIZE) || Math.min(4, Math.max(1, os.cpus().length - 1));
+const DEFAULT_CHUNK_SIZE = 500;
+
+class ExcelParserPool {
+
+    constructor(size) {
+        this.size = size;
+        this.idle = [];
+        this.busy = new Set();
+        this.waiting = [];
+    }
+
+    async acquire() {
+        if (this.idle.length > 0) {
+            const worker = this.idle.pop();
+            this.busy.add(worker);
+            return worker;
+        }
+
+        if (this.busy.size < this.size) {
+            const worker = new Worker(WORKER_FILE);
+            worker.unref();
+            this.busy.add(worker);
+            return worker;
+        }
+
+        return new Promise(resolve => this.waiting.push(resolve));
+    }
+
+    // Hand the worker to the next waiting job, or park it as idle
+    release(worker) {
+        worker.removeAllListeners('message');
+        worker.removeAllListeners('error');
+
+        const next = this.waiting.shift();
+        if (next) {
+            next(worker);
+            return;
+        }
+
+        this.busy.delete(worker);
+        this.idle.push(worker);
+    }
+
+    // Drop a worker whose state is unknown (crashed or cancelled mid-parse)
+    discard(worker) {
+        worker.removeAllListeners('message');
+        worker.removeAllListeners('error');
+        worker.terminate();
+        this.busy.delete(worker);
+
+        const next = this.waiting.shift();
+        if (next) {
+            this.acquire().then(next);
+        }
+    }
+}
+
+const pool = new ExcelParserPool(POOL_SIZE);
+
+const createExcelRowStream = (filePath, { chunkSize = DEFAULT_CHUNK_SIZE } = {}) => {
+    let worker = null;
+    let starting = false;
+    let awaitingNext = false;
+    let finished = false;
+
+    return new Readable({
+        objectMode: true,
+        highWaterMark: chunkSize,
+
+        read() {
+            if (worker && awaitingNext) {
+                awaitingNext = false;
+                worker.postMessage({ type: 'next' });
+                return;
+            }
+            if (worker || starting) return;
+
+            starting = true;
+            pool.acquire().then((acquired) => {
+                worker = acquired;
+
+                worker.on('message', (message) => {
+                    if (message.type === 'rows') {
+                        awaitingNext = true;
+                        for (const row of message.rows) this.push(row);
+                        if (message.rows.length === 0) this.read(0);
+                    } else if (message.type === 'end') {
+                        finished = true;
+                        pool.release(worker);
+                        worker = null;
+                        this.push(null);
+                    } else if (message.type === 'error') {
+                        finished = true;
+                        pool.release(worker);
+                        worker = null;
+                        this.destroy(new Error(`Excel parsing failed: ${message.message}`));
+                    }
+                });
+                worker.on('error', (error) => {
+                    finished = true;
+                    pool.discard(worker);
+                    worker = null;
+                    this.destroy(error);
+                });
+
+                worker.postMessage({ type: 'parse', filePath, chunkSize });
+            }, (error) => this.destroy(error));
+        },
+
+        destroy(error, callback) {
+            if (worker && !finished) {
+                pool.discard(worker);
+                worker = null;
+            }
+            callback(error);
+        }
+    });
+};
+
+module.exports = { createExcelRowStream };
@@ -0,0 +1,18 @@
+const crypto = require('crypto');
+
+// Content fingerprints used to detect unchanged records between imports/syncs.
+
+// JSON with sorted keys (undefined dropped) so equal values always serialize equally
+const stableStringify = (value) => {
+    if (value === null || value === undefined || typeof value !== 'object') return JSON.stringify(value ?? null);
+    if (value instanceof Date) return JSON.stringify(value.toISOString());
+    if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`;
+    return `{${Object.keys(value).sort()
+        .filter(key => value[key] !== undefined)
+        .map(key => `${JSON.stringify(key)}:${stableStringify(value[key])}`)
+        .join(',')}}`;
+};
+
+const hashValue = (value) => crypto.createHash('sha1').update(stableStringify(value)).digest('base64');
+
+module.exports = { stableStringify, hashValue };
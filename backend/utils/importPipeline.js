@@ -0,0 +1,84 @@
+const { Transform, Writable } = require('stream');
+
+// Streaming import building blocks: parse → validate → batch → bulk write.
+// Object-mode streams with small high-water marks keep memory bounded by
+// (batchSize × maxInFlight) rows no matter how large the source file is.
+
+const MAX_REPORTED_ERRORS = parseInt(process.env.IMPORT_MAX_REPORTED_ERRORS) || 1000;
+
+// Record a row error, keeping only the first MAX_REPORTED_ERRORS details
+const addImportError = (results, error) => {
+    if (results.errors.length < MAX_REPORTED_ERRORS) {
+        results.errors.push(error);
+    } else {
+        results.errorsTruncated = (results.errorsTruncated || 0) + 1;
+    }
+};
+
+// Validates each parsed row with validateRow(row, index) → { student } | { error }
+// (the shape returned by DataImportController.validateStudentRow)
+const createValidationStream = (validateRow, results) => {
+    let index = 0;
+
+    return new Transform({
+        objectMode: true,
+        highWaterMark: 64,
+        transform(row, encoding, callback) {
+            const { student, error } = validateRow(row, index++);
+            results.total = index;
+
+            if (error) {
+                results.failed++;
+                addImportError(results, error);
+                return callback();
+            }
+            callback(null, student);
+        }
+    });
+};
+
+// Collects rows into batches and hands each to writeBatch(batch). Up to
+// `maxInFlight` batches are written while parsing continues; beyond that the
+// stream stops accepting rows, which pauses the parser (backpressure).
+const createBatchWriter = (writeBatch, { batchSize = 500, maxInFlight = 1 } = {}) => {
+    let batch = [];
+    let failure = null;
+    const inFlight = new Set();
+
+    const startBatch = () => {
+        const rows = batch;
+        batch = [];
+        const promise = Promise.resolve()
+            .then(() => writeBatch(rows))
+            .catch((error) => { failure = failure || error; })
+            .finally(() => inFlight.delete(promise));
+        inFlight.add(promise);
+    };
+
+    return new Writable({
+        objectMode: true,
+        highWaterMark: batchSize,
+        write(row, encoding, callback) {
+            if (failure) return callback(failure);
+
+            batch.push(row);
+            if (batch.length < batchSize) return callback();
+
+            startBatch();
+            if (inFlight.size < maxInFlight) return callback();
+
+            Promise.race(inFlight).then(() => callback(failure));
+        },
+        final(callback) {
+            if (batch.length > 0 && !failure) startBatch();
+            Promise.all(inFlight).then(() => callback(failure));
+        }
+    });
+};
+
+module.exports = {
+    MAX_REPORTED_ERRORS,
+    addImportError,
+    createValidationStream,
+    createBatchWriter
+};
@@ -0,0 +1,80 @@
+// Coalesces individual requests into batches: a batch is dispatched when it
+// reaches `maxBatchSize` or `maxWaitMs` after its first item, whichever comes
+// first. Duplicate keys submitted while a batch is open share one result.
+// processBatch(keys) must resolve to an array aligned with `keys`; an Error at
+// a position rejects only that key's callers.
+
+class MicroBatcher {
+
+    constructor(processBatch, { maxBatchSize = 64, maxWaitMs = 10, maxConcurrentBatches = 2 } = {}) {
+        this.processBatch = processBatch;
+        this.maxBatchSize = maxBatchSize;
+        this.maxWaitMs = maxWaitMs;
+        this.maxConcurrentBatches = maxConcurrentBatches;
+
+        this.open = new Map();
+        this.timer = null;
+        this.ready = [];
+        this.running = 0;
+    }
+
+    submit(key) {
+        const existing = this.open.get(key);
+        if (existing) return existing.promise;
+
+        let entry;
+        const promise = new Promise((resolve, reject) => {
+            entry = { resolve, reject };
+        });
+        entry.promise = promise;
+        this.open.set(key, entry);
+
+        if (this.open.size >= this.maxBatchSize) {
+            this.close();
+        } else if (!this.timer) {
+            this.timer = setTimeout(() => this.close(), this.maxWaitMs);
+        }
+        return promise;
+    }
+
+    // Seal the open batch and hand it to the dispatcher
+    close() {
+        clearTimeout(this.timer);
+        this.timer = null;
+        if (this.open.size === 0) return;
+
+        this.ready.push(this.open);
+        this.open = new Map();
+        this.dispatch();
+    }
+
+    dispatch() {
+        while (this.running < this.maxConcurrentBatches && this.ready.length > 0) {
+            const batch = this.ready.shift();
+            this.running++;
+            this.run(batch).finally(() => {
+                this.running--;
+                this.dispatch();
+            });
+        }
+    }
+
+    async run(batch) {
+        const keys = [...batch.keys()];
+        try {
+            const results = await this.processBatch(keys);
+            keys.forEach((key, i) => {
+                const result = results[i];
+                if (result instanceof Error) {
+                    batch.get(key).reject(result);
+                } else {
+                    batch.get(key).resolve(result);
+                }
+            });
+        } catch (error) {
+            for (const entry of batch.values()) entry.reject(error);
+        }
+    }
+}
+
+module.exports = MicroBatcher;
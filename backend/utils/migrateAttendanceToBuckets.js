@@ -0,0 +1,47 @@
+// Copy per-period Attendance documents into monthly AttendanceBuckets.
+// Run once before switching ATTENDANCE_STORAGE=bucketed; summaries are unaffected.
+// Usage: node utils/migrateAttendanceToBuckets.js [batchSize]
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const Attendance = require('../models/Attendance');
+const AttendanceBucket = require('../models/AttendanceBucket');
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+
+    const batchSize = parseInt(process.argv[2]) || 5000;
+    const cursor = Attendance.find()
+        .select('studentId date subject period status')
+        .sort({ studentId: 1, date: 1 })
+        .lean()
+        .cursor({ batchSize });
+
+    let batch = [];
+    let migrated = 0;
+    let failed = 0;
+
+    const flush = async () => {
+        if (batch.length === 0) return;
+        const { written, errors } = await AttendanceBucket.writeRecords(batch, { overwrite: true });
+        migrated += written.length;
+        failed += errors.length;
+        batch = [];
+        console.log(`   ├── ${migrated} records migrated`);
+    };
+
+    console.log('🔄 Migrating attendance into monthly buckets...');
+    for await (const record of cursor) {
+        batch.push(record);
+        if (batch.length >= batchSize) await flush();
+    }
+    await flush();
+
+    console.log(`✅ Migrated ${migrated} records (${failed} failed)`);
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Attendance migration failed:', error);
+    process.exit(1);
+});
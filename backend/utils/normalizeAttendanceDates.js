@@ -0,0 +1,100 @@
+// Move Attendance documents stored with a time of day onto their school day (UTC
+// midnight, see SCHOOL_TIMEZONE), the date imports now use in the natural key
+// { studentId, date, subject, period }. When several records land on the same key
+// the most recently updated one is kept. Summaries are rebuilt afterwards (from
+// documents; run it before migrateAttendanceToBuckets).
+// Usage: node utils/normalizeAttendanceDates.js [batchSize]
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const Attendance = require('../models/Attendance');
+const AttendanceSummary = require('../models/AttendanceSummary');
+const AttendanceImportService = require('../services/attendanceImportService');
+const AttendanceStore = require('../services/attendanceStore');
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const FIELDS = 'studentId date subject period updatedAt';
+
+const keyOf = (record, date) => `${record.studentId}|${date.getTime()}|${record.subject}|${record.period}`;
+const newer = (a, b) => (a.updatedAt || 0) >= (b.updatedAt || 0);
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+
+    const batchSize = parseInt(process.argv[2]) || 5000;
+    const cursor = Attendance.find({ $expr: { $ne: [{ $mod: [{ $toLong: '$date' }, DAY_MS] }, 0] } })
+        .select(FIELDS)
+        .lean()
+        .cursor({ batchSize });
+
+    let batch = [];
+    let normalized = 0;
+    let removed = 0;
+
+    const flush = async () => {
+        if (batch.length === 0) return;
+        const days = batch.map(record => AttendanceImportService.toAttendanceDate(record.date));
+
+        // Records already on the school day that the batch would collide with
+        const existing = await Attendance.find({
+            $or: batch.map((record, i) => ({
+                studentId: record.studentId,
+                date: days[i],
+                subject: record.subject,
+                period: record.period
+            }))
+        }).select(FIELDS).lean();
+
+        const winners = new Map(existing.map(record => [keyOf(record, record.date), record]));
+        const losers = [];
+        batch.forEach((record, i) => {
+            const key = keyOf(record, days[i]);
+            const current = winners.get(key);
+            const candidate = { ...record, day: days[i] };
+            if (!current || newer(candidate, current)) {
+                if (current) losers.push(current._id);
+                winners.set(key, candidate);
+            } else {
+                losers.push(record._id);
+            }
+        });
+
+        // Deletes go first so the moved records do not collide on the unique key
+        const operations = losers.map(_id => ({ deleteOne: { filter: { _id } } }));
+        for (const record of winners.values()) {
+            if (!record.day) continue;
+            operations.push({
+                updateOne: { filter: { _id: record._id }, update: { $set: { date: record.day } }, timestamps: false }
+            });
+        }
+        if (operations.length > 0) await Attendance.bulkWrite(operations, { ordered: true });
+
+        normalized += operations.length - losers.length;
+        removed += losers.length;
+        batch = [];
+        console.log(`   ├── ${normalized} records moved to their school day, ${removed} duplicates removed`);
+    };
+
+    console.log('🔄 Normalizing attendance dates...');
+    for await (const record of cursor) {
+        batch.push(record);
+        if (batch.length >= batchSize) await flush();
+    }
+    await flush();
+    console.log(`✅ Moved ${normalized} records, removed ${removed} duplicates`);
+
+    if (normalized + removed > 0 && AttendanceStore.isBucketed()) {
+        console.log('ℹ️  Buckets are the summary source: re-run migrate:attendance-buckets, then rebuild:attendance-summaries');
+    } else if (normalized + removed > 0) {
+        console.log('🔄 Rebuilding attendance summaries...');
+        const rebuilt = await AttendanceSummary.rebuild({}, { source: 'documents' });
+        console.log(`✅ Rebuilt ${rebuilt} attendance summaries`);
+    }
+
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Attendance date normalization failed:', error);
+    process.exit(1);
+});
@@ -0,0 +1,109 @@
+const mongoose = require('mongoose');
+
+// Keyset (cursor) pagination helpers.
+// A cursor is an opaque base64url token holding the sort and the last row's sort value and _id,
+// so the next page is an index range scan instead of skip-and-discard.
+
+const serializeValue = (value) => {
+    if (value instanceof Date) return { t: 'date', v: value.toISOString() };
+    if (value instanceof mongoose.Types.ObjectId) return { t: 'oid', v: value.toString() };
+    return { t: 'raw', v: value === undefined ? null : value };
+};
+
+const deserializeValue = ({ t, v }) => {
+    if (t === 'date') return new Date(v);
+    if (t === 'oid') return new mongoose.Types.ObjectId(v);
+    return v;
+};
+
+const getPath = (doc, path) => path.split('.').reduce((value, key) => (value == null ? value : value[key]), doc);
+
+const invalidCursor = (message) => {
+    const error = new Error(message);
+    error.status = 400;
+    return error;
+};
+
+// The cursor also records the sort it was issued for, so it cannot be replayed
+// against a different sortBy/direction
+const encodeCursor = (doc, sortField, direction) => {
+    const payload = {
+        f: sortField,
+        d: direction,
+        s: serializeValue(getPath(doc, sortField)),
+        id: doc._id.toString()
+    };
+    return Buffer.from(JSON.stringify(payload)).toString('base64url');
+};
+
+const decodeCursor = (cursor, sortField, direction) => {
+    let payload;
+    try {
+        payload = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+        if (!payload.s || !mongoose.isValidObjectId(payload.id)) throw new Error();
+    } catch (error) {
+        throw invalidCursor('Invalid cursor');
+    }
+    if (sortField !== undefined && (payload.f !== sortField || payload.d !== direction)) {
+        throw invalidCursor('Cursor does not match the requested sort order');
+    }
+    return {
+        value: deserializeValue(payload.s),
+        id: new mongoose.Types.ObjectId(payload.id)
+    };
+};
+
+// Filter selecting rows strictly after the cursor for a { [sortField]: direction, _id: direction } sort.
+// Null and missing values sort before everything else, so ascending pages move from
+// nulls onto any value and descending pages end with the nulls.
+const buildKeysetFilter = (sortField, direction, cursor) => {
+    const { value, id } = decodeCursor(cursor, sortField, direction);
+    const op = direction === 1 ? '$gt' : '$lt';
+
+    if (sortField === '_id') {
+        return { _id: { [op]: id } };
+    }
+
+    const tie = { [sortField]: value, _id: { [op]: id } };
+    if (value === null) {
+        return direction === 1
+            ? { $or: [{ [sortField]: { $ne: null } }, tie] }
+            : tie;
+    }
+
+    const after = [{ [sortField]: { [op]: value } }, tie];
+    if (direction === -1) after.push({ [sortField]: null });
+    return { $or: after };
+};
+
+// Combine a base filter with the keyset condition without clobbering its own $or / _id
+const applyCursor = (filter, sortField, direction, cursor) => {
+    if (!cursor) return filter;
+    return { $and: [filter, buildKeysetFilter(sortField, direction, cursor)] };
+};
+
+// Sort object with _id as tie-breaker so the order is total
+const keysetSort = (sortField, direction) => {
+    const sort = { [sortField]: direction };
+    if (sortField !== '_id') sort._id = direction;
+    return sort;
+};
+
+// Trim the extra probe row fetched with limit + 1 and build the next cursor
+const buildPage = (rows, limit, sortField, direction) => {
+    const hasNextPage = rows.length > limit;
+    const items = hasNextPage ? rows.slice(0, limit) : rows;
+    return {
+        items,
+        hasNextPage,
+        nextCursor: hasNextPage ? encodeCursor(items[items.length - 1], sortField, direction) : null
+    };
+};
+
+module.exports = {
+    encodeCursor,
+    decodeCursor,
+    applyCursor,
+    keysetSort,
+    buildPage
+};
@@ -0,0 +1,26 @@
+// Backfill / repair the AttendanceSummary rollup from the Attendance collection.
+// Usage: node utils/rebuildAttendanceSummaries.js [studentObjectId]
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const AttendanceSummary = require('../models/AttendanceSummary');
+const AttendanceStore = require('../services/attendanceStore');
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+
+    const studentId = process.argv[2];
+    const filter = studentId ? { studentId: new mongoose.Types.ObjectId(studentId) } : {};
+
+    console.log('🔄 Rebuilding attendance summaries...');
+    const source = AttendanceStore.isBucketed() ? 'buckets' : 'documents';
+    const rebuilt = await AttendanceSummary.rebuild(filter, { source });
+    console.log(`✅ Rebuilt ${rebuilt} attendance summaries`);
+
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Attendance summary rebuild failed:', error);
+    process.exit(1);
+});
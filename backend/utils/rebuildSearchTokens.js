@@ -0,0 +1,21 @@
+// Backfill Student.searchTokens for existing students (type-ahead search index).
+// Usage: node utils/rebuildSearchTokens.js
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const Student = require('../models/Student');
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+
+    console.log('🔄 Rebuilding student search tokens...');
+    const refreshed = await Student.refreshSearchTokens();
+    console.log(`✅ Refreshed search tokens for ${refreshed} students`);
+
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Search token rebuild failed:', error);
+    process.exit(1);
+});
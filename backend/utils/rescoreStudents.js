@@ -0,0 +1,31 @@
+// Re-score every active student (same job as the nightly cron).
+// Usage: node utils/rescoreStudents.js [--all] [--changed]
+//   --all      include inactive students
+//   --changed  only students whose feature vectors changed since they were last scored
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const PredictionService = require('../services/predictionService');
+const BatchScoringService = require('../services/batchScoringService');
+const InferencePool = require('../services/inferencePool');
+
+const run = async () => {
+    await mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/ai_dropout_prediction');
+    await PredictionService.initializeModel();
+
+    const filter = process.argv.includes('--all') ? {} : { status: 'Active' };
+
+    console.log('🔄 Re-scoring students...');
+    const changedOnly = process.argv.includes('--changed');
+    const stats = await BatchScoringService.rescoreAll({ filter, changedOnly });
+    console.log(`✅ Re-scored ${stats.scored}/${stats.total} students in ${Math.round(stats.durationMs / 1000)}s (${stats.throughput}/s, ${stats.unchanged} unchanged, ${stats.failed} failed)`);
+
+    InferencePool.stop();
+    await mongoose.disconnect();
+};
+
+run().catch((error) => {
+    console.error('❌ Re-scoring failed:', error);
+    InferencePool.stop();
+    process.exit(1);
+});
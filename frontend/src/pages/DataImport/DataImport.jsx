@@ -44,6 +44,9 @@ import { toast } from 'react-toastify';
 import { useDataImport } from '../hooks/useDataImport';
 import { dataImportAPI } from '../services/api';
 
+const IMPORT_POLL_INTERVAL_MS = 2000;
+const IMPORT_POLL_TIMEOUT_MS = 30 * 60 * 1000;
+
 function TabPanel({ children, value, index, ...other }) {
   return (
     <div
@@ -84,6 +87,28 @@ const DataImport = () => {
     setTabValue(newValue);
   };
 
+  // Imports run as background jobs; poll the job until it finishes or the deadline passes
+  const waitForImport = async (importId) => {
+    const deadline = Date.now() + IMPORT_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, IMPORT_POLL_INTERVAL_MS));
+      const { data: status } = await dataImportAPI.getImportStatus(importId);
+
+      if (status.status === 'Failed') {
+        throw new Error(status.lastError || 'Import failed');
+      }
+      if (status.status === 'Completed') {
+        return {
+          ...status,
+          imported: status.recordsSuccessful,
+          failed: status.recordsFailed,
+          total: status.recordsProcessed
+        };
+      }
+    }
+    throw new Error('Import is still running; check the import history for its result');
+  };
+
   // File upload handlers
   const onDrop = useCallback(async (acceptedFiles, uploadType) => {
     if (acceptedFiles.length === 0) return;
@@ -118,11 +143,15 @@ const DataImport = () => {
         }
       });
 
-      setImportResults(response.data);
-      toast.success(`${response.data.imported} records imported successfully!`);
+      const results = response.data.importId
+        ? await waitForImport(response.data.importId)
+        : response.data;
 
-      if (response.data.failed > 0) {
-        toast.warning(`${response.data.failed} records failed to import. Check error details.`);
+      setImportResults(results);
+      toast.success(`${results.imported} records imported successfully!`);
+
+      if (results.failed > 0) {
+        toast.warning(`${results.failed} records failed to import. Check error details.`);
       }
 
     } catch (error) {
@@ -200,8 +229,13 @@ const DataImport = () => {
   const handleSISConnect = async () => {
     try {
       const response = await dataImportAPI.connectToSIS(sisConfig);
-      setImportResults(response.data);
       setSisDialog(false);
+      toast.info('SIS synchronization started');
+
+      const results = response.data.importId
+        ? await waitForImport(response.data.importId)
+        : response.data;
+      setImportResults(results);
       toast.success('SIS connection successful!');
     } catch (error) {
       toast.error(`SIS connection failed: ${error.response?.data?.message || error.message}`);
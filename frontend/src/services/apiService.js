@@ -42,11 +42,11 @@ export const authAPI = {
 
 export const studentAPI = {
   getAll: (params) => API.get('/students', { params }),
-  getById: (id) => API.get(`/students/${id}`),
+  getById: (id, params) => API.get(`/students/${id}`, { params }),
   create: (data) => API.post('/students', data),
   update: (id, data) => API.put(`/students/${id}`, data),
   delete: (id) => API.delete(`/students/${id}`),
-  getByRiskLevel: (level) => API.get(`/students/risk/${level}`),
+  getByRiskLevel: (level, params) => API.get(`/students/risk/${level}`, { params }),
   search: (query) => API.post('/students/search', query),
   bulkCreate: (data) => API.post('/students/bulk-create', data),
   bulkUpdate: (data) => API.put('/students/bulk-update', data),